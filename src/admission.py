@@ -0,0 +1,317 @@
+# ═══════════════════════════════════════════════════════════════
+# Controle de admissao da API
+# Objetivo: Limitar requisicoes em andamento e rejeitar cedo em picos de trafego
+# ═══════════════════════════════════════════════════════════════
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Sequence
+
+# ══════════════════════════════════════════════════════════════════
+# REJEICAO
+# ══════════════════════════════════════════════════════════════════
+
+class Rejected(Exception):
+    """Requisição recusada pelo controle de admissão (429 ou 503 com Retry-After)."""
+
+    def __init__(self, status_code: int, reason: str, detail: str, retry_after_s: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after_s = retry_after_s
+
+# ══════════════════════════════════════════════════════════════════
+# LIMITE DE REQUISICOES EM ANDAMENTO + FILA
+# ══════════════════════════════════════════════════════════════════
+
+class AdmissionController:
+    """
+    No máximo `max_in_flight` requisições em andamento; as excedentes
+    esperam em uma fila FIFO limitada, cada uma por até `queue_timeout_s`.
+
+    ┌──────────────────────────────────────────────────────────────┐
+    │  requisição ─► vaga livre? ── sim ─► atende                  │
+    │                    │ não                                     │
+    │               fila cheia? ── sim ─► 503 (queue_full)         │
+    │                    │ não                                     │
+    │               espera vaga ── prazo esgotado ─► 503 (deadline)│
+    │                    │ vaga liberada                           │
+    │                    └────────────────────────► atende         │
+    └──────────────────────────────────────────────────────────────┘
+
+    Ao terminar, uma requisição passa sua vaga diretamente para a primeira
+    da fila, o que mantém a ordem de chegada. Sob sobrecarga, a latência
+    fica limitada pelo prazo da fila em vez de crescer sem limite, e as
+    requisições recusadas custam só a resposta de erro.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        max_queue: int = 128,
+        queue_timeout_s: float = 0.5,
+        retry_after_s: float = 1.0,
+        on_shed: Optional[Callable[[str], None]] = None,
+        on_wait: Optional[Callable[[float], None]] = None
+    ):
+        """
+        Inicializa o controle.
+
+        Args:
+            max_in_flight: Máximo de requisições em andamento
+            max_queue: Máximo de requisições esperando vaga (0 = sem fila)
+            queue_timeout_s: Tempo máximo de espera na fila
+            retry_after_s: Valor do Retry-After nas respostas 503
+            on_shed: Chamado com o motivo de cada rejeição (ex: contador)
+            on_wait: Chamado com o tempo de fila de cada requisição admitida
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self.on_shed = on_shed
+        self.on_wait = on_wait
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Estatísticas
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Dict[str, int] = {}
+        self.queue_time_s = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def reject(self, reason: str, detail: str) -> Rejected:
+        """Conta a rejeição e devolve a exceção (503)."""
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        if self.on_shed is not None:
+            self.on_shed(reason)
+        return Rejected(503, reason, detail, self.retry_after_s)
+
+    def _admit(self, waited_s: float) -> None:
+        self.admitted += 1
+        self.queue_time_s += waited_s
+        if self.on_wait is not None:
+            self.on_wait(waited_s)
+
+    async def acquire(self) -> None:
+        """
+        Aguarda uma vaga.
+
+        Raises:
+            Rejected: Fila cheia ou prazo de espera esgotado
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._admit(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self.reject("queue_full", "Servidor sobrecarregado: fila de espera cheia")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout_s)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga chegou junto com o prazo/cancelamento: devolvê-la
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self.reject(
+                    "deadline", f"Servidor sobrecarregado: sem vaga em {self.queue_timeout_s * 1000:.0f} ms"
+                )
+            raise
+        self._admit(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Libera a vaga, passando-a para a primeira requisição da fila."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Ocupação, fila e contadores de rejeição."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": round(self.queue_timeout_s * 1000, 1),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+            "avg_queue_time_ms": round(self.queue_time_s / self.admitted * 1000, 3) if self.admitted else 0.0
+        }
+
+# ══════════════════════════════════════════════════════════════════
+# LIMITE POR CLIENTE (TOKEN BUCKET)
+# ══════════════════════════════════════════════════════════════════
+
+class ClientRateLimiter:
+    """
+    Um token bucket por cliente: `rate_per_s` requisições por segundo em
+    média, com rajadas de até `burst`.
+
+    Guarda no máximo `max_clients` baldes; o cliente visto há mais tempo é
+    descartado (um cliente descartado volta com o balde cheio).
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: float,
+        max_clients: int = 10000,
+        on_shed: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Inicializa o limitador.
+
+        Args:
+            rate_per_s: Fichas repostas por segundo
+            burst: Capacidade do balde
+            max_clients: Máximo de clientes acompanhados
+            on_shed: Chamado a cada rejeição (motivo "rate_limited")
+        """
+        self.rate_per_s = rate_per_s
+        self.burst = max(1.0, burst)
+        self.max_clients = max(1, max_clients)
+        self.on_shed = on_shed
+
+        # cliente → [fichas, última atualização]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+        # Estatísticas
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, client: str) -> None:
+        """
+        Consome uma ficha do cliente.
+
+        Raises:
+            Rejected: 429 com o tempo até a próxima ficha no Retry-After
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_s)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            self.allowed += 1
+            return
+
+        self.limited += 1
+        if self.on_shed is not None:
+            self.on_shed("rate_limited")
+        raise Rejected(
+            429, "rate_limited",
+            f"Limite de {self.rate_per_s:g} requisições/s por cliente excedido",
+            (1.0 - bucket[0]) / self.rate_per_s
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_s": self.rate_per_s,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited
+        }
+
+# ══════════════════════════════════════════════════════════════════
+# MIDDLEWARE ASGI
+# ══════════════════════════════════════════════════════════════════
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI puro: aplica o limite por cliente e o controle de
+    admissão às rotas de previsão, antes de ler o corpo.
+
+    Rotas fora de `paths` (health check, métricas, admin) nunca são
+    recusadas: o health check continua respondendo durante um pico.
+    O cliente é identificado pelo header `client_header` ou, sem ele,
+    pelo IP da conexão. `on_admit` é chamado quando a requisição sai da
+    fila, antes de seguir para a aplicação.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: Optional[AdmissionController] = None,
+        rate_limiter: Optional[ClientRateLimiter] = None,
+        paths: Sequence[str] = ("/predict",),
+        client_header: str = "x-client-id",
+        on_admit: Optional[Callable[[], None]] = None
+    ):
+        self.app = app
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.paths = tuple(paths)
+        self.client_header = client_header.lower().encode("latin-1")
+        self.on_admit = on_admit
+
+    def client_id(self, scope) -> str:
+        for name, value in scope.get("headers", ()):
+            if name == self.client_header:
+                return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def send_rejection(send, error: Rejected) -> None:
+        body = json.dumps({"detail": error.detail, "error_type": error.reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(error.retry_after_s))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.check(self.client_id(scope))
+            if self.controller is not None:
+                await self.controller.acquire()
+        except Rejected as e:
+            await self.send_rejection(send, e)
+            return
+        if self.on_admit is not None:
+            self.on_admit()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if self.controller is not None:
+                self.controller.release()
@@ -4,45 +4,160 @@
 # ═══════════════════════════════════════════════════════════════
 
 import os
+import json
 import time
+import asyncio
+from datetime import date
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from contextlib import asynccontextmanager
 
-import torch
-import joblib
 import numpy as np
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, field_validator
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 
 try:
-    from model import StockLSTM
+    from admission import AdmissionController, AdmissionMiddleware, ClientRateLimiter
+    from backends import require_torch
+    from batching import MicroBatcher
+    from executor import InferenceExecutor, configure_torch_threads
+    from prediction_cache import PredictionCache
+    from registry import ModelBundle, ModelRegistry
+    from hot_reload import ModelWatcher
+    from streaming import SessionStore
+    from price_history import PriceHistoryStore
+    import metrics
+    import profiling
+    import wire_format
 except ImportError:
-    from src.model import StockLSTM
+    from src.admission import AdmissionController, AdmissionMiddleware, ClientRateLimiter
+    from src.backends import require_torch
+    from src.batching import MicroBatcher
+    from src.executor import InferenceExecutor, configure_torch_threads
+    from src.prediction_cache import PredictionCache
+    from src.registry import ModelBundle, ModelRegistry
+    from src.hot_reload import ModelWatcher
+    from src.streaming import SessionStore
+    from src.price_history import PriceHistoryStore
+    from src import metrics
+    from src import profiling
+    from src import wire_format
 
 # ══════════════════════════════════════════════════════════════════
 # CONFIGURACAO DE PATHS
 # ══════════════════════════════════════════════════════════════════
 
 BASE_DIR = Path(__file__).parent.parent
-MODELS_DIR = BASE_DIR / "models"
 
-MODEL_PATH = MODELS_DIR / "model_lstm.pth"
-SCALER_PATH = MODELS_DIR / "scaler.pkl"
-CONFIG_PATH = MODELS_DIR / "config.pkl"
+# models/ contém o modelo padrão; models/<TICKER_SLUG>/ contém modelos de outros tickers
+MODELS_DIR = Path(os.environ.get("MODELS_DIR", BASE_DIR / "models"))
+
+# Registro de modelos: limite de modelos residentes (por quantidade e memória)
+MAX_RESIDENT_MODELS = int(os.environ.get("MAX_RESIDENT_MODELS", "8"))
+MAX_MODELS_MEMORY_MB = float(os.environ.get("MAX_MODELS_MEMORY_MB", "0")) or None
+
+# Funde o MinMaxScaler nos pesos do modelo (tira o sklearn do caminho das requisições)
+FUSE_SCALER = os.environ.get("FUSE_SCALER", "1") == "1"
+
+# Backend do forward: eager, torchscript, onnx ou numpy (artefatos gerados por export_model.py)
+# numpy roda sem torch instalado
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "eager")
+
+# Precisão do modelo servido: fp32 ou int8 (artefato gerado por quantization.py)
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "fp32")
+
+# Limite de janelas por requisição no endpoint /predict/batch
+MAX_BATCH_WINDOWS = int(os.environ.get("MAX_BATCH_WINDOWS", "4096"))
+
+# Horizonte máximo (dias à frente) da previsão autorregressiva
+MAX_HORIZON = int(os.environ.get("MAX_HORIZON", "30"))
+
+# Micro-batching do /predict: agrupa requisições concorrentes em um único forward
+# MICROBATCH_MAX_SIZE=1 desativa o agrupamento
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_US = int(os.environ.get("MICROBATCH_MAX_WAIT_US", "1000"))
+
+# Pool de inferência: o forward roda fora do event loop
+# INFERENCE_THREADS vazio = núcleos disponíveis / INFERENCE_WORKERS
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get("INFERENCE_MAX_CONCURRENCY", "0")) or None
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "0")) or None
+
+# Cache de previsões por conteúdo da janela (PREDICTION_CACHE_SIZE=0 desativa)
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", "3600"))
+
+# Hot-reload: intervalo de verificação dos artefatos em models/ (0 = desativado)
+# e token exigido pelo POST /admin/reload (vazio = sem autenticação)
+MODEL_WATCH_INTERVAL_S = float(os.environ.get("MODEL_WATCH_INTERVAL_S", "0"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Streaming: sessões que avançam a LSTM um preço por vez
+# STREAM_RESYNC_STEPS > 0 refaz o forward completo sobre a janela a cada N passos
+STREAM_MAX_SESSIONS = int(os.environ.get("STREAM_MAX_SESSIONS", "10000"))
+STREAM_SESSION_TTL_S = float(os.environ.get("STREAM_SESSION_TTL_S", "900"))
+STREAM_RESYNC_STEPS = int(os.environ.get("STREAM_RESYNC_STEPS", "0"))
+
+# Histórico de preços no servidor: /predict só com o ticker
+# Semeado pelo snapshot (se existir) ou pelos CSVs de data/; PRICE_HISTORY_SNAPSHOT vazio = sem snapshot
+PRICE_HISTORY_CAPACITY = int(os.environ.get("PRICE_HISTORY_CAPACITY", "1024"))
+PRICE_HISTORY_SNAPSHOT = os.environ.get("PRICE_HISTORY_SNAPSHOT", str(BASE_DIR / "data" / "price_history.npz"))
+PRICE_HISTORY_SNAPSHOT_INTERVAL_S = float(os.environ.get("PRICE_HISTORY_SNAPSHOT_INTERVAL_S", "300"))
+
+# Perfil por requisição (header X-Profile ou ?profile=1|torch): etapas no Server-Timing
+# O torch profiler é amostrado e limitado por minuto (PROFILE_TORCH_MAX_PER_MINUTE=0 desativa)
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "1") == "1"
+PROFILE_TORCH_SAMPLE_RATE = float(os.environ.get("PROFILE_TORCH_SAMPLE_RATE", "1.0"))
+PROFILE_TORCH_MAX_PER_MINUTE = float(os.environ.get("PROFILE_TORCH_MAX_PER_MINUTE", "6"))
+PROFILE_TORCH_ROW_LIMIT = int(os.environ.get("PROFILE_TORCH_ROW_LIMIT", "15"))
+
+# Controle de admissão das rotas de previsão (ADMISSION_PATHS, prefixos)
+# Máximo em andamento + fila limitada com prazo → 503 com Retry-After (MAX_IN_FLIGHT=0 desativa)
+# Limite por cliente (X-Client-Id ou IP) → 429 com Retry-After (CLIENT_RATE=0 desativa)
+ADMISSION_PATHS = [p for p in os.environ.get("ADMISSION_PATHS", "/predict,/stream").split(",") if p]
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_MS", "500"))
+ADMISSION_RETRY_AFTER_S = float(os.environ.get("ADMISSION_RETRY_AFTER_S", "1"))
+ADMISSION_CLIENT_RATE = float(os.environ.get("ADMISSION_CLIENT_RATE", "0"))
+ADMISSION_CLIENT_BURST = float(os.environ.get("ADMISSION_CLIENT_BURST", "20"))
+ADMISSION_CLIENT_HEADER = os.environ.get("ADMISSION_CLIENT_HEADER", "X-Client-Id")
 
 # ══════════════════════════════════════════════════════════════════
 # ESTADO GLOBAL DA APLICACAO
 # ══════════════════════════════════════════════════════════════════
 
 class ModelState:
-    """Armazena o estado do modelo carregado."""
-    model: Optional[StockLSTM] = None
-    scaler = None
-    config: Optional[dict] = None
+    """Armazena o estado dos modelos carregados."""
+    registry: Optional[ModelRegistry] = None
     device: str = "cpu"
     is_loaded: bool = False
+    batcher: Optional[MicroBatcher] = None
+    executor: Optional[InferenceExecutor] = None
+    watcher: Optional[ModelWatcher] = None
+    sessions: SessionStore = SessionStore(STREAM_MAX_SESSIONS, STREAM_SESSION_TTL_S)
+    history: PriceHistoryStore = PriceHistoryStore(PRICE_HISTORY_CAPACITY)
+    torch_profiles: profiling.TorchProfileSampler = profiling.TorchProfileSampler(
+        PROFILE_TORCH_SAMPLE_RATE, PROFILE_TORCH_MAX_PER_MINUTE
+    )
+    admission: Optional[AdmissionController] = None
+    rate_limiter: Optional[ClientRateLimiter] = None
+    # Definidos pelo serve.py em cada worker (um só processo: 0 de 1)
+    worker_index: int = 0
+    server_workers: int = 1
+    cache: Optional[PredictionCache] = (
+        PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S)
+        if PREDICTION_CACHE_SIZE > 0 else None
+    )
+    
+    @property
+    def default_bundle(self) -> Optional[ModelBundle]:
+        """Bundle do ticker padrão (None se não carregado)."""
+        if self.registry is None or self.registry.default_ticker is None:
+            return None
+        return self.registry.peek(self.registry.default_ticker)
 
 state = ModelState()
 
@@ -50,6 +165,72 @@ state = ModelState()
 # LIFESPAN (STARTUP/SHUTDOWN)
 # ══════════════════════════════════════════════════════════════════
 
+def detect_device() -> str:
+    """Dispositivo dos modelos (backend numpy: o torch nem é importado)."""
+    torch = None
+    if INFERENCE_BACKEND != "numpy":
+        try:
+            torch = require_torch()
+        except RuntimeError as e:
+            print(f"Aviso: {e}")
+    return "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+
+
+def create_registry() -> ModelRegistry:
+    """
+    Registro de modelos com as opções do ambiente.
+    
+    Chamado pelo lifespan ou, no servidor multi-processo (serve.py), pelo
+    processo pai antes do fork; o callback de descarga é ligado depois, no
+    event loop de cada worker.
+    """
+    return ModelRegistry(
+        MODELS_DIR,
+        device=state.device,
+        max_models=MAX_RESIDENT_MODELS,
+        max_memory_mb=MAX_MODELS_MEMORY_MB,
+        fuse_scaler=FUSE_SCALER,
+        backend=INFERENCE_BACKEND,
+        precision=MODEL_PRECISION
+    )
+
+
+def history_snapshot_path() -> Optional[Path]:
+    """
+    Snapshot gravado por este processo (None = não grava).
+    
+    Com vários workers, só o worker 0 grava: cada worker tem sua cópia do
+    histórico, e gravações de todos no mesmo arquivo se sobrescreveriam.
+    """
+    if not PRICE_HISTORY_SNAPSHOT or state.worker_index != 0:
+        return None
+    return Path(PRICE_HISTORY_SNAPSHOT)
+
+
+def seed_history() -> None:
+    """
+    Carrega o histórico de preços do snapshot ou, sem ele, dos CSVs dos
+    tickers com modelo. Com snapshot, CSVs atualizados depois dele (pelo
+    data_collection.py) acrescentam os fechamentos mais novos. Falhas não
+    impedem o startup: sem histórico, o /predict continua exigindo `prices`.
+    """
+    snapshot = Path(PRICE_HISTORY_SNAPSHOT) if PRICE_HISTORY_SNAPSHOT else None
+    try:
+        if snapshot is not None and snapshot.exists():
+            tickers = state.history.load(snapshot)
+            print(f"Historico de precos restaurado de {snapshot}: {tickers}")
+            updated = state.history.update_from_csv(
+                state.registry.available(), newer_than=snapshot.stat().st_mtime
+            )
+            if updated:
+                print(f"Historico atualizado pelos CSVs mais novos que o snapshot: {updated}")
+        else:
+            tickers = state.history.seed_from_csv(state.registry.available())
+            print(f"Historico de precos semeado pelos CSVs: {tickers}")
+    except Exception as e:
+        print(f"Aviso: historico de precos indisponivel ({e})")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação."""
@@ -59,43 +240,75 @@ async def lifespan(app: FastAPI):
     print("="*60)
     
     try:
-        # Verificar se arquivos existem
-        for path, name in [(MODEL_PATH, "Modelo"), (SCALER_PATH, "Scaler"), (CONFIG_PATH, "Config")]:
-            if not path.exists():
-                raise FileNotFoundError(f"{name} não encontrado: {path}")
-        
-        # Configurar dispositivo
-        state.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Dispositivo e registro já existem se o serve.py pré-carregou o modelo antes do fork
+        if state.registry is None:
+            state.device = detect_device()
         print(f"\nDispositivo: {state.device}")
         
-        # Carregar configurações
-        state.config = joblib.load(CONFIG_PATH)
-        print(f"Config carregado: seq_length={state.config.get('seq_length', 60)}")
+        # Configurar pool de inferência e threads do torch
+        n_threads = configure_torch_threads(
+            INFERENCE_WORKERS, INFERENCE_THREADS, use_torch=INFERENCE_BACKEND != "numpy"
+        )
+        state.executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_MAX_CONCURRENCY)
+        print(f"Pool de inferencia: workers={INFERENCE_WORKERS}, threads/forward={n_threads}")
         
-        # Carregar scaler
-        state.scaler = joblib.load(SCALER_PATH)
-        print(f"Scaler carregado: MinMaxScaler")
+        # Registro de modelos: ao descarregar um modelo, remover suas previsões do cache
+        loop = asyncio.get_running_loop()
         
-        # Carregar modelo
-        checkpoint = torch.load(MODEL_PATH, map_location=state.device, weights_only=False)
-        model_config = checkpoint.get('model_config', {})
+        def on_unload(bundle: ModelBundle) -> None:
+            print(f"Modelo descarregado: {bundle.ticker} (id={bundle.model_id})")
+            if state.cache is not None:
+                loop.call_soon_threadsafe(state.cache.discard_model, bundle.model_id)
         
-        # Criar instância do modelo com a configuração salva
-        state.model = StockLSTM(
-            input_size=model_config.get('input_size', 1),
-            hidden_size=model_config.get('hidden_size', 100),
-            num_layers=model_config.get('num_layers', 2),
-            dropout=model_config.get('dropout', 0.2)
-        )
+        if state.registry is None:
+            state.registry = create_registry()
+        state.registry.on_unload = on_unload
+        if state.registry.default_ticker is None:
+            raise FileNotFoundError(f"Modelo não encontrado em {MODELS_DIR} (model.bundle ou config.pkl)")
         
-        # Carregar pesos
-        state.model.load_state_dict(checkpoint['model_state_dict'])
-        state.model.to(state.device)
-        state.model.eval()
+        # Carregar (se ainda não residente), aquecer e fixar o modelo padrão;
+        # os demais tickers carregam sob demanda
+        bundle = state.registry.get(state.registry.default_ticker)
+        bundle.warmup()
+        state.registry.pin(bundle.ticker)
+        print(f"Config carregado: seq_length={bundle.seq_length}")
+        print(f"Scaler carregado: MinMaxScaler ({'fundido no modelo' if bundle.fused else 'sklearn'})")
+        print(f"Modelo carregado: {bundle.ticker}, hidden_size={bundle.model.hidden_size}, "
+              f"id={bundle.model_id}, backend={bundle.backend.name}, precision={bundle.precision}, "
+              f"formato={bundle.source_format}")
+        print(f"Tickers disponiveis: {state.registry.available()}")
         
         state.is_loaded = True
         
-        print(f"Modelo carregado: hidden_size={model_config.get('hidden_size', 100)}")
+        # Iniciar micro-batching
+        if MICROBATCH_MAX_SIZE > 1:
+            state.batcher = MicroBatcher(
+                run_bundle,
+                max_batch_size=MICROBATCH_MAX_SIZE,
+                max_wait_us=MICROBATCH_MAX_WAIT_US,
+                executor=state.executor
+            )
+            await state.batcher.start()
+            print(f"Micro-batching ativo: max_batch_size={MICROBATCH_MAX_SIZE}, "
+                  f"max_wait_us={MICROBATCH_MAX_WAIT_US}")
+        
+        # Observar models/ e recarregar modelos alterados sem reiniciar
+        if MODEL_WATCH_INTERVAL_S > 0:
+            state.watcher = ModelWatcher(
+                state.registry,
+                interval_s=MODEL_WATCH_INTERVAL_S,
+                on_reload=log_reload
+            )
+            await state.watcher.start()
+            print(f"Hot-reload ativo: verificando {MODELS_DIR} a cada {MODEL_WATCH_INTERVAL_S}s")
+        
+        # Limpeza periódica das sessões de streaming inativas
+        await state.sessions.start(interval_s=min(60.0, STREAM_SESSION_TTL_S or 60.0))
+        
+        # Histórico de preços: snapshot (reinício rápido) ou CSVs de data/
+        seed_history()
+        if history_snapshot_path() is not None and PRICE_HISTORY_SNAPSHOT_INTERVAL_S > 0:
+            await state.history.start(history_snapshot_path(), PRICE_HISTORY_SNAPSHOT_INTERVAL_S)
         print("\n" + "="*60)
         print("API pronta para receber requisicoes!")
         print("="*60 + "\n")
@@ -108,37 +321,137 @@ async def lifespan(app: FastAPI):
     
     # SHUTDOWN
     print("\nEncerrando API...")
+    if state.watcher is not None:
+        await state.watcher.stop()
+        state.watcher = None
+    await state.sessions.stop()
+    await state.history.stop(history_snapshot_path())
+    if state.batcher is not None:
+        await state.batcher.stop()
+        state.batcher = None
+    if state.executor is not None:
+        state.executor.shutdown()
+        state.executor = None
 
 # ══════════════════════════════════════════════════════════════════
 # SCHEMAS (PYDANTIC)
 # ══════════════════════════════════════════════════════════════════
 
-class PredictionRequest(BaseModel):
-    """Schema de entrada para previsão."""
+class PriceWindowRequest(BaseModel):
+    """Schema de entrada com uma janela de preços."""
     prices: List[float] = Field(
         ...,
         description="Lista com os últimos N preços de fechamento (mínimo: seq_length dias)",
         examples=[[25.50, 26.10, 25.80, 26.30, 26.50]]
     )
+    ticker: Optional[str] = Field(
+        default=None,
+        description="Ticker da ação (padrão: ticker do modelo principal)",
+        examples=["PETR4.SA"]
+    )
     
     @field_validator('prices')
     @classmethod
     def validate_prices(cls, v):
+        if v is not None:
+            wire_format.check_prices(np.asarray(v, dtype=np.float64))
+        return v
+
+
+class PredictionRequest(PriceWindowRequest):
+    """Schema de entrada para previsão."""
+    prices: Optional[List[float]] = Field(
+        default=None,
+        description="Últimos N preços de fechamento (mínimo: seq_length dias); "
+                    "ausente = histórico do ticker guardado no servidor",
+        examples=[[25.50, 26.10, 25.80, 26.30, 26.50]]
+    )
+    horizon: int = Field(
+        default=1,
+        ge=1,
+        le=MAX_HORIZON,
+        description="Número de dias à frente (previsão autorregressiva no servidor)"
+    )
+
+
+class BatchPredictionRequest(BaseModel):
+    """Schema de entrada para previsão em lote (várias janelas)."""
+    windows: List[List[float]] = Field(
+        ...,
+        description="Lista de janelas de preços; cada janela precisa de pelo menos seq_length dias",
+        examples=[[[25.50, 26.10, 25.80], [30.20, 30.40, 30.10]]]
+    )
+    tickers: Optional[List[str]] = Field(
+        default=None,
+        description="Ticker de cada janela (opcional, mesmo tamanho de `windows`)"
+    )
+    horizon: int = Field(
+        default=1,
+        ge=1,
+        le=MAX_HORIZON,
+        description="Número de dias à frente para todas as janelas"
+    )
+    
+    @field_validator('windows')
+    @classmethod
+    def validate_windows(cls, v):
         if not v:
-            raise ValueError("Lista de preços não pode estar vazia")
-        if any(p <= 0 for p in v):
-            raise ValueError("Todos os preços devem ser positivos")
+            raise ValueError("Lista de janelas não pode estar vazia")
+        if len(v) > MAX_BATCH_WINDOWS:
+            raise ValueError(f"Máximo de {MAX_BATCH_WINDOWS} janelas por requisição")
+        wire_format.check_windows(v)
         return v
+    
+    @model_validator(mode='after')
+    def validate_tickers(self):
+        if self.tickers is not None and len(self.tickers) != len(self.windows):
+            raise ValueError("`tickers` deve ter o mesmo tamanho de `windows`")
+        return self
 
 
 class PredictionResponse(BaseModel):
     """Schema de saída para previsão."""
     predicted_price: float = Field(..., description="Preço previsto para o próximo dia")
+    predicted_prices: Optional[List[float]] = Field(
+        default=None,
+        description="Trajetória prevista dos próximos `horizon` dias (quando horizon > 1)"
+    )
     currency: str = Field(default="BRL", description="Moeda")
     ticker: str = Field(..., description="Ticker da ação")
     input_days: int = Field(..., description="Quantidade de dias usados na previsão")
+    horizon: int = Field(default=1, description="Número de dias previstos")
+    as_of: Optional[str] = Field(
+        default=None,
+        description="Data do último preço do histórico do servidor (quando `prices` não foi enviado)"
+    )
     processing_time_ms: float = Field(..., description="Tempo de processamento em ms")
     model_info: dict = Field(..., description="Informações do modelo")
+    profile: Optional[dict] = Field(
+        default=None,
+        description="Tempo por etapa (ms) e resumo do torch profiler, quando pedido com X-Profile"
+    )
+
+
+class WindowPrediction(BaseModel):
+    """Previsão de uma janela dentro de um lote."""
+    index: int = Field(..., description="Posição da janela na requisição")
+    ticker: str = Field(..., description="Ticker da ação")
+    predicted_price: float = Field(..., description="Preço previsto para o próximo dia")
+    predicted_prices: Optional[List[float]] = Field(
+        default=None,
+        description="Trajetória prevista dos próximos `horizon` dias (quando horizon > 1)"
+    )
+    input_days: int = Field(..., description="Quantidade de dias usados na previsão")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Schema de saída para previsão em lote."""
+    predictions: List[WindowPrediction] = Field(..., description="Previsões na ordem das janelas")
+    currency: str = Field(default="BRL", description="Moeda")
+    batch_size: int = Field(..., description="Quantidade de janelas processadas")
+    horizon: int = Field(default=1, description="Número de dias previstos por janela")
+    processing_time_ms: float = Field(..., description="Tempo de processamento em ms")
+    model_info: Dict[str, dict] = Field(..., description="Informações do modelo de cada ticker")
 
 
 class HealthResponse(BaseModel):
@@ -148,6 +461,81 @@ class HealthResponse(BaseModel):
     device: str
     ticker: Optional[str] = None
     seq_length: Optional[int] = None
+    model_version: Optional[str] = None
+
+
+class StreamStepRequest(BaseModel):
+    """Schema de entrada de um passo de streaming."""
+    price: float = Field(..., gt=0, description="Novo preço de fechamento", examples=[26.70])
+
+
+class StreamResponse(BaseModel):
+    """Schema de saída do streaming."""
+    session_id: str = Field(..., description="Identificador da sessão")
+    ticker: str = Field(..., description="Ticker da ação")
+    predicted_price: float = Field(..., description="Preço previsto para o próximo passo")
+    steps: int = Field(..., description="Preços recebidos desde a criação da sessão")
+    resynced: bool = Field(default=False, description="Se o estado foi recalculado sobre a janela completa")
+    model_version: str = Field(..., description="Versão do modelo que atende a sessão")
+    processing_time_ms: float = Field(..., description="Tempo de processamento em ms")
+
+
+class ReloadRequest(BaseModel):
+    """Schema de entrada do reload de modelo."""
+    ticker: Optional[str] = Field(
+        default=None,
+        description="Ticker a recarregar (padrão: ticker do modelo principal)"
+    )
+
+
+class ReloadResponse(BaseModel):
+    """Schema de saída do reload de modelo."""
+    ticker: str = Field(..., description="Ticker recarregado")
+    previous_version: Optional[str] = Field(None, description="Versão servida antes do reload")
+    active_version: str = Field(..., description="Versão servida após o reload")
+    changed: bool = Field(..., description="Se a versão ativa mudou")
+    reload_time_ms: float = Field(..., description="Duração total do reload em ms")
+    load_time_ms: float = Field(..., description="Tempo de carga dos artefatos em ms")
+    warmup_time_ms: float = Field(..., description="Tempo do forward de aquecimento em ms")
+
+
+class HistoryAppendRequest(BaseModel):
+    """Schema de entrada de novos fechamentos."""
+    prices: List[float] = Field(
+        ...,
+        min_length=1,
+        description="Novos preços de fechamento, do mais antigo para o mais recente",
+        examples=[[26.70, 26.95]]
+    )
+    dates: Optional[List[date]] = Field(
+        default=None,
+        description="Data de cada fechamento (opcional); datas já presentes no histórico são ignoradas",
+        examples=[["2024-01-02", "2024-01-03"]]
+    )
+    
+    @field_validator('prices')
+    @classmethod
+    def validate_prices(cls, v):
+        wire_format.check_prices(np.asarray(v, dtype=np.float64))
+        return v
+    
+    @model_validator(mode='after')
+    def validate_dates(self):
+        if self.dates is not None and len(self.dates) != len(self.prices):
+            raise ValueError("`dates` deve ter o mesmo tamanho de `prices`")
+        return self
+
+
+class HistoryResponse(BaseModel):
+    """Schema de saída do histórico de preços de um ticker."""
+    ticker: str = Field(..., description="Ticker da ação")
+    count: int = Field(..., description="Preços guardados")
+    capacity: int = Field(..., description="Máximo de preços guardados por ticker")
+    last_price: Optional[float] = Field(None, description="Último fechamento")
+    last_date: Optional[str] = Field(None, description="Data do último fechamento (se informada)")
+    appended: Optional[int] = Field(None, description="Fechamentos acrescentados nesta requisição")
+    ignored: Optional[int] = Field(None, description="Fechamentos ignorados por data já presente")
+    prices: Optional[List[float]] = Field(None, description="Últimos `n` preços (quando pedido)")
 
 
 class ErrorResponse(BaseModel):
@@ -168,8 +556,14 @@ app = FastAPI(
     de fechamento do proximo dia com base nos ultimos 60 dias de historico.
     
     ### Endpoints:
-    - **POST /predict**: Envia precos historicos e recebe a previsao
+    - **POST /predict**: Envia precos historicos (ou so o ticker) e recebe a previsao
+    - **POST /predict/batch**: Envia varias janelas e recebe uma previsao por janela
+    - **GET /models**: Lista os tickers com modelo disponivel
+    - **POST /admin/reload**: Recarrega o modelo sem reiniciar a API
+    - **POST /stream/sessions**: Inicia uma sessao de streaming (um preco por vez)
+    - **POST /history/{ticker}**: Acrescenta fechamentos ao historico guardado no servidor
     - **GET /health**: Verifica o status da API e do modelo
+    - **GET /metrics**: Metricas no formato do Prometheus
     
     ### Tech Challenge - Fase 4
     Pos-graduacao em Machine Learning Engineering
@@ -178,6 +572,455 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# ══════════════════════════════════════════════════════════════════
+# METRICAS
+# ══════════════════════════════════════════════════════════════════
+
+MODEL_LOAD_SECONDS = metrics.REGISTRY.gauge(
+    "model_load_duration_seconds",
+    "Tempo de carregamento dos modelos residentes",
+    ["ticker", "model_id"]
+)
+MODEL_WARMUP_SECONDS = metrics.REGISTRY.gauge(
+    "model_warmup_duration_seconds",
+    "Tempo de aquecimento dos modelos residentes",
+    ["ticker", "model_id"]
+)
+INFERENCE_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "inference_in_flight",
+    "Forwards em execucao no pool de inferencia"
+)
+TORCH_PROFILES = metrics.REGISTRY.counter(
+    "torch_profiles_total",
+    "Pedidos de torch profiler por decisao (ok, not_sampled, rate_limited, busy, unsupported, disabled)",
+    ["status"]
+)
+BATCHER_QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "microbatch_queue_depth",
+    "Requisicoes aguardando na fila do micro-batching"
+)
+ADMISSION_SHED = metrics.REGISTRY.counter(
+    "admission_shed_total",
+    "Requisicoes recusadas pelo controle de admissao (queue_full, deadline, rate_limited)",
+    ["reason"]
+)
+ADMISSION_QUEUE_SECONDS = metrics.REGISTRY.histogram(
+    "admission_queue_seconds",
+    "Tempo de espera na fila de admissao das requisicoes admitidas"
+)
+ADMISSION_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "admission_in_flight",
+    "Requisicoes de previsao em andamento (admitidas)"
+)
+ADMISSION_QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "admission_queue_depth",
+    "Requisicoes aguardando vaga na fila de admissao"
+)
+
+
+def collect_state_metrics() -> None:
+    """Atualiza os gauges que refletem o estado atual (chamado a cada /metrics)."""
+    MODEL_LOAD_SECONDS.clear()
+    MODEL_WARMUP_SECONDS.clear()
+    if state.registry is not None:
+        for ticker, bundle in state.registry.resident().items():
+            MODEL_LOAD_SECONDS.set(bundle.load_time_s, ticker, bundle.model_id)
+            MODEL_WARMUP_SECONDS.set(bundle.warmup_time_s, ticker, bundle.model_id)
+    INFERENCE_IN_FLIGHT.set(state.executor.active if state.executor is not None else 0)
+    BATCHER_QUEUE_DEPTH.set(state.batcher.stats()["queue_depth"] if state.batcher is not None else 0)
+    ADMISSION_IN_FLIGHT.set(state.admission.in_flight if state.admission is not None else 0)
+    ADMISSION_QUEUE_DEPTH.set(state.admission.queue_depth if state.admission is not None else 0)
+
+
+metrics.REGISTRY.add_collector(collect_state_metrics)
+
+# ══════════════════════════════════════════════════════════════════
+# CONTROLE DE ADMISSAO
+# ══════════════════════════════════════════════════════════════════
+
+if ADMISSION_MAX_IN_FLIGHT > 0:
+    state.admission = AdmissionController(
+        max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout_s=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        retry_after_s=ADMISSION_RETRY_AFTER_S,
+        on_shed=ADMISSION_SHED.inc,
+        on_wait=ADMISSION_QUEUE_SECONDS.observe
+    )
+if ADMISSION_CLIENT_RATE > 0:
+    state.rate_limiter = ClientRateLimiter(
+        ADMISSION_CLIENT_RATE, ADMISSION_CLIENT_BURST, on_shed=ADMISSION_SHED.inc
+    )
+
+# Recusa cedo (antes de ler o corpo) o que passar dos limites; a etapa
+# `validation` das métricas começa na admissão, fora do tempo de fila
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=state.admission,
+    rate_limiter=state.rate_limiter,
+    paths=ADMISSION_PATHS,
+    client_header=ADMISSION_CLIENT_HEADER,
+    on_admit=metrics.mark_admitted
+)
+
+# Contadores por rota/status, latência total e requisições em andamento
+# (e o perfil por etapa das requisições com X-Profile); por fora do
+# controle de admissão, para contar também as respostas 429/503
+app.add_middleware(metrics.MetricsMiddleware, profiling=PROFILE_ENABLED)
+
+# ══════════════════════════════════════════════════════════════════
+# FORMATOS DO CORPO (JSON / FLOAT32 / MSGPACK)
+# ══════════════════════════════════════════════════════════════════
+
+def parse_horizon(value) -> int:
+    """Horizonte vindo da query string ou do msgpack (validado como no schema)."""
+    try:
+        horizon = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("horizon deve ser um inteiro")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon deve estar entre 1 e {MAX_HORIZON}")
+    return horizon
+
+
+def parse_tickers(value, n_windows: int) -> Optional[List[str]]:
+    """Tickers do lote: lista (msgpack) ou separados por vírgula (query string)."""
+    if value is None:
+        return None
+    tickers = value.split(",") if isinstance(value, str) else value
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("`tickers` deve ser uma lista de textos")
+    if len(tickers) != n_windows:
+        raise ValueError("`tickers` deve ter o mesmo tamanho de `windows`")
+    return tickers
+
+
+async def read_body(request: Request) -> tuple:
+    """
+    Formato (Content-Type) e corpo da requisição.
+
+    Raises:
+        HTTPException: 415 para Content-Type não suportado
+    """
+    try:
+        fmt = wire_format.request_format(request.headers.get("content-type"))
+    except wire_format.UnsupportedMediaType as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    return fmt, await request.body()
+
+
+def validation_error(e: ValidationError) -> RequestValidationError:
+    """Erro do pydantic no mesmo formato da validação automática do FastAPI (422)."""
+    return RequestValidationError(
+        [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+    )
+
+
+def validate_profiled(model: type, fields, clock: profiling.ProfileClock) -> BaseModel:
+    """
+    Validação pydantic de campos já decodificados, com a etapa `parse`
+    (JSON/msgpack → objetos Python) separada da `validate` no perfil.
+    
+    Sem perfil, o JSON segue por model_validate_json, que faz as duas de uma vez.
+    """
+    clock.lap("parse")
+    parsed = model.model_validate(fields)
+    clock.lap("validate")
+    return parsed
+
+
+async def parse_prediction_request(request: Request) -> PredictionRequest:
+    """
+    Corpo do /predict em JSON, float32 cru ou msgpack.
+
+    - application/json: schema PredictionRequest (parse e validação no pydantic-core)
+    - application/octet-stream: preços em float32 little-endian; `ticker` e
+      `horizon` na query string (corpo vazio = histórico do servidor)
+    - application/x-msgpack: mesmos campos do JSON; `prices` pode ser bytes float32
+
+    Os preços binários são validados de uma vez em NumPy e não viram uma
+    lista de floats do Python.
+    """
+    clock = profiling.ProfileClock()
+    fmt, body = await read_body(request)
+    clock.lap("receive")
+    try:
+        if fmt == "json":
+            if not clock.active:
+                return PredictionRequest.model_validate_json(body)
+            return validate_profiled(PredictionRequest, json.loads(body), clock)
+        if fmt == "msgpack":
+            fields = wire_format.decode_msgpack(body)
+            if not isinstance(fields.get("prices"), bytes):
+                return validate_profiled(PredictionRequest, fields, clock)
+            prices = wire_format.decode_float32(fields["prices"])
+        else:
+            fields = request.query_params
+            # Corpo vazio: previsão pelo histórico do servidor
+            prices = wire_format.decode_float32(body) if body else None
+        clock.lap("parse")
+        
+        ticker = fields.get("ticker")
+        if ticker is not None and not isinstance(ticker, str):
+            raise ValueError("`ticker` deve ser um texto")
+        parsed = PredictionRequest.model_construct(
+            prices=wire_format.check_prices(prices) if prices is not None else None,
+            ticker=ticker,
+            horizon=parse_horizon(fields.get("horizon", 1))
+        )
+        clock.lap("validate")
+        return parsed
+    except ValidationError as e:
+        raise validation_error(e)
+    except ValueError as e:
+        raise RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": str(e), "input": None}])
+
+
+async def parse_batch_request(request: Request) -> BatchPredictionRequest:
+    """
+    Corpo do /predict/batch em JSON, float32 cru ou msgpack.
+
+    - application/octet-stream: janelas (n, window_length) em float32
+      little-endian; `window_length` (obrigatório), `tickers` (separados por
+      vírgula) e `horizon` na query string
+    - application/x-msgpack: mesmos campos do JSON; `windows` pode ser bytes
+      float32 com `window_length`
+    """
+    clock = profiling.ProfileClock()
+    fmt, body = await read_body(request)
+    clock.lap("receive")
+    try:
+        if fmt == "json":
+            if not clock.active:
+                return BatchPredictionRequest.model_validate_json(body)
+            return validate_profiled(BatchPredictionRequest, json.loads(body), clock)
+        if fmt == "msgpack":
+            fields = wire_format.decode_msgpack(body)
+            if not isinstance(fields.get("windows"), bytes):
+                return validate_profiled(BatchPredictionRequest, fields, clock)
+            raw = fields["windows"]
+        else:
+            fields = request.query_params
+            raw = body
+        
+        if fields.get("window_length") is None:
+            raise ValueError("`window_length` é obrigatório no formato binário")
+        windows = wire_format.decode_float32(raw, int(fields["window_length"]))
+        clock.lap("parse")
+        if not 0 < len(windows) <= MAX_BATCH_WINDOWS:
+            raise ValueError(f"Envie de 1 a {MAX_BATCH_WINDOWS} janelas por requisição")
+        wire_format.check_windows(windows)
+        parsed = BatchPredictionRequest.model_construct(
+            windows=windows,
+            tickers=parse_tickers(fields.get("tickers"), len(windows)),
+            horizon=parse_horizon(fields.get("horizon", 1))
+        )
+        clock.lap("validate")
+        return parsed
+    except ValidationError as e:
+        raise validation_error(e)
+    except ValueError as e:
+        raise RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": str(e), "input": None}])
+
+
+def encode_prediction(
+    response: Optional[BaseModel],
+    accept: Optional[str],
+    paths: np.ndarray,
+    headers: Dict[str, str]
+):
+    """
+    Resposta no formato pedido pelo Accept (JSON por padrão).
+
+    - application/json: o próprio schema (response_model)
+    - application/x-msgpack: os mesmos campos do JSON
+    - application/octet-stream: previsões (n, horizon) em float32
+      little-endian; metadados nos headers X-*
+    """
+    fmt = wire_format.negotiate(accept)
+    if fmt == "json":
+        return response
+    if fmt == "msgpack":
+        content = wire_format.encode_msgpack(response.model_dump())
+        return Response(content, media_type=wire_format.MSGPACK_CONTENT_TYPE, headers={"Vary": "Accept"})
+    return Response(
+        wire_format.encode_float32(np.round(paths, 2)),
+        media_type=wire_format.BINARY_CONTENT_TYPE,
+        headers={"Vary": "Accept", **headers}
+    )
+
+
+def binary_headers(response: PredictionResponse, bundle: ModelBundle) -> Dict[str, str]:
+    """Metadados do /predict na resposta float32 (o corpo tem só as previsões)."""
+    return {
+        "X-Ticker": response.ticker,
+        "X-Horizon": str(response.horizon),
+        "X-Model-Id": bundle.model_id,
+        "X-Processing-Time-Ms": f"{response.processing_time_ms:.2f}",
+        **({"X-As-Of": response.as_of} if response.as_of else {})
+    }
+
+
+def request_body_docs(model: type) -> dict:
+    """Corpo da requisição no OpenAPI: schema JSON e os formatos binários."""
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                wire_format.JSON_CONTENT_TYPE: {"schema": model.model_json_schema()},
+                wire_format.BINARY_CONTENT_TYPE: binary,
+                wire_format.MSGPACK_CONTENT_TYPE: binary
+            }
+        }
+    }
+
+
+BINARY_RESPONSES = {
+    wire_format.BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    wire_format.MSGPACK_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}
+}
+
+# ══════════════════════════════════════════════════════════════════
+# INFERENCIA
+# ══════════════════════════════════════════════════════════════════
+
+def run_bundle(bundle: ModelBundle, windows: np.ndarray) -> np.ndarray:
+    """Forward vetorizado de várias janelas (executado no pool de inferência)."""
+    return bundle.predict(windows)
+
+
+def log_reload(old: Optional[ModelBundle], new: ModelBundle, duration_s: float) -> None:
+    """Registra no log a troca de versão de um modelo."""
+    previous = old.version if old is not None else None
+    print(f"Modelo recarregado: {new.ticker} {previous} -> {new.version} "
+          f"({duration_s * 1000:.1f} ms)")
+
+
+def ensure_loaded() -> None:
+    """Retorna 503 se o modelo padrão não foi carregado no startup."""
+    if not state.is_loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não está carregado. Verifique os logs do servidor."
+        )
+
+
+async def get_bundle(ticker: Optional[str] = None) -> ModelBundle:
+    """
+    Retorna o bundle do ticker, carregando-o fora do event loop no primeiro uso.
+    
+    Args:
+        ticker: Ticker da ação (None = ticker padrão)
+    """
+    ticker = ticker or state.registry.default_ticker
+    
+    bundle = state.registry.peek(ticker)
+    if bundle is not None:
+        return bundle
+    
+    try:
+        return await asyncio.to_thread(state.registry.get, ticker)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nenhum modelo disponível para o ticker {ticker}. "
+                   f"Disponíveis: {state.registry.available()}"
+        )
+
+
+async def run_inference(bundle: ModelBundle, fn, *args):
+    """
+    Executa fn(*args) no pool de inferência.
+    
+    Se a requisição pediu `X-Profile: torch` e o amostrador liberou, o
+    forward roda sob o torch profiler e o resumo vai para o perfil dela.
+    """
+    profile = profiling.current_profile()
+    if profile is None or not profile.wants_torch:
+        return await state.executor.run(fn, *args)
+    
+    if bundle.backend.name not in ("eager", "torchscript"):
+        profile.torch = {"status": "unsupported", "detail": f"backend {bundle.backend.name} não usa o torch"}
+        TORCH_PROFILES.inc("unsupported")
+        return await state.executor.run(fn, *args)
+    
+    granted, reason = state.torch_profiles.acquire()
+    TORCH_PROFILES.inc(reason)
+    if not granted:
+        profile.torch = {"status": reason}
+        return await state.executor.run(fn, *args)
+    
+    # O custo do próprio profiler (inclusive a inicialização na primeira vez)
+    # fica na etapa torch_profiler, fora das etapas do forward
+    staged = sum(profile.stages.values())
+    start = time.perf_counter()
+    try:
+        result, summary = await state.executor.run(
+            profiling.run_with_torch_profiler, fn, args, PROFILE_TORCH_ROW_LIMIT, state.device == "cuda"
+        )
+    finally:
+        state.torch_profiles.release()
+    inner = sum(profile.stages.values()) - staged
+    profile.add("torch_profiler", max(0.0, time.perf_counter() - start - inner))
+    profile.torch = {"status": "ok", "summary": summary}
+    return result
+
+
+def history_window(bundle: ModelBundle) -> tuple:
+    """
+    Últimos seq_length preços do histórico do servidor (view do buffer, sem cópia).
+    
+    Returns:
+        (janela, data do último preço)
+    """
+    try:
+        return state.history.window(bundle.ticker, bundle.seq_length)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sem histórico para o ticker {bundle.ticker}; envie `prices` "
+                   f"ou acrescente fechamentos em /history/{bundle.ticker}"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{bundle.ticker}: {e}")
+
+
+async def predict_windows_cached(bundle: ModelBundle, windows: np.ndarray) -> np.ndarray:
+    """
+    Previsão de várias janelas com consulta ao cache.
+    
+    Apenas as janelas ausentes do cache passam pelo forward (um único
+    forward vetorizado no pool de inferência).
+    
+    Args:
+        bundle: Modelo que atende as janelas
+        windows: Array (n, seq_length) com preços em R$
+        
+    Returns:
+        Array (n,) com os preços previstos em R$
+    """
+    predicted_prices = np.empty(len(windows))
+    missing = np.arange(len(windows))
+    
+    # Requisições com perfil medem o forward de todas as janelas
+    use_cache = state.cache is not None and profiling.current_profile() is None
+    if use_cache:
+        keys = [state.cache.make_key(bundle.model_id, window) for window in windows]
+        cached = [state.cache.get(key) for key in keys]
+        missing = np.array([i for i, value in enumerate(cached) if value is None], dtype=int)
+        for i, value in enumerate(cached):
+            if value is not None:
+                predicted_prices[i] = value
+    
+    if len(missing):
+        predicted_prices[missing] = await run_inference(bundle, run_bundle, bundle, windows[missing])
+        if use_cache:
+            for i in missing:
+                state.cache.put(keys[i], float(predicted_prices[i]), bundle.model_id)
+    
+    return predicted_prices
+
 # ══════════════════════════════════════════════════════════════════
 # ENDPOINTS
 # ══════════════════════════════════════════════════════════════════
@@ -190,13 +1033,15 @@ app = FastAPI(
     description="Verifica se a API está funcionando e o modelo está carregado."
 )
 async def health_check():
-    """Retorna o status da API e do modelo."""
+    """Retorna o status da API e do modelo padrão."""
+    bundle = state.default_bundle
     return HealthResponse(
         status="healthy" if state.is_loaded else "unhealthy",
         model_loaded=state.is_loaded,
         device=state.device,
-        ticker=state.config.get('ticker') if state.config else None,
-        seq_length=state.config.get('seq_length') if state.config else None
+        ticker=bundle.ticker if bundle else None,
+        seq_length=bundle.seq_length if bundle else None,
+        model_version=bundle.version if bundle else None
     )
 
 
@@ -207,68 +1052,115 @@ async def health_check():
     summary="Prever Próximo Preço",
     description="Recebe uma lista de preços históricos e retorna a previsão do próximo dia.",
     responses={
+        200: {"content": BINARY_RESPONSES},
         400: {"model": ErrorResponse, "description": "Dados inválidos"},
+        404: {"model": ErrorResponse, "description": "Ticker sem modelo"},
+        415: {"model": ErrorResponse, "description": "Content-Type não suportado"},
         503: {"model": ErrorResponse, "description": "Modelo não carregado"}
-    }
+    },
+    openapi_extra=request_body_docs(PredictionRequest)
 )
-async def predict(request: PredictionRequest):
+@metrics.instrument
+async def predict(
+    request: PredictionRequest = Depends(parse_prediction_request),
+    accept: Optional[str] = Header(default=None)
+):
     """
     Realiza a previsão do preço do próximo dia.
     
     - **prices**: Lista com pelo menos `seq_length` (60) preços de fechamento
+      (opcional; ausente = histórico do ticker guardado no servidor)
+    - **ticker**: Ticker da ação (opcional; padrão: ticker do modelo principal)
+    - **horizon**: Dias à frente (opcional; padrão: 1)
+    
+    Retorna o preço previsto para o próximo dia útil e, com `horizon` > 1,
+    a trajetória dos próximos dias em `predicted_prices`.
+    
+    O corpo também pode ser float32 cru ou msgpack (Content-Type), e a
+    resposta segue o Accept (JSON por padrão).
     
-    Retorna o preço previsto para o próximo dia útil.
+    Com `X-Profile: 1` (ou `?profile=1`), a resposta traz o tempo de cada
+    etapa em `profile` e no header Server-Timing; com `torch`, também o
+    resumo do torch profiler (amostrado). Requisições com perfil não usam
+    o cache nem o micro-batching, para que as etapas sejam só delas.
     """
     start_time = time.time()
+    profile = profiling.current_profile()
     
     # Verificar se modelo está carregado
-    if not state.is_loaded:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Modelo não está carregado. Verifique os logs do servidor."
-        )
+    ensure_loaded()
+    bundle = await get_bundle(request.ticker)
     
-    seq_length = state.config.get('seq_length', 60)
+    seq_length = bundle.seq_length
+    as_of = None
     
-    # Validar quantidade de preços
-    if len(request.prices) < seq_length:
+    if request.prices is None:
+        # Sem preços: últimos seq_length do histórico do servidor
+        prices, as_of = history_window(bundle)
+    elif len(request.prices) < seq_length:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Necessário pelo menos {seq_length} preços históricos. Recebido: {len(request.prices)}"
         )
+    else:
+        # Pegar os últimos seq_length preços
+        prices = np.array(request.prices[-seq_length:])
     
     try:
-        # Pegar os últimos seq_length preços
-        prices = np.array(request.prices[-seq_length:]).reshape(-1, 1)
+        predicted_path = None
         
-        # Normalizar usando o scaler treinado
-        prices_scaled = state.scaler.transform(prices)
+        # Vários dias: rollout autorregressivo no servidor (um forward + horizon-1 passos)
+        if request.horizon > 1:
+            predicted_path = (await run_inference(
+                bundle, bundle.predict_path, prices.reshape(1, -1), request.horizon
+            ))[0]
+            response = PredictionResponse(
+                predicted_price=round(float(predicted_path[0]), 2),
+                predicted_prices=[round(float(p), 2) for p in predicted_path],
+                currency="BRL",
+                ticker=bundle.ticker,
+                input_days=seq_length,
+                horizon=request.horizon,
+                as_of=as_of,
+                processing_time_ms=round((time.time() - start_time) * 1000, 2),
+                model_info=bundle.info(),
+                profile=profile.report() if profile is not None else None
+            )
+            return encode_prediction(
+                response, accept, predicted_path.reshape(1, -1), binary_headers(response, bundle)
+            )
         
-        # Converter para tensor PyTorch
-        X = torch.FloatTensor(prices_scaled).unsqueeze(0).to(state.device)
+        # Janelas repetidas são respondidas pelo cache sem executar o forward
+        use_cache = state.cache is not None and profile is None
+        cache_key = state.cache.make_key(bundle.model_id, prices) if use_cache else None
+        predicted_price = state.cache.get(cache_key) if cache_key is not None else None
         
-        # Fazer previsão
-        with torch.no_grad():
-            prediction_scaled = state.model(X).cpu().numpy()
-        
-        # Reverter normalização para obter preço em R$
-        predicted_price = state.scaler.inverse_transform(prediction_scaled)[0][0]
+        # Normalizar, prever e reverter normalização
+        # (agrupado com requisições concorrentes quando o micro-batching está ativo)
+        if predicted_price is None:
+            if state.batcher is not None and profile is None:
+                predicted_price = await state.batcher.submit(bundle, prices)
+            else:
+                predicted_price = (await run_inference(bundle, run_bundle, bundle, prices.reshape(1, -1)))[0]
+            
+            if cache_key is not None:
+                state.cache.put(cache_key, float(predicted_price), bundle.model_id)
         
         # Calcular tempo de processamento
         processing_time = (time.time() - start_time) * 1000
         
-        return PredictionResponse(
+        response = PredictionResponse(
             predicted_price=round(float(predicted_price), 2),
             currency="BRL",
-            ticker=state.config.get('ticker', 'PETR4.SA'),
+            ticker=bundle.ticker,
             input_days=seq_length,
+            as_of=as_of,
             processing_time_ms=round(processing_time, 2),
-            model_info={
-                "type": "LSTM",
-                "hidden_size": state.model.hidden_size,
-                "num_layers": state.model.num_layers,
-                "device": state.device
-            }
+            model_info=bundle.info(),
+            profile=profile.report() if profile is not None else None
+        )
+        return encode_prediction(
+            response, accept, np.array([[predicted_price]]), binary_headers(response, bundle)
         )
         
     except Exception as e:
@@ -278,6 +1170,488 @@ async def predict(request: PredictionRequest):
         )
 
 
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    tags=["Previsão"],
+    summary="Prever Próximo Preço em Lote",
+    description="Recebe várias janelas de preços e retorna a previsão de cada uma (um forward por ticker).",
+    responses={
+        200: {"content": BINARY_RESPONSES},
+        400: {"model": ErrorResponse, "description": "Dados inválidos"},
+        404: {"model": ErrorResponse, "description": "Ticker sem modelo"},
+        415: {"model": ErrorResponse, "description": "Content-Type não suportado"},
+        503: {"model": ErrorResponse, "description": "Modelo não carregado"}
+    },
+    openapi_extra=request_body_docs(BatchPredictionRequest)
+)
+@metrics.instrument
+async def predict_batch(
+    request: BatchPredictionRequest = Depends(parse_batch_request),
+    accept: Optional[str] = Header(default=None)
+):
+    """
+    Realiza a previsão do preço do próximo dia para várias janelas.
+    
+    - **windows**: Lista de janelas, cada uma com pelo menos `seq_length` (60) preços
+    - **tickers**: Ticker de cada janela (opcional; padrão: ticker do modelo principal)
+    - **horizon**: Dias à frente para todas as janelas (opcional; padrão: 1)
+    
+    Retorna uma previsão por janela, na mesma ordem da requisição.
+    
+    Em float32 cru, as janelas chegam como um array (n, window_length) e a
+    resposta binária é o array (n, horizon) de previsões.
+    """
+    start_time = time.time()
+    
+    ensure_loaded()
+    
+    # Agrupar janelas por ticker: um forward vetorizado por modelo
+    tickers = request.tickers or [state.registry.default_ticker] * len(request.windows)
+    groups: Dict[str, List[int]] = {}
+    for i, ticker in enumerate(tickers):
+        groups.setdefault(ticker, []).append(i)
+    
+    bundles = {ticker: await get_bundle(ticker) for ticker in groups}
+    
+    # Validar quantidade de preços de cada janela
+    short = [
+        i for ticker, indices in groups.items() for i in indices
+        if len(request.windows[i]) < bundles[ticker].seq_length
+    ]
+    if short:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Necessário pelo menos seq_length preços históricos por janela. "
+                   f"Janelas com menos: {sorted(short)[:10]}"
+        )
+    
+    try:
+        horizon = request.horizon
+        predicted_paths = np.empty((len(request.windows), horizon))
+        input_days = np.empty(len(request.windows), dtype=int)
+        
+        for ticker, indices in groups.items():
+            bundle = bundles[ticker]
+            
+            # Empilhar os últimos seq_length preços de cada janela: (n, seq_length)
+            if isinstance(request.windows, np.ndarray):
+                windows = request.windows[indices, -bundle.seq_length:]
+            else:
+                windows = np.array([request.windows[i][-bundle.seq_length:] for i in indices])
+            
+            if horizon == 1:
+                predicted_paths[indices, 0] = await predict_windows_cached(bundle, windows)
+            else:
+                # Rollout autorregressivo em lote para todas as janelas do ticker
+                predicted_paths[indices] = await run_inference(bundle, bundle.predict_path, windows, horizon)
+            input_days[indices] = bundle.seq_length
+        
+        processing_time = (time.time() - start_time) * 1000
+        
+        if wire_format.negotiate(accept) == "binary":
+            # Sem montar um objeto por janela: só o array de previsões
+            return encode_prediction(None, accept, predicted_paths, {
+                "X-Batch-Size": str(len(predicted_paths)),
+                "X-Horizon": str(horizon),
+                "X-Processing-Time-Ms": f"{processing_time:.2f}"
+            })
+        
+        response = BatchPredictionResponse(
+            predictions=[
+                WindowPrediction(
+                    index=i,
+                    ticker=bundles[ticker].ticker,
+                    predicted_price=round(float(path[0]), 2),
+                    predicted_prices=[round(float(p), 2) for p in path] if horizon > 1 else None,
+                    input_days=int(days)
+                )
+                for i, (ticker, path, days) in enumerate(zip(tickers, predicted_paths, input_days))
+            ],
+            currency="BRL",
+            batch_size=len(predicted_paths),
+            horizon=horizon,
+            processing_time_ms=round(processing_time, 2),
+            model_info={ticker: bundle.info() for ticker, bundle in bundles.items()}
+        )
+        return encode_prediction(response, accept, predicted_paths, {})
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar previsão em lote: {str(e)}"
+        )
+
+
+@app.get(
+    "/models",
+    tags=["Status"],
+    summary="Modelos Disponíveis",
+    description="Tickers com modelo em disco, modelos residentes em memória e contadores do registro."
+)
+async def list_models():
+    """Retorna os tickers disponíveis e o estado do registro de modelos."""
+    ensure_loaded()
+    available = await asyncio.to_thread(state.registry.available)
+    return {"available": available, **state.registry.stats()}
+
+
+@app.post(
+    "/stream/sessions",
+    response_model=StreamResponse,
+    tags=["Streaming"],
+    summary="Iniciar Sessão de Streaming",
+    description="Processa a janela inicial e guarda o estado da LSTM para avançar um preço por vez.",
+    responses={
+        400: {"model": ErrorResponse, "description": "Dados inválidos"},
+        404: {"model": ErrorResponse, "description": "Ticker sem modelo"},
+        503: {"model": ErrorResponse, "description": "Modelo não carregado"}
+    }
+)
+@metrics.instrument
+async def create_stream_session(request: PriceWindowRequest):
+    """
+    Cria uma sessão de streaming a partir dos últimos `seq_length` preços.
+    
+    Os próximos preços são enviados um a um em `/stream/sessions/{session_id}/step`,
+    cada um custando um único passo recorrente da LSTM.
+    """
+    start_time = time.time()
+    
+    ensure_loaded()
+    bundle = await get_bundle(request.ticker)
+    
+    if len(request.prices) < bundle.seq_length:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Necessário pelo menos {bundle.seq_length} preços históricos. Recebido: {len(request.prices)}"
+        )
+    
+    window = np.array(request.prices[-bundle.seq_length:])
+    session = state.sessions.create(bundle, window)
+    
+    async with session.lock:
+        session.predicted_price, session.hidden = await state.executor.run(bundle.start_stream, window)
+    
+    return StreamResponse(
+        session_id=session.session_id,
+        ticker=bundle.ticker,
+        predicted_price=round(session.predicted_price, 2),
+        steps=session.steps,
+        model_version=bundle.version,
+        processing_time_ms=round((time.time() - start_time) * 1000, 2)
+    )
+
+
+@app.post(
+    "/stream/sessions/{session_id}/step",
+    response_model=StreamResponse,
+    tags=["Streaming"],
+    summary="Avançar Sessão de Streaming",
+    description="Recebe um novo preço e avança a LSTM um único passo a partir do estado salvo.",
+    responses={404: {"model": ErrorResponse, "description": "Sessão inexistente ou expirada"}}
+)
+@metrics.instrument
+async def step_stream_session(session_id: str, request: StreamStepRequest):
+    """
+    Avança a sessão com um novo preço e retorna a previsão do próximo.
+    
+    A sessão continua no modelo com que foi criada, mesmo após um reload.
+    """
+    start_time = time.time()
+    
+    try:
+        session = state.sessions.get(session_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sessão {session_id} não encontrada ou expirada"
+        )
+    
+    bundle = session.bundle
+    resynced = False
+    
+    async with session.lock:
+        # O passo é calculado antes de alterar a sessão: se o forward falhar
+        # ou a requisição for cancelada, preço, contadores e estado ficam
+        # como estavam e continuam consistentes entre si
+        if STREAM_RESYNC_STEPS > 0 and session.steps_since_sync + 1 >= STREAM_RESYNC_STEPS:
+            # Recalcular o estado sobre os últimos seq_length preços
+            window = np.append(session.window(), request.price)[-len(session.prices):]
+            predicted_price, hidden = await state.executor.run(bundle.start_stream, window)
+            resynced = True
+        else:
+            predicted_price, hidden = await state.executor.run(
+                bundle.step_stream, request.price, session.hidden
+            )
+        
+        session.prices.append(request.price)
+        session.predicted_price, session.hidden = predicted_price, hidden
+        session.steps += 1
+        session.steps_since_sync = 0 if resynced else session.steps_since_sync + 1
+    
+    return StreamResponse(
+        session_id=session.session_id,
+        ticker=bundle.ticker,
+        predicted_price=round(session.predicted_price, 2),
+        steps=session.steps,
+        resynced=resynced,
+        model_version=bundle.version,
+        processing_time_ms=round((time.time() - start_time) * 1000, 2)
+    )
+
+
+@app.delete(
+    "/stream/sessions/{session_id}",
+    tags=["Streaming"],
+    summary="Encerrar Sessão de Streaming",
+    description="Remove a sessão e libera seu estado.",
+    responses={404: {"model": ErrorResponse, "description": "Sessão inexistente ou expirada"}}
+)
+async def delete_stream_session(session_id: str):
+    """Encerra uma sessão de streaming."""
+    if not state.sessions.delete(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sessão {session_id} não encontrada ou expirada"
+        )
+    return {"session_id": session_id, "deleted": True}
+
+
+def history_response(ticker: str, **extra) -> HistoryResponse:
+    ring = state.history.get(ticker)
+    return HistoryResponse(
+        ticker=ticker,
+        count=ring.count,
+        capacity=ring.capacity,
+        last_price=ring.last_price,
+        last_date=ring.last_date,
+        **extra
+    )
+
+
+@app.post(
+    "/history/{ticker}",
+    response_model=HistoryResponse,
+    tags=["Histórico"],
+    summary="Acrescentar Fechamentos",
+    description="Acrescenta novos preços de fechamento ao histórico do ticker guardado no servidor.",
+    responses={
+        401: {"model": ErrorResponse, "description": "Token inválido"},
+        404: {"model": ErrorResponse, "description": "Ticker sem modelo"},
+        409: {"model": ErrorResponse, "description": "Servidor com mais de um worker"}
+    }
+)
+@metrics.instrument
+async def append_history(
+    ticker: str,
+    request: HistoryAppendRequest,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Acrescenta fechamentos ao histórico; o /predict sem `prices` passa a usá-los.
+    
+    Com `dates`, fechamentos com data igual ou anterior à do último guardado
+    são ignorados (reenviar o mesmo fechamento não o duplica).
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de administração inválido"
+        )
+    ensure_loaded()
+    
+    # Cada worker tem seu histórico: o fechamento chegaria a um só deles
+    if state.server_workers > 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Histórico em memória por worker ({state.server_workers} workers): "
+                   f"use SERVER_WORKERS=1 para acrescentar fechamentos"
+        )
+    
+    # Só tickers com modelo ganham histórico (limita a memória)
+    if ticker not in state.history:
+        try:
+            await asyncio.to_thread(state.registry.resolve_dir, ticker)
+        except KeyError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nenhum modelo disponível para o ticker {ticker}"
+            )
+    
+    try:
+        appended, ignored = state.history.append(ticker, np.array(request.prices), request.dates)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return history_response(ticker, appended=appended, ignored=ignored)
+
+
+@app.get(
+    "/history/{ticker}",
+    response_model=HistoryResponse,
+    tags=["Histórico"],
+    summary="Histórico de Preços",
+    description="Estado do histórico do ticker e, com `n`, os últimos n preços.",
+    responses={404: {"model": ErrorResponse, "description": "Ticker sem histórico"}}
+)
+async def get_history(ticker: str, n: int = 0):
+    """Retorna o estado do histórico do ticker (e os últimos `n` preços)."""
+    if ticker not in state.history:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sem histórico para o ticker {ticker}"
+        )
+    ring = state.history.get(ticker)
+    prices = ring.window(min(max(n, 0), ring.count)).tolist() if n > 0 else None
+    return history_response(ticker, prices=prices)
+
+
+@app.post(
+    "/admin/reload",
+    response_model=ReloadResponse,
+    tags=["Admin"],
+    summary="Recarregar Modelo",
+    description="Carrega modelo, scaler e config do disco, aquece e troca atomicamente o modelo servido.",
+    responses={
+        401: {"model": ErrorResponse, "description": "Token inválido"},
+        404: {"model": ErrorResponse, "description": "Ticker sem modelo"},
+        500: {"model": ErrorResponse, "description": "Falha ao carregar os artefatos"}
+    }
+)
+async def reload_model(
+    request: ReloadRequest = ReloadRequest(),
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Recarrega o modelo de um ticker sem derrubar o tráfego.
+    
+    O carregamento e o aquecimento rodam fora do event loop; requisições
+    em andamento terminam na versão anterior.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de administração inválido"
+        )
+    ensure_loaded()
+    
+    ticker = request.ticker or state.registry.default_ticker
+    start_time = time.time()
+    
+    try:
+        old, new = await asyncio.to_thread(state.registry.reload, ticker)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nenhum modelo disponível para o ticker {ticker}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao recarregar modelo, versão anterior mantida: {str(e)}"
+        )
+    
+    reload_time = time.time() - start_time
+    log_reload(old, new, reload_time)
+    
+    return ReloadResponse(
+        ticker=new.ticker,
+        previous_version=old.version if old is not None else None,
+        active_version=new.version,
+        changed=old is None or old.version != new.version,
+        reload_time_ms=round(reload_time * 1000, 2),
+        load_time_ms=round(new.load_time_s * 1000, 2),
+        warmup_time_ms=round(new.warmup_time_s * 1000, 2)
+    )
+
+
+@app.get(
+    "/stats/batching",
+    tags=["Status"],
+    summary="Estatísticas do Micro-batching",
+    description="Profundidade da fila e distribuição dos tamanhos de lote do /predict."
+)
+async def batching_stats():
+    """Retorna as estatísticas do coalescedor de requisições."""
+    if state.batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.batcher.stats()}
+
+
+@app.get(
+    "/stats/cache",
+    tags=["Status"],
+    summary="Estatísticas do Cache de Previsões",
+    description="Tamanho do cache, hits, misses e evicções."
+)
+async def cache_stats():
+    """Retorna as estatísticas do cache de previsões."""
+    if state.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.cache.stats()}
+
+
+@app.get(
+    "/stats/streaming",
+    tags=["Status"],
+    summary="Estatísticas do Streaming",
+    description="Sessões ativas, memória ocupada e contadores de expiração."
+)
+async def streaming_stats():
+    """Retorna as estatísticas das sessões de streaming."""
+    return state.sessions.stats()
+
+
+@app.get(
+    "/stats/history",
+    tags=["Status"],
+    summary="Estatísticas do Histórico de Preços",
+    description="Tickers com histórico, memória ocupada, origem (snapshot ou CSV) e contadores."
+)
+async def history_stats():
+    """Retorna as estatísticas do histórico de preços."""
+    return state.history.stats()
+
+
+@app.get(
+    "/stats/admission",
+    tags=["Status"],
+    summary="Estatísticas do Controle de Admissão",
+    description="Requisições em andamento, fila de espera, tempo de fila e rejeições por motivo."
+)
+async def admission_stats():
+    """Retorna as estatísticas do controle de admissão e do limite por cliente."""
+    return {
+        "paths": ADMISSION_PATHS,
+        "controller": state.admission.stats() if state.admission is not None else {"enabled": False},
+        "rate_limiter": state.rate_limiter.stats() if state.rate_limiter is not None else {"enabled": False}
+    }
+
+
+@app.get(
+    "/stats/profiling",
+    tags=["Status"],
+    summary="Estatísticas do Perfil por Requisição",
+    description="Configuração do perfil opt-in e decisões do amostrador do torch profiler."
+)
+async def profiling_stats():
+    """Retorna a configuração e os contadores do perfil por requisição."""
+    return {"enabled": PROFILE_ENABLED, "torch": state.torch_profiles.stats()}
+
+
+@app.get(
+    "/metrics",
+    tags=["Status"],
+    summary="Metricas (Prometheus)",
+    description="Latência por etapa, requisições por status, gauges de requisições em andamento "
+                "e tempo de carregamento dos modelos, no formato texto do Prometheus."
+)
+async def prometheus_metrics():
+    """Exporta as métricas da API para o Prometheus."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get(
     "/",
     tags=["Status"],
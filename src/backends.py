@@ -0,0 +1,233 @@
+# ═══════════════════════════════════════════════════════════════
+# Backends de inferencia
+# Objetivo: Executar o forward com PyTorch eager, TorchScript, ONNX Runtime ou NumPy
+# ═══════════════════════════════════════════════════════════════
+
+import json
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+# torch é importado sob demanda (require_torch): com o backend numpy, a
+# API sobe sem pagar o import (~1 s) e funciona sem o torch instalado
+torch = None
+
+try:
+    from numpy_lstm import NumpyLSTM
+except ImportError:
+    from src.numpy_lstm import NumpyLSTM
+
+# Artefatos gerados por export_model.py (ao lado de model_lstm.pth)
+TORCHSCRIPT_FILENAME = "model_lstm.ts"
+ONNX_FILENAME = "model_lstm.onnx"
+EXPORT_META_FILENAME = "export.json"
+
+BACKENDS = ("eager", "torchscript", "onnx", "numpy")
+
+
+def require_torch():
+    """
+    Importa o torch na primeira chamada e o devolve.
+
+    Raises:
+        RuntimeError: torch não instalado
+    """
+    global torch
+    if torch is None:
+        try:
+            import torch as torch_module
+        except ImportError:
+            raise RuntimeError("torch não instalado (use INFERENCE_BACKEND=numpy)")
+        torch = torch_module
+    return torch
+
+# ══════════════════════════════════════════════════════════════════
+# BACKENDS
+# ══════════════════════════════════════════════════════════════════
+
+class EagerBackend:
+    """
+    Forward em PyTorch eager (padrão).
+
+    Interface comum dos backends:
+    - prepare(inputs): array (n, seq_length) float32 → entrada do backend
+      (to_tensor + transfer, separados para medir a cópia para o dispositivo)
+    - run(prepared): entrada do backend → array (n,) com as saídas do modelo
+
+    Backends `stateful` também expõem o estado (h, c) da LSTM, usado pelo
+    rollout de vários dias e pelo streaming:
+    - forward_with_state(prepared, hidden) → (saídas (n, 1), estado)
+    - step(x_t (n, 1) float32, hidden) → (saídas (n, 1), estado)
+    - rollout(prepared, horizon) → saídas (n, horizon)
+    """
+    name = "eager"
+    stateful = True
+
+    def __init__(self, model, device: str = "cpu"):
+        require_torch()
+        self.model = model
+        self.device = device
+
+    def prepare(self, inputs: np.ndarray) -> "torch.Tensor":
+        return self.transfer(self.to_tensor(inputs))
+
+    def to_tensor(self, inputs: np.ndarray) -> "torch.Tensor":
+        return torch.from_numpy(inputs).unsqueeze(-1)
+
+    def transfer(self, X: "torch.Tensor") -> "torch.Tensor":
+        return X.to(self.device)
+
+    def run(self, X: "torch.Tensor") -> np.ndarray:
+        with torch.no_grad():
+            return self.model(X).cpu().numpy()[:, 0]
+
+    def forward_with_state(self, X: "torch.Tensor", hidden: Optional[Tuple] = None) -> Tuple[np.ndarray, Tuple]:
+        with torch.no_grad():
+            output, hidden = self.model.forward_with_state(X, hidden)
+        return output.cpu().numpy(), hidden
+
+    def step(self, x_t: np.ndarray, hidden: Tuple) -> Tuple[np.ndarray, Tuple]:
+        with torch.no_grad():
+            output, hidden = self.model.step(torch.from_numpy(x_t).to(self.device), hidden)
+        return output.cpu().numpy(), hidden
+
+    def rollout(self, X: "torch.Tensor", horizon: int) -> np.ndarray:
+        with torch.no_grad():
+            return self.model.rollout(X, horizon).cpu().numpy()
+
+
+class TorchScriptBackend(EagerBackend):
+    """Forward com o modelo TorchScript (sem o dispatch Python de cada camada)."""
+    name = "torchscript"
+    stateful = False
+
+    def __init__(self, path: Path, device: str = "cpu"):
+        super().__init__(require_torch().jit.load(str(path), map_location=device), device)
+        self.model.eval()
+
+
+class OnnxRuntimeBackend:
+    """Forward com ONNX Runtime na CPU (entrada e saída em NumPy)."""
+    name = "onnx"
+    stateful = False
+
+    def __init__(self, path: Path, intra_op_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("onnxruntime não instalado (pip install onnxruntime)")
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def prepare(self, inputs: np.ndarray) -> np.ndarray:
+        return inputs[..., np.newaxis]
+
+    to_tensor = prepare
+
+    def transfer(self, X: np.ndarray) -> np.ndarray:
+        return X
+
+    def run(self, X: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: X})[0][:, 0]
+
+
+class NumpyBackend:
+    """Forward com o motor NumPy (numpy_lstm.py): não depende do torch."""
+    name = "numpy"
+    stateful = True
+
+    def __init__(self, model: NumpyLSTM):
+        self.model = model
+
+    def prepare(self, inputs: np.ndarray) -> np.ndarray:
+        return inputs[..., np.newaxis]
+
+    to_tensor = prepare
+
+    def transfer(self, X: np.ndarray) -> np.ndarray:
+        return X
+
+    def run(self, X: np.ndarray) -> np.ndarray:
+        return self.model(X)[:, 0]
+
+    def forward_with_state(self, X: np.ndarray, hidden: Optional[Tuple] = None) -> Tuple[np.ndarray, Tuple]:
+        return self.model.forward_with_state(X, hidden)
+
+    def step(self, x_t: np.ndarray, hidden: Tuple) -> Tuple[np.ndarray, Tuple]:
+        return self.model.step(x_t, hidden)
+
+    def rollout(self, X: np.ndarray, horizon: int) -> np.ndarray:
+        return self.model.rollout(X, horizon)
+
+# ══════════════════════════════════════════════════════════════════
+# SELECAO
+# ══════════════════════════════════════════════════════════════════
+
+def read_export_meta(model_dir: Path) -> Optional[dict]:
+    """Metadados da última exportação do diretório (None se não exportado)."""
+    path = model_dir / EXPORT_META_FILENAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def load_backend(
+    name: str,
+    model,
+    model_dir: Optional[Path],
+    model_id: str,
+    fused: bool,
+    device: str = "cpu"
+) -> Any:
+    """
+    Cria o backend de inferência de um bundle.
+
+    Os artefatos exportados recebem e devolvem preços em R$ (scaler
+    fundido) e só são usados se foram gerados a partir do mesmo
+    model_lstm.pth/scaler.pkl/config.pkl do bundle (mesmo model_id).
+    O backend numpy usa o motor já carregado por load_bundle.
+
+    Args:
+        name: "eager", "torchscript", "onnx" ou "numpy"
+        model: Modelo do bundle (StockLSTM ou NumpyLSTM)
+        model_dir: Diretório dos artefatos
+        model_id: Identidade do bundle (hash dos artefatos de origem)
+        fused: Se o bundle usa o scaler fundido
+        device: Dispositivo do modelo
+
+    Raises:
+        ValueError: Backend desconhecido
+        RuntimeError: Artefato ausente, desatualizado ou incompatível
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {name}. Opções: {list(BACKENDS)}")
+    if name == "numpy":
+        if not isinstance(model, NumpyLSTM):
+            raise RuntimeError("Backend numpy requer os pesos .npz ou model.bundle")
+        return NumpyBackend(model)
+    if name == "eager":
+        return EagerBackend(model, device)
+
+    if not fused:
+        raise RuntimeError(f"Backend {name} requer o scaler fundido (FUSE_SCALER=1)")
+    if model_dir is None:
+        raise RuntimeError(f"Backend {name} requer o diretório dos artefatos")
+
+    meta = read_export_meta(model_dir)
+    if meta is None or meta.get("model_id") != model_id:
+        raise RuntimeError(
+            f"Artefatos exportados ausentes ou desatualizados em {model_dir} "
+            f"(execute export_model.py)"
+        )
+
+    require_torch()
+    if name == "torchscript":
+        return TorchScriptBackend(model_dir / TORCHSCRIPT_FILENAME, device)
+    if device != "cpu":
+        raise RuntimeError("Backend onnx disponível apenas na CPU")
+    return OnnxRuntimeBackend(model_dir / ONNX_FILENAME, torch.get_num_threads())
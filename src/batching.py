@@ -0,0 +1,221 @@
+# ═══════════════════════════════════════════════════════════════
+# Micro-batching dinamico para a API
+# Objetivo: Agrupar requisicoes concorrentes em um unico forward
+# ═══════════════════════════════════════════════════════════════
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from executor import InferenceExecutor
+except ImportError:
+    from src.executor import InferenceExecutor
+
+# ══════════════════════════════════════════════════════════════════
+# COALESCEDOR DE REQUISICOES
+# ══════════════════════════════════════════════════════════════════
+
+class MicroBatcher:
+    """
+    Agrupa previsões concorrentes em lotes antes de chamar o modelo.
+
+    Funcionamento:
+    ┌──────────────────────────────────────────────────────────────┐
+    │  /predict ─┐                                                 │
+    │  /predict ─┼─► fila ─► coleta por até max_wait_us            │
+    │  /predict ─┘           (ou até max_batch_size janelas)       │
+    │                              │                               │
+    │                        um forward (n, seq_length, 1)         │
+    │                              │                               │
+    │            resultados ◄──────┘ (um future por requisição)    │
+    └──────────────────────────────────────────────────────────────┘
+
+    A latência adicionada a cada requisição é limitada por max_wait_us,
+    então o p99 cresce no máximo essa janela enquanto o throughput por
+    núcleo aumenta com o tamanho médio do lote.
+
+    Com um executor, os forwards rodam fora do event loop e no máximo um
+    lote por slot do executor fica em execução; enquanto todos os slots
+    estão ocupados, as requisições acumulam na fila e formam o próximo lote.
+
+    Cada requisição carrega o modelo que deve atendê-la; dentro de um lote,
+    as janelas são agrupadas por modelo e cada grupo vira um forward.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[Any, np.ndarray], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_us: int = 1000,
+        executor: Optional[InferenceExecutor] = None
+    ):
+        """
+        Inicializa o coalescedor.
+
+        Args:
+            predict_fn: Função que recebe (modelo, janelas (n, seq_length))
+                e retorna (n,) previsões
+            max_batch_size: Número máximo de janelas por forward
+            max_wait_us: Tempo máximo (microssegundos) que a primeira
+                requisição do lote espera por outras
+            executor: Pool onde o forward é executado (None = no event loop)
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0, max_wait_us) / 1e6
+        self.executor = executor
+        self.max_inflight_batches = executor.max_concurrency if executor is not None else 1
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        # Estatísticas
+        self._batch_sizes = Counter()
+        self._n_requests = 0
+        self._n_batches = 0
+        self._total_wait_s = 0.0
+        self._max_wait_seen_s = 0.0
+
+    async def start(self) -> None:
+        """Cria a fila e inicia a tarefa de processamento no event loop atual."""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_inflight_batches)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Encerra a tarefa de processamento e falha as requisições pendentes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Lotes já despachados terminam normalmente
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            _, _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher encerrado"))
+
+    async def submit(self, model: Any, window: np.ndarray) -> float:
+        """
+        Enfileira uma janela e aguarda sua previsão.
+
+        Args:
+            model: Modelo que deve atender a requisição (repassado ao predict_fn)
+            window: Array (seq_length,) com preços
+
+        Returns:
+            Preço previsto para a janela
+        """
+        if self._queue is None:
+            raise RuntimeError("Micro-batcher não iniciado")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((model, window, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, np.ndarray, asyncio.Future, float]]:
+        """Aguarda a primeira requisição e coleta outras até o prazo ou lote cheio."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        """Loop principal: espera um slot livre, coleta um lote e o despacha."""
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch: List[Tuple[Any, np.ndarray, asyncio.Future, float]]) -> None:
+        """Executa o forward de um lote e distribui os resultados."""
+        try:
+            # Descartar requisições cujo cliente já desistiu
+            batch = [item for item in batch if not item[2].cancelled()]
+            if not batch:
+                return
+
+            start = time.perf_counter()
+            for _, _, _, enqueued_at in batch:
+                wait = start - enqueued_at
+                self._total_wait_s += wait
+                self._max_wait_seen_s = max(self._max_wait_seen_s, wait)
+            self._n_requests += len(batch)
+            self._n_batches += 1
+            self._batch_sizes[len(batch)] += 1
+
+            # Agrupar por modelo: um forward por modelo presente no lote
+            groups: Dict[int, List[Tuple[Any, np.ndarray, asyncio.Future, float]]] = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+
+            for group in groups.values():
+                try:
+                    windows = np.stack([window for _, window, _, _ in group])
+                    predictions = await self._predict(group[0][0], windows)
+                except Exception as e:
+                    for _, _, future, _ in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, _, future, _), prediction in zip(group, predictions):
+                    if not future.done():
+                        future.set_result(float(prediction))
+        finally:
+            self._slots.release()
+
+    async def _predict(self, model: Any, windows: np.ndarray) -> np.ndarray:
+        """Executa a função de previsão para um lote empilhado."""
+        if self.executor is not None:
+            return await self.executor.run(self.predict_fn, model, windows)
+        return self.predict_fn(model, windows)
+
+    def stats(self) -> dict:
+        """Retorna profundidade da fila e estatísticas de tamanho de lote."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._inflight),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_us": int(self.max_wait_s * 1e6),
+            "requests": self._n_requests,
+            "batches": self._n_batches,
+            "avg_batch_size": round(self._n_requests / self._n_batches, 2) if self._n_batches else 0.0,
+            "avg_queue_wait_us": round(self._total_wait_s / self._n_requests * 1e6, 1) if self._n_requests else 0.0,
+            "max_queue_wait_us": round(self._max_wait_seen_s * 1e6, 1),
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())}
+        }
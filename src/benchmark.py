@@ -0,0 +1,393 @@
+# ═══════════════════════════════════════════════════════════════
+# Benchmark de carga da API
+# Objetivo: Latencia (p50/p95/p99) e vazao reproduziveis, com comparacao entre execucoes
+# ═══════════════════════════════════════════════════════════════
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+# ══════════════════════════════════════════════════════════════════
+# CONFIGURACOES
+# ══════════════════════════════════════════════════════════════════
+
+# Matriz padrão de cenários: concorrência × tamanho da janela × janelas por requisição
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_WINDOW_LENGTHS = (60, 240)
+DEFAULT_BATCH_SIZES = (1, 32)
+
+DEFAULT_REQUESTS = 300
+DEFAULT_WARMUP = 20
+
+# Piora relativa máxima aceita em relação ao baseline (10%)
+DEFAULT_THRESHOLD = 0.10
+
+# Métricas comparadas: latência (maior é pior), vazão (menor é pior) e taxa de erro
+LATENCY_KEYS = ("p50", "p95", "p99")
+THROUGHPUT_KEY = "throughput_rps"
+ERROR_RATE_KEY = "error_rate"
+COMPARED_KEY = "scenarios_compared"
+
+SEED = 42
+
+# ══════════════════════════════════════════════════════════════════
+# CARGA
+# ══════════════════════════════════════════════════════════════════
+
+def make_windows(n: int, length: int, rng: np.random.Generator) -> np.ndarray:
+    """Janelas distintas (passeio aleatório em torno de R$ 30): sem acertos no cache."""
+    returns = rng.normal(0, 0.02, size=(n, length))
+    return np.round(30 * np.exp(np.cumsum(returns, axis=1)), 2)
+
+
+def make_requests(n: int, window_length: int, batch_size: int, fmt: str, seed: int) -> List[dict]:
+    """
+    Corpos das requisições de um cenário, gerados antes da medição.
+
+    batch_size == 1 usa o /predict; batch_size > 1, o /predict/batch.
+    """
+    rng = np.random.default_rng(seed)
+    requests = []
+    for _ in range(n):
+        windows = make_windows(batch_size, window_length, rng)
+        if fmt == "binary":
+            content = windows.astype("<f4").tobytes()
+            if batch_size == 1:
+                requests.append({"url": "/predict", "content": content})
+            else:
+                requests.append({"url": f"/predict/batch?window_length={window_length}", "content": content})
+        elif batch_size == 1:
+            requests.append({"url": "/predict", "content": json.dumps({"prices": windows[0].tolist()})})
+        else:
+            requests.append({"url": "/predict/batch", "content": json.dumps({"windows": windows.tolist()})})
+    return requests
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    requests: List[dict],
+    concurrency: int,
+    headers: Dict[str, str],
+    warmup: int
+) -> dict:
+    """
+    Executa as requisições com `concurrency` clientes em laço fechado
+    (cada cliente envia a próxima assim que recebe a resposta).
+
+    Só as respostas 2xx entram nas latências: um erro rápido (ex: 400 ou
+    503) não pode aparecer como ganho de desempenho.
+
+    Returns:
+        Latências das respostas 2xx (s), erros por status e duração total
+    """
+    for request in requests[:warmup]:
+        await client.post(request["url"], content=request["content"], headers=headers)
+
+    pending = iter(requests[warmup:])
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def worker():
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.post(request["url"], content=request["content"], headers=headers)
+                outcome = str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            if outcome.startswith("2"):
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors, "duration_s": time.perf_counter() - start}
+
+
+def summarize(name: str, params: dict, run: dict, batch_size: int) -> dict:
+    """Resumo do cenário: vazão e latências só das respostas 2xx (None se não houve nenhuma)."""
+    latencies_ms = np.array(run["latencies"]) * 1000
+    n_ok = len(latencies_ms)
+    n_errors = sum(run["errors"].values())
+    n = n_ok + n_errors
+
+    def stat(fn, *args):
+        return round(float(fn(latencies_ms, *args)), 3) if n_ok else None
+
+    return {
+        "name": name,
+        **params,
+        "requests": n,
+        "successes": n_ok,
+        "errors": n_errors,
+        "error_rate": round(n_errors / n, 4) if n else 0.0,
+        "errors_by_status": dict(sorted(run["errors"].items())),
+        "duration_s": round(run["duration_s"], 3),
+        "throughput_rps": round(n_ok / run["duration_s"], 2),
+        "windows_per_s": round(n_ok * batch_size / run["duration_s"], 2),
+        "latency_ms": {
+            "mean": stat(np.mean),
+            "p50": stat(np.percentile, 50),
+            "p95": stat(np.percentile, 95),
+            "p99": stat(np.percentile, 99),
+            "max": stat(np.max)
+        }
+    }
+
+
+def format_ms(value: Optional[float]) -> str:
+    return f"{value:>8.2f}ms" if value is not None else f"{'-':>10}"
+
+
+async def run_suite(
+    client: httpx.AsyncClient,
+    concurrency: Sequence[int],
+    window_lengths: Sequence[int],
+    batch_sizes: Sequence[int],
+    n_requests: int,
+    warmup: int,
+    fmt: str
+) -> List[dict]:
+    """Executa todos os cenários da matriz e imprime uma linha por cenário."""
+    content_type = "application/octet-stream" if fmt == "binary" else "application/json"
+    headers = {"Content-Type": content_type, "Accept": content_type}
+
+    print(f"   {'cenario':<28}{'req/s':>10}{'janelas/s':>12}{'p50':>10}{'p95':>10}{'p99':>10}{'erros':>7}")
+    results = []
+    scenarios = product(window_lengths, batch_sizes, concurrency)
+    for index, (window_length, batch_size, n_clients) in enumerate(scenarios):
+        name = f"{fmt}/w{window_length}/b{batch_size}/c{n_clients}"
+        # Semente por cenário: janelas de um cenário não acertam o cache no seguinte
+        seed = SEED + index
+        requests = make_requests(n_requests + warmup, window_length, batch_size, fmt, seed)
+
+        run = await run_scenario(client, requests, n_clients, headers, warmup)
+        params = {"format": fmt, "concurrency": n_clients, "window_length": window_length, "batch_size": batch_size}
+        result = summarize(name, params, run, batch_size)
+        results.append(result)
+
+        lat = result["latency_ms"]
+        print(f"   {name:<28}{result['throughput_rps']:>10.1f}{result['windows_per_s']:>12.1f}"
+              f"{format_ms(lat['p50'])}{format_ms(lat['p95'])}{format_ms(lat['p99'])}{result['errors']:>7}"
+              + (f"  {result['errors_by_status']}" if result["errors"] else ""))
+    return results
+
+# ══════════════════════════════════════════════════════════════════
+# ALVOS: APP EM PROCESSO OU SERVIDOR
+# ══════════════════════════════════════════════════════════════════
+
+async def benchmark_in_process(**suite) -> List[dict]:
+    """Executa o app ASGI no próprio processo (sem rede), com o lifespan completo."""
+    try:
+        import app as app_module
+    except ImportError:
+        from src import app as app_module
+
+    async with app_module.app.router.lifespan_context(app_module.app):
+        if not app_module.state.is_loaded:
+            raise RuntimeError("Modelo não carregado (ver log do startup)")
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            return await run_suite(client, **suite)
+
+
+async def benchmark_url(url: str, **suite) -> List[dict]:
+    """Executa contra um servidor já em execução (uvicorn ou serve.py)."""
+    limits = httpx.Limits(max_connections=max(suite["concurrency"]))
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        response = await client.get("/health")
+        if not response.json().get("model_loaded"):
+            raise RuntimeError(f"Servidor em {url} sem modelo carregado")
+        return await run_suite(client, **suite)
+
+
+def environment_info(target: str) -> dict:
+    """Contexto da execução, gravado junto com os resultados."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return {
+        "target": target,
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": n_cores,
+        "env": {
+            key: os.environ[key] for key in sorted(os.environ)
+            if key.startswith(("INFERENCE_", "MICROBATCH_", "PREDICTION_CACHE", "MODEL_", "FUSE_", "SERVER_"))
+        }
+    }
+
+# ══════════════════════════════════════════════════════════════════
+# COMPARACAO COM BASELINE
+# ══════════════════════════════════════════════════════════════════
+
+def compare(results: List[dict], baseline: List[dict], threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Compara cada cenário com o de mesmo nome no baseline.
+
+    Regressão:
+    - taxa de erro maior que a do baseline (inclui erros que não existiam)
+    - latência (p50/p95/p99) maior ou vazão menor que o baseline em mais
+      de `threshold` (fração); latências sem respostas 2xx não são comparadas
+    - nenhum cenário em comum com o baseline (ex: outro --format): sem
+      comparação, a verificação não pode passar
+
+    Cenários sem par (só na execução atual ou só no baseline) são listados.
+
+    Returns:
+        Lista de regressões (cenário, métrica, baseline, atual, variação)
+    """
+    previous = {scenario["name"]: scenario for scenario in baseline}
+    current = {scenario["name"] for scenario in results}
+    regressions = []
+    compared = 0
+
+    print(f"\n   {'cenario':<28}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}{'erros':>10}")
+    for scenario in results:
+        old = previous.get(scenario["name"])
+        if old is None:
+            continue
+        compared += 1
+
+        old_rate, new_rate = old.get(ERROR_RATE_KEY, 0.0), scenario[ERROR_RATE_KEY]
+        if new_rate > old_rate:
+            regressions.append({
+                "scenario": scenario["name"], "metric": ERROR_RATE_KEY,
+                "baseline": old_rate, "current": new_rate, "change": round(new_rate - old_rate, 4)
+            })
+
+        changes = {
+            key: scenario["latency_ms"][key] / old["latency_ms"][key] - 1
+            for key in LATENCY_KEYS
+            if scenario["latency_ms"][key] is not None and old["latency_ms"][key]
+        }
+        if old[THROUGHPUT_KEY]:
+            changes[THROUGHPUT_KEY] = scenario[THROUGHPUT_KEY] / old[THROUGHPUT_KEY] - 1
+        print(f"   {scenario['name']:<28}"
+              + "".join(f"{changes[key]:>+10.1%}" if key in changes else f"{'-':>10}"
+                        for key in (*LATENCY_KEYS, THROUGHPUT_KEY))
+              + f"{new_rate:>10.1%}")
+
+        for key, change in changes.items():
+            worse = -change if key == THROUGHPUT_KEY else change
+            if worse > threshold:
+                old_value = old[key] if key == THROUGHPUT_KEY else old["latency_ms"][key]
+                new_value = scenario[key] if key == THROUGHPUT_KEY else scenario["latency_ms"][key]
+                regressions.append({
+                    "scenario": scenario["name"], "metric": key,
+                    "baseline": old_value, "current": new_value, "change": round(change, 4)
+                })
+
+    unmatched = [name for name in sorted(current) if name not in previous]
+    missing = [name for name in previous if name not in current]
+    if unmatched:
+        print(f"\n   Sem par no baseline (nao comparados): {', '.join(unmatched)}")
+    if missing:
+        print(f"   Do baseline, ausentes nesta execucao: {', '.join(missing)}")
+    if not compared:
+        regressions.append({
+            "scenario": "-", "metric": COMPARED_KEY,
+            "baseline": len(previous), "current": 0, "change": -1.0
+        })
+    return regressions
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de latência e vazão da API")
+    parser.add_argument("--url", default=None,
+                        help="Servidor em execução (ex: http://127.0.0.1:8000); padrão: app no próprio processo")
+    parser.add_argument("--concurrency", type=int_list, default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--windows", type=int_list, default=list(DEFAULT_WINDOW_LENGTHS),
+                        help="Preços por janela (>= seq_length do modelo)")
+    parser.add_argument("--batch", type=int_list, default=list(DEFAULT_BATCH_SIZES),
+                        help="Janelas por requisição (1 = /predict, >1 = /predict/batch)")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Requisições medidas por cenário")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--format", choices=("json", "binary"), default="json")
+    parser.add_argument("--output", type=Path, default=None, help="Arquivo JSON com os resultados")
+    parser.add_argument("--baseline", type=Path, default=None, help="Resultados anteriores para comparação")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Piora relativa máxima aceita (0.10 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Executa a matriz de cenários; retorna 1 se houver regressão em relação ao baseline."""
+    args = parse_args(argv)
+    suite = {
+        "concurrency": args.concurrency,
+        "window_lengths": args.windows,
+        "batch_sizes": args.batch,
+        "n_requests": args.requests,
+        "warmup": args.warmup,
+        "fmt": args.format
+    }
+    target = args.url or "in-process"
+
+    print("=" * 60)
+    print(f"Benchmark da API ({target})")
+    print("=" * 60)
+
+    if args.url:
+        results = asyncio.run(benchmark_url(args.url, **suite))
+    else:
+        results = asyncio.run(benchmark_in_process(**suite))
+
+    failed = [r["name"] for r in results if r["errors"]]
+    if failed:
+        print(f"\nAviso: cenarios com erros (fora das latencias): {', '.join(failed)}")
+
+    report = {"environment": environment_info(target), "scenarios": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResultados salvos em: {args.output}")
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline["scenarios"], args.threshold)
+        if regressions:
+            print(f"\nREGRESSAO acima de {args.threshold:.0%}:")
+            for r in regressions:
+                change = f"{r['change']:+.1%}" + (" pontos" if r["metric"] == ERROR_RATE_KEY else "")
+                print(f"   {r['scenario']} {r['metric']}: {r['baseline']} -> {r['current']} ({change})")
+            exit_code = 1
+        else:
+            print(f"\nSem regressao acima de {args.threshold:.0%} em relacao a {args.baseline}")
+
+    print("\n" + "=" * 60)
+    print("CHECKPOINT: Benchmark concluido!")
+    print("=" * 60)
+    return exit_code
+
+
+if __name__ == "__main__":
+    # Uso: python benchmark.py [--url http://127.0.0.1:8000] [--concurrency 1,8,32]
+    #      [--windows 60,240] [--batch 1,32] [--output atual.json] [--baseline anterior.json]
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# ═══════════════════════════════════════════════════════════════
+# Formato de bundle em arquivo unico
+# Objetivo: Pesos, scaler, config e metadados de treino sem pickle
+# ═══════════════════════════════════════════════════════════════
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Arquivo único por diretório de modelo (ao lado ou no lugar de .pth/.pkl)
+BUNDLE_FILENAME = "model.bundle"
+
+# ══════════════════════════════════════════════════════════════════
+# LAYOUT
+# ══════════════════════════════════════════════════════════════════
+#
+#   ┌──────────────────────────────────────────────────────────────┐
+#   │ magic "LSTMBNDL" (8 bytes)                                   │
+#   │ versão do formato (uint32 little-endian)                     │
+#   │ tamanho do header (uint64 little-endian)                     │
+#   │ header JSON (utf-8): metadados + índice dos tensores         │
+#   │ padding até múltiplo de 64 bytes                             │
+#   │ tensores crus, cada um alinhado em 64 bytes                  │
+#   └──────────────────────────────────────────────────────────────┘
+#
+# O índice guarda nome, dtype, shape, offset (a partir do início dos
+# dados) e tamanho de cada tensor. A leitura faz mmap do arquivo e cria
+# views NumPy sobre ele: nada é desserializado com pickle.
+
+BUNDLE_MAGIC = b"LSTMBNDL"
+BUNDLE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sIQ")
+_ALLOWED_DTYPES = {"<f4", "<f8", "<i8"}
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_bundle(path: Path, tensors: Dict[str, np.ndarray], metadata: dict) -> Path:
+    """
+    Grava o bundle de forma atômica (arquivo temporário + rename).
+
+    Se `metadata` não tiver "model_id", usa o hash do conteúdo (header +
+    tensores) como identidade do modelo.
+
+    Args:
+        path: Destino do bundle
+        tensors: Nome -> array (float32, float64 ou int64)
+        metadata: Metadados serializáveis em JSON
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in tensors.items()}
+    for name, array in arrays.items():
+        if array.dtype.newbyteorder("<").str not in _ALLOWED_DTYPES:
+            raise ValueError(f"dtype não suportado em {name}: {array.dtype}")
+        arrays[name] = array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+    index = {}
+    offset = 0
+    for name, array in arrays.items():
+        index[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": array.nbytes
+        }
+        offset = _align(offset + array.nbytes)
+
+    metadata = dict(metadata)
+    if "model_id" not in metadata:
+        digest = hashlib.sha256(json.dumps(metadata, sort_keys=True).encode())
+        for array in arrays.values():
+            digest.update(array.tobytes())
+        metadata["model_id"] = digest.hexdigest()[:16]
+
+    header = json.dumps({
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "metadata": metadata,
+        "tensors": index
+    }).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + index[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_preamble(f) -> Tuple[int, int]:
+    magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+    if magic != BUNDLE_MAGIC:
+        raise ValueError("Arquivo não é um bundle de modelo (magic inválido)")
+    if version > BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Versão do bundle não suportada: {version} (máxima: {BUNDLE_FORMAT_VERSION})")
+    return version, header_len
+
+
+def read_bundle_header(path: Path) -> dict:
+    """Lê apenas o header (metadados e índice), sem tocar nos tensores."""
+    with open(path, "rb") as f:
+        _, header_len = _read_preamble(f)
+        return json.loads(f.read(header_len).decode("utf-8"))
+
+
+def read_bundle(path: Path, use_mmap: bool = True) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """
+    Lê metadados e tensores de um bundle.
+
+    Com use_mmap=True os tensores são views somente leitura sobre o
+    arquivo mapeado em memória (as páginas são lidas sob demanda e
+    compartilhadas entre processos).
+
+    Returns:
+        Tuple com (metadados, nome -> array)
+
+    Raises:
+        ValueError: Arquivo inválido, versão não suportada ou índice inconsistente
+    """
+    with open(path, "rb") as f:
+        _, header_len = _read_preamble(f)
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = _align(_PREAMBLE.size + header_len)
+
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+
+    tensors = {}
+    for name, entry in header["tensors"].items():
+        if entry["dtype"] not in _ALLOWED_DTYPES:
+            raise ValueError(f"dtype não suportado em {name}: {entry['dtype']}")
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        start = data_start + entry["offset"]
+        if count * dtype.itemsize != entry["nbytes"] or start + entry["nbytes"] > len(buffer):
+            raise ValueError(f"Índice inconsistente para o tensor {name}")
+        tensors[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(entry["shape"])
+
+    return header["metadata"], tensors
+
+# ══════════════════════════════════════════════════════════════════
+# SCALER SEM SKLEARN
+# ══════════════════════════════════════════════════════════════════
+
+class ScalerParams:
+    """
+    Parâmetros do MinMaxScaler com a mesma interface usada pela API
+    (scale_, min_, transform, inverse_transform), sem depender do sklearn.
+    """
+
+    def __init__(self, params: dict):
+        self.scale_ = np.asarray(params["scale"], dtype=np.float64)
+        self.min_ = np.asarray(params["min"], dtype=np.float64)
+        self.data_min_ = np.asarray(params.get("data_min", []), dtype=np.float64)
+        self.data_max_ = np.asarray(params.get("data_max", []), dtype=np.float64)
+        self.feature_range = tuple(params.get("feature_range", (0, 1)))
+
+    @classmethod
+    def from_sklearn(cls, scaler) -> "ScalerParams":
+        return cls({
+            "scale": scaler.scale_.tolist(),
+            "min": scaler.min_.tolist(),
+            "data_min": scaler.data_min_.tolist(),
+            "data_max": scaler.data_max_.tolist(),
+            "feature_range": list(scaler.feature_range)
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            "scale": self.scale_.tolist(),
+            "min": self.min_.tolist(),
+            "data_min": self.data_min_.tolist(),
+            "data_max": self.data_max_.tolist(),
+            "feature_range": list(self.feature_range)
+        }
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return X * self.scale_ + self.min_
+
+    def inverse_transform(self, X: np.ndarray) -> np.ndarray:
+        return (X - self.min_) / self.scale_
+
+# ══════════════════════════════════════════════════════════════════
+# CONVERSAO DOS ARTEFATOS ANTIGOS (.pth + .pkl)
+# ══════════════════════════════════════════════════════════════════
+
+def convert_artifacts(model_dir: Path, path: Optional[Path] = None) -> Path:
+    """
+    Converte model_lstm.pth, scaler.pkl e config.pkl em um único bundle.
+
+    O model_id do bundle é o mesmo dos artefatos de origem, então os
+    artefatos derivados (TorchScript, ONNX, int8, .npz) continuam válidos.
+    """
+    import joblib
+    import torch
+
+    try:
+        from registry import CONFIG_FILENAME, MODEL_FILENAME, SCALER_FILENAME, fingerprint_files
+    except ImportError:
+        from src.registry import CONFIG_FILENAME, MODEL_FILENAME, SCALER_FILENAME, fingerprint_files
+
+    model_path = model_dir / MODEL_FILENAME
+    scaler_path = model_dir / SCALER_FILENAME
+    config_path = model_dir / CONFIG_FILENAME
+
+    checkpoint = torch.load(model_path, map_location="cpu", weights_only=False)
+    scaler = joblib.load(scaler_path)
+    config = joblib.load(config_path)
+
+    tensors = {
+        name: value.detach().cpu().numpy()
+        for name, value in checkpoint['model_state_dict'].items()
+    }
+    train_losses = [float(loss) for loss in checkpoint.get('train_losses', [])]
+    val_losses = [float(loss) for loss in checkpoint.get('val_losses', [])]
+    metadata = {
+        "model_id": fingerprint_files(model_path, scaler_path, config_path),
+        "model_config": checkpoint.get('model_config', {}),
+        "config": {key: value for key, value in config.items() if isinstance(value, (str, int, float, bool))},
+        "scaler": ScalerParams.from_sklearn(scaler).to_dict(),
+        "training": {
+            "epochs": len(train_losses),
+            "final_train_loss": checkpoint.get('final_train_loss'),
+            "final_val_loss": checkpoint.get('final_val_loss'),
+            "train_losses": train_losses,
+            "val_losses": val_losses
+        },
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "torch_version": torch.__version__
+    }
+
+    return write_bundle(path or model_dir / BUNDLE_FILENAME, tensors, metadata)
+
+# ══════════════════════════════════════════════════════════════════
+# BENCHMARK DE STARTUP
+# ══════════════════════════════════════════════════════════════════
+
+# Executado em um processo novo para medir imports a frio
+_STARTUP_PROBE = """
+import json, sys, time
+from pathlib import Path
+start = time.perf_counter()
+import app
+t_import = time.perf_counter()
+backend, fmt, model_dir = sys.argv[1], sys.argv[2], Path(sys.argv[3])
+# A carga inclui os imports adiados (torch, joblib/sklearn) do caminho usado
+from registry import load_bundle
+bundle = load_bundle(model_dir, backend=backend, prefer_bundle=(fmt == "bundle"))
+t_load = time.perf_counter()
+bundle.warmup()
+t_warmup = time.perf_counter()
+print(json.dumps({
+    "import_s": t_import - start, "load_s": t_load - t_import, "warmup_s": t_warmup - t_load,
+    "total_s": t_warmup - start, "format": bundle.source_format, "backend": bundle.backend.name
+}))
+"""
+
+
+def benchmark_startup(model_dir: Path, repeats: int = 3) -> dict:
+    """
+    Mede o cold start em processos novos, para cada formato e backend:
+    import da API, carga do modelo (incluindo os imports adiados de torch
+    e sklearn) e warmup.
+
+    Returns:
+        Dict "formato/backend" -> medianas em segundos
+    """
+    src_dir = Path(__file__).parent
+    env = {**os.environ, "PYTHONPATH": str(src_dir), "PYTHONWARNINGS": "ignore"}
+    results = {}
+
+    for fmt in ("legacy", "bundle"):
+        for backend in ("eager", "numpy"):
+            runs = []
+            for _ in range(repeats):
+                proc = subprocess.run(
+                    [sys.executable, "-c", _STARTUP_PROBE, backend, fmt, str(model_dir)],
+                    capture_output=True, text=True, env=env, cwd=src_dir
+                )
+                if proc.returncode != 0:
+                    print(f"   {fmt}/{backend}: falhou ({proc.stderr.strip().splitlines()[-1]})")
+                    break
+                runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            if not runs:
+                continue
+            key = f"{fmt}/{backend}"
+            results[key] = {
+                stage: float(np.median([run[stage] for run in runs]))
+                for stage in ("import_s", "load_s", "warmup_s", "total_s")
+            }
+            results[key]["loaded_as"] = f"{runs[0]['format']}/{runs[0]['backend']}"
+
+    print(f"   {'formato/backend':<16}{'import':>10}{'load':>10}{'warmup':>10}{'total':>10}   carregado como")
+    for key, r in results.items():
+        times = "".join(f"{r[stage] * 1000:>8.0f}ms" for stage in ("import_s", "load_s", "warmup_s", "total_s"))
+        print(f"   {key:<16}{times}   {r['loaded_as']}")
+    return results
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    # Uso: python bundle_format.py [diretorio_do_modelo] [--skip-benchmark]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    model_dir = Path(args[0]) if args else Path(__file__).parent.parent / "models"
+
+    print("=" * 60)
+    print("Bundle do modelo em arquivo unico")
+    print("=" * 60)
+
+    bundle_path = convert_artifacts(model_dir)
+    header = read_bundle_header(bundle_path)
+    print(f"\nBundle salvo em: {bundle_path} ({bundle_path.stat().st_size / 1024:.1f} KB)")
+    print(f"   model_id: {header['metadata']['model_id']}")
+    print(f"   tensores: {len(header['tensors'])}")
+
+    if "--skip-benchmark" not in sys.argv:
+        print("\nStartup (mediana de 3 processos novos):")
+        benchmark_startup(model_dir)
+
+    print("\n" + "=" * 60)
+    print("CHECKPOINT: Bundle pronto!")
+    print("=" * 60)
@@ -3,7 +3,6 @@
 # Objetivo: Baixar precos historicos usando a biblioteca yfinance
 # ═══════════════════════════════════════════════════════════════
 
-import yfinance as yf
 import pandas as pd
 from pathlib import Path
 
@@ -39,6 +38,9 @@ def download_stock_data(
     Returns:
         DataFrame com os dados históricos (Open, High, Low, Close, Volume, etc.)
     """
+    # Importado aqui: load_stock_data (usado pela API) não depende do yfinance
+    import yfinance as yf
+    
     print(f"Baixando dados de {ticker}...")
     print(f"   Periodo: {start_date} ate {end_date}")
     
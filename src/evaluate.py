@@ -12,7 +12,7 @@ import matplotlib.pyplot as plt
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from pathlib import Path
 
-from model import StockLSTM
+from model import StockLSTM, fuse_scaler
 from preprocessing import preprocess_data
 
 # Diretórios
@@ -60,6 +60,29 @@ def make_predictions(model, X_test, scaler):
     return predictions_np
 
 
+def check_fusion_parity(model, X_test, scaler, tolerance: float = 1e-3):
+    """
+    Confere se o modelo com o scaler fundido (usado pela API) reproduz o
+    caminho com sklearn: normalizar → modelo → inverse_transform.
+
+    Returns:
+        Maior diferença absoluta em R$ entre os dois caminhos
+    """
+    fused = fuse_scaler(model, scaler.scale_, scaler.min_)
+
+    # X_test está normalizado; o modelo fundido recebe preços em R$
+    X_reais = scaler.inverse_transform(X_test.numpy().reshape(-1, 1)).reshape(X_test.shape)
+    with torch.no_grad():
+        fused_reais = fused(torch.from_numpy(X_reais.astype(np.float32))).numpy()
+
+    sklearn_reais = scaler.inverse_transform(make_predictions(model, X_test, scaler))
+    max_diff = float(np.max(np.abs(fused_reais - sklearn_reais)))
+
+    status = "OK" if max_diff <= tolerance else "DIVERGENTE"
+    print(f"   Paridade scaler fundido vs sklearn: max |diff| = R$ {max_diff:.6f} ({status})")
+    return max_diff
+
+
 def calculate_metrics(actual_reais, predictions_reais):
     """
     Calcula métricas de avaliação.
@@ -164,6 +187,7 @@ def evaluate_model():
     actual_reais = scaler.inverse_transform(y_test.numpy())
     
     print(f"   Previsoes feitas: {len(predictions_reais)} amostras")
+    check_fusion_parity(model, X_test, scaler)
     
     # 5. Exibir exemplos
     print(f"\nExemplos de previsoes:")
@@ -0,0 +1,133 @@
+# ═══════════════════════════════════════════════════════════════
+# Executor de inferencia
+# Objetivo: Tirar o forward do event loop com concorrencia limitada
+# ═══════════════════════════════════════════════════════════════
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# ══════════════════════════════════════════════════════════════════
+# THREADS DO TORCH
+# ══════════════════════════════════════════════════════════════════
+
+def configure_torch_threads(
+    n_workers: int,
+    intra_op_threads: Optional[int] = None,
+    use_torch: bool = True
+) -> int:
+    """
+    Ajusta o número de threads intra-op do torch para o pool de inferência.
+
+    Cada worker do pool executa forwards em paralelo; se cada um usar todas
+    as threads do torch, os núcleos ficam sobrecarregados (oversubscription).
+    Por padrão, divide os núcleos disponíveis entre os workers.
+
+    O mesmo limite vale para as threads do BLAS usado pelo NumPy (backend
+    numpy), se o threadpoolctl estiver instalado.
+
+    Args:
+        n_workers: Número de workers do pool de inferência
+        intra_op_threads: Threads por forward (None = núcleos / workers)
+        use_torch: Se False (backend numpy), não importa o torch: só as
+            threads do BLAS são ajustadas
+
+    Returns:
+        Número de threads intra-op configurado
+    """
+    if intra_op_threads is None:
+        n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        intra_op_threads = max(1, (n_cores or 1) // max(1, n_workers))
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=intra_op_threads)
+    except ImportError:
+        pass
+
+    if not use_torch:
+        return intra_op_threads
+    try:
+        import torch
+    except ImportError:
+        return intra_op_threads
+
+    torch.set_num_threads(intra_op_threads)
+
+    # Paralelismo inter-op não é usado pelo forward da LSTM;
+    # só pode ser definido antes do primeiro trabalho paralelo
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    return intra_op_threads
+
+# ══════════════════════════════════════════════════════════════════
+# POOL DE INFERENCIA
+# ══════════════════════════════════════════════════════════════════
+
+class InferenceExecutor:
+    """
+    Pool de threads dedicado à inferência, com concorrência limitada.
+
+    O forward do torch libera o GIL, então um pool de threads mantém o
+    event loop livre (health checks e parsing de requisições continuam
+    respondendo) sem duplicar o modelo em memória, como faria um pool
+    de processos.
+    """
+
+    def __init__(self, max_workers: int = 1, max_concurrency: Optional[int] = None):
+        """
+        Inicializa o pool.
+
+        Args:
+            max_workers: Número de threads de inferência
+            max_concurrency: Máximo de tarefas submetidas ao pool ao mesmo
+                tempo (None = max_workers); as demais aguardam sem bloquear
+                o event loop
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max(1, max_concurrency or self.max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        """Número de tarefas em execução no pool."""
+        return self._active
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Executa `fn(*args)` no pool e aguarda o resultado.
+
+        Args:
+            fn: Função síncrona (ex: forward do modelo)
+            *args: Argumentos da função
+
+        Returns:
+            Resultado de `fn(*args)`
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            self._active += 1
+            try:
+                # Contexto da requisição (ContextVars, ex: perfil) também na thread do pool
+                context = contextvars.copy_context()
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, functools.partial(context.run, fn, *args))
+            finally:
+                self._active -= 1
+
+    def shutdown(self) -> None:
+        """Encerra o pool aguardando as tarefas em execução."""
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,231 @@
+# ═══════════════════════════════════════════════════════════════
+# Exportacao do modelo (TorchScript / ONNX / NumPy)
+# Objetivo: Gerar artefatos para os backends de inferencia da API
+# ═══════════════════════════════════════════════════════════════
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+import torch
+
+from backends import (
+    EXPORT_META_FILENAME, ONNX_FILENAME, TORCHSCRIPT_FILENAME,
+    EagerBackend, NumpyBackend, OnnxRuntimeBackend, TorchScriptBackend
+)
+from numpy_lstm import NUMPY_WEIGHTS_FILENAME, NumpyLSTM, export_npz
+from registry import ModelBundle, load_bundle
+
+# ══════════════════════════════════════════════════════════════════
+# CONFIGURACOES
+# ══════════════════════════════════════════════════════════════════
+
+MODELS_DIR = Path(__file__).parent.parent / "models"
+
+# Diferença máxima aceita (R$) entre um backend exportado e o eager
+PARITY_TOLERANCE = 1e-3
+
+# Tamanhos de lote da comparação de latência
+BENCHMARK_BATCH_SIZES = (1, 32, 1024)
+BENCHMARK_REPEATS = 50
+
+# ══════════════════════════════════════════════════════════════════
+# EXPORTACAO
+# ══════════════════════════════════════════════════════════════════
+
+def export_torchscript(model: torch.nn.Module, path: Path, seq_length: int) -> Path:
+    """
+    Exporta o modelo via tracing (o forward não tem fluxo de controle
+    dependente dos dados, então o trace vale para qualquer tamanho de lote).
+    """
+    example = torch.ones(2, seq_length, 1)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    traced = torch.jit.freeze(traced)
+    traced.save(str(path))
+    return path
+
+
+def export_onnx(model: torch.nn.Module, path: Path, seq_length: int) -> Path:
+    """Exporta o modelo para ONNX com o tamanho do lote dinâmico."""
+    example = torch.ones(2, seq_length, 1)
+    torch.onnx.export(
+        model,
+        (example,),
+        str(path),
+        input_names=["prices"],
+        output_names=["prediction"],
+        dynamic_axes={"prices": {0: "batch"}, "prediction": {0: "batch"}},
+        opset_version=17,
+        dynamo=False
+    )
+    return path
+
+
+def export_bundle(bundle: ModelBundle, model_dir: Path) -> Dict[str, Path]:
+    """
+    Exporta o modelo servido (scaler fundido: entrada e saída em R$) e
+    grava os metadados que ligam os artefatos ao model_lstm.pth de origem.
+
+    Returns:
+        Dict backend -> caminho do artefato gerado
+    """
+    exported = {}
+    model = bundle.model.eval()
+
+    exported["torchscript"] = export_torchscript(model, model_dir / TORCHSCRIPT_FILENAME, bundle.seq_length)
+    print(f"   TorchScript: {exported['torchscript']}")
+
+    try:
+        exported["onnx"] = export_onnx(model, model_dir / ONNX_FILENAME, bundle.seq_length)
+        print(f"   ONNX:        {exported['onnx']}")
+    except Exception as e:
+        print(f"   ONNX nao exportado ({type(e).__name__}: {e})")
+
+    exported["numpy"] = export_npz(model, model_dir / NUMPY_WEIGHTS_FILENAME, bundle.model_id, bundle.seq_length)
+    print(f"   NumPy:       {exported['numpy']}")
+
+    meta = {
+        "model_id": bundle.model_id,
+        "ticker": bundle.ticker,
+        "seq_length": bundle.seq_length,
+        "scaler_fused": True,
+        "formats": sorted(exported),
+        "torch_version": torch.__version__,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    (model_dir / EXPORT_META_FILENAME).write_text(json.dumps(meta, indent=2))
+    return exported
+
+
+def load_backends(bundle: ModelBundle, exported: Dict[str, Path]) -> dict:
+    """Instancia o eager e cada backend exportado disponível neste ambiente."""
+    backends = {"eager": EagerBackend(bundle.model, bundle.device)}
+    if "torchscript" in exported:
+        backends["torchscript"] = TorchScriptBackend(exported["torchscript"], bundle.device)
+    if "onnx" in exported:
+        try:
+            backends["onnx"] = OnnxRuntimeBackend(exported["onnx"], torch.get_num_threads())
+        except RuntimeError as e:
+            print(f"   ONNX Runtime indisponivel: {e}")
+    if "numpy" in exported:
+        backends["numpy"] = NumpyBackend(NumpyLSTM.load(exported["numpy"])[0])
+    return backends
+
+# ══════════════════════════════════════════════════════════════════
+# PARIDADE E LATENCIA
+# ══════════════════════════════════════════════════════════════════
+
+def random_windows(n: int, seq_length: int, seed: int = 42) -> np.ndarray:
+    """Janelas sintéticas (passeio aleatório em torno de R$ 30) em float32."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.02, size=(n, seq_length))
+    return (30 * np.exp(np.cumsum(returns, axis=1))).astype(np.float32)
+
+
+def check_parity(backends: dict, seq_length: int, n: int = 512, horizon: int = 5) -> Dict[str, float]:
+    """
+    Compara a saída de cada backend com o eager.
+
+    Backends com estado (numpy) também são comparados no rollout de
+    `horizon` dias, que passa por forward_with_state e step.
+
+    Returns:
+        Dict backend -> maior diferença absoluta em R$
+    """
+    windows = random_windows(n, seq_length)
+    eager = backends["eager"]
+    reference = eager.run(eager.prepare(windows))
+    reference_path = eager.rollout(eager.prepare(windows), horizon)
+
+    diffs = {}
+    for name, backend in backends.items():
+        if name == "eager":
+            continue
+        outputs = backend.run(backend.prepare(windows))
+        diffs[name] = float(np.max(np.abs(outputs - reference)))
+        if backend.stateful:
+            path = backend.rollout(backend.prepare(windows), horizon)
+            diffs[name] = max(diffs[name], float(np.max(np.abs(path - reference_path))))
+        status = "OK" if diffs[name] <= PARITY_TOLERANCE else "DIVERGENTE"
+        print(f"   {name:<12} max |diff| = R$ {diffs[name]:.6f} ({status})")
+    return diffs
+
+
+def benchmark_backends(
+    backends: dict,
+    seq_length: int,
+    batch_sizes: Sequence[int] = BENCHMARK_BATCH_SIZES,
+    repeats: int = BENCHMARK_REPEATS
+) -> Dict[str, Dict[int, float]]:
+    """
+    Latência mediana (ms) de prepare + run por backend e tamanho de lote.
+    """
+    results = {name: {} for name in backends}
+    for batch_size in batch_sizes:
+        windows = random_windows(batch_size, seq_length)
+        for name, backend in backends.items():
+            for _ in range(3):
+                backend.run(backend.prepare(windows))
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                backend.run(backend.prepare(windows))
+                times.append(time.perf_counter() - start)
+            results[name][batch_size] = float(np.median(times) * 1000)
+
+    header = "".join(f"{f'batch={b}':>14}" for b in batch_sizes)
+    print(f"   {'backend':<12}{header}")
+    for name, by_size in results.items():
+        row = "".join(f"{by_size[b]:>11.3f} ms" for b in batch_sizes)
+        print(f"   {name:<12}{row}")
+    return results
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+def main(model_dir: Path = MODELS_DIR, run_benchmark: bool = True) -> dict:
+    """Exporta, verifica a paridade e compara a latência dos backends."""
+    print("=" * 60)
+    print("Exportacao do modelo: TorchScript / ONNX / NumPy")
+    print("=" * 60)
+
+    bundle = load_bundle(model_dir, device="cpu", fuse=True)
+    print(f"\nModelo: {bundle.ticker} (id={bundle.model_id}, seq_length={bundle.seq_length})")
+
+    print("\nExportando...")
+    exported = export_bundle(bundle, model_dir)
+    backends = load_backends(bundle, exported)
+
+    print("\nParidade com o eager:")
+    diffs = check_parity(backends, bundle.seq_length)
+
+    latencies = {}
+    if run_benchmark:
+        print(f"\nLatencia mediana do forward ({BENCHMARK_REPEATS} repeticoes):")
+        latencies = benchmark_backends(backends, bundle.seq_length)
+
+    print("\n" + "=" * 60)
+    if all(diff <= PARITY_TOLERANCE for diff in diffs.values()):
+        print("CHECKPOINT: Artefatos exportados e verificados!")
+    else:
+        print("ATENCAO: backend com divergencia acima da tolerancia")
+    print("=" * 60)
+    print("Use INFERENCE_BACKEND=torchscript, onnx ou numpy na API.")
+
+    return {"exported": exported, "parity": diffs, "latency_ms": latencies}
+
+
+if __name__ == "__main__":
+    # Uso: python export_model.py [diretorio_do_modelo] [--skip-benchmark]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    result = main(
+        Path(args[0]) if args else MODELS_DIR,
+        run_benchmark="--skip-benchmark" not in sys.argv
+    )
+    if any(diff > PARITY_TOLERANCE for diff in result["parity"].values()):
+        sys.exit(1)
@@ -0,0 +1,106 @@
+# ═══════════════════════════════════════════════════════════════
+# Hot-reload de modelos
+# Objetivo: Trocar o modelo em producao sem reiniciar a API
+# ═══════════════════════════════════════════════════════════════
+
+import asyncio
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from registry import ModelBundle, ModelRegistry, files_signature
+except ImportError:
+    from src.registry import ModelBundle, ModelRegistry, files_signature
+
+# ══════════════════════════════════════════════════════════════════
+# OBSERVADOR DE ARTEFATOS
+# ══════════════════════════════════════════════════════════════════
+
+class ModelWatcher:
+    """
+    Observa os artefatos dos modelos residentes e os recarrega quando mudam.
+
+    A cada `interval_s` segundos compara mtime e tamanho de model.bundle,
+    model_lstm.pth, scaler.pkl e config.pkl com os do bundle carregado. Uma mudança só
+    dispara o reload quando a assinatura fica igual por duas verificações
+    seguidas, para não carregar um arquivo ainda sendo copiado.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        interval_s: float = 5.0,
+        on_reload: Optional[Callable[[Optional[ModelBundle], ModelBundle, float], None]] = None
+    ):
+        """
+        Inicializa o observador.
+
+        Args:
+            registry: Registro cujos modelos residentes são observados
+            interval_s: Intervalo entre verificações em segundos
+            on_reload: Chamado com (bundle anterior, bundle novo, duração em s)
+        """
+        self.registry = registry
+        self.interval_s = interval_s
+        self.on_reload = on_reload
+
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, Tuple] = {}
+        self._failed: Dict[str, Tuple] = {}
+
+    async def start(self) -> None:
+        """Inicia a verificação periódica no event loop atual."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Encerra a verificação periódica."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Erro ao verificar artefatos dos modelos: {e}")
+
+    async def check(self) -> None:
+        """Verifica os modelos residentes e recarrega os que mudaram em disco."""
+        for ticker, bundle in self.registry.resident().items():
+            if bundle.source_dir is None:
+                continue
+
+            signature = await asyncio.to_thread(files_signature, *bundle.artifact_paths)
+            # Arquivo que existia e sumiu: cópia em andamento, esperar
+            removed = any(new is None and old is not None for new, old in zip(signature, bundle.signature or ()))
+            if signature == bundle.signature or removed:
+                self._pending.pop(ticker, None)
+                continue
+
+            # Artefatos que já falharam só são tentados de novo se mudarem
+            if self._failed.get(ticker) == signature:
+                continue
+
+            # Esperar a assinatura estabilizar (cópia concluída)
+            if self._pending.get(ticker) != signature:
+                self._pending[ticker] = signature
+                continue
+            self._pending.pop(ticker, None)
+
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            try:
+                old, new = await asyncio.to_thread(self.registry.reload, ticker)
+            except Exception as e:
+                print(f"Falha no reload de {ticker}, mantendo versao {bundle.version}: {e}")
+                self._failed[ticker] = signature
+                continue
+            self._failed.pop(ticker, None)
+
+            if self.on_reload is not None:
+                self.on_reload(old, new, loop.time() - start_time)
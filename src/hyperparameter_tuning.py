@@ -3,28 +3,58 @@
 # Objetivo: Encontrar configuracao otima do modelo
 # ═══════════════════════════════════════════════════════════════
 
+import argparse
+import math
+import os
+import random
+import tempfile
 import torch
-import torch.nn as nn
-import torch.optim as optim
+import torch.multiprocessing as mp
 import numpy as np
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import time
 
-from model import StockLSTM
+from model import StockLSTM, fuse_scaler
 from preprocessing import preprocess_data
+from train import train_model, MIN_DELTA, PATIENCE
 
 MODELS_DIR = Path(__file__).parent.parent / "models"
 
+# Semente base: o experimento i usa SEED + i, em qualquer processo e ordem
+SEED = 42
+
+# Espaço amostrado pelo ASHA: lista = escolha uniforme; ("log", a, b) = log-uniforme
+SEARCH_SPACE = {
+    "hidden_size": [32, 50, 64, 100, 128],
+    "num_layers": [1, 2, 3],
+    "dropout": [0.0, 0.1, 0.2, 0.3],
+    "learning_rate": ("log", 1e-4, 3e-3),
+}
+
+# ASHA: trials amostrados, orçamento de épocas e fator de corte
+ASHA_TRIALS = 27
+ASHA_MIN_EPOCHS = 20
+ASHA_MAX_EPOCHS = 200
+ASHA_ETA = 3
+
 
 def train_and_evaluate(
     X_train, y_train, X_test, y_test, scaler,
     hidden_size=50, num_layers=2, dropout=0.2,
     epochs=100, learning_rate=0.001,
+    patience=PATIENCE, min_delta=MIN_DELTA,
+    checkpoint_dir=None, resume=False,
     verbose=False
 ):
     """
     Treina e avalia o modelo com configuração específica.
+    Usa o mesmo loop do train.py (mini-batches e early stopping):
+    `epochs` é o máximo, e os pesos avaliados são os da melhor época.
+    Com `checkpoint_dir`, grava um checkpoint na última época; com
+    `resume`, continua dele até `epochs` (usado pelo ASHA).
     Retorna as métricas de avaliação.
     """
     # Criar modelo
@@ -35,29 +65,30 @@ def train_and_evaluate(
         dropout=dropout
     )
     
-    criterion = nn.MSELoss()
-    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
-    
     # Treinar
-    model.train()
-    for epoch in range(epochs):
-        outputs = model(X_train)
-        loss = criterion(outputs, y_train)
-        
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
-        
-        if verbose and (epoch + 1) % 50 == 0:
-            print(f"  Epoch {epoch+1}/{epochs} - Loss: {loss.item():.6f}")
+    report = {}
+    model, train_losses, val_losses = train_model(
+        model, X_train, y_train, X_test, y_test,
+        epochs=epochs,
+        learning_rate=learning_rate,
+        verbose=verbose,
+        patience=patience,
+        min_delta=min_delta,
+        checkpoint_dir=checkpoint_dir,
+        checkpoint_every=0,
+        checkpoint_keep=1,
+        resume_from=checkpoint_dir if resume else None,
+        report=report
+    )
     
-    # Avaliar
+    # Avaliar com o scaler fundido nos pesos (como a API e o evaluate.py):
+    # o modelo recebe e devolve preços em R$, sem inverse_transform na saída
     model.eval()
+    fused = fuse_scaler(model, scaler.scale_, scaler.min_)
+    X_reais = scaler.inverse_transform(X_test.numpy().reshape(-1, 1)).reshape(X_test.shape)
     with torch.no_grad():
-        predictions = model(X_test)
-    
-    # Reverter normalização
-    predictions_reais = scaler.inverse_transform(predictions.numpy())
+        X_reais = torch.from_numpy(X_reais.astype(np.float32)).to(next(fused.parameters()).device)
+        predictions_reais = fused(X_reais).cpu().numpy()
     actual_reais = scaler.inverse_transform(y_test.numpy())
     
     # Calcular métricas
@@ -70,13 +101,106 @@ def train_and_evaluate(
         'mae': mae,
         'mape': mape,
         'model': model,
-        'train_loss': loss.item()
+        'train_loss': train_losses[-1],
+        'best_epoch': report['best_epoch'],
+        'epochs_run': report['epochs_run'],
+        'epochs_saved': report['epochs_saved'],
+        'seconds_saved': report['seconds_saved']
+    }
+
+
+def save_optimized_model(model, mape, rmse, mae) -> Path:
+    """Salva o melhor modelo da busca em models/model_lstm_optimized.pth."""
+    save_path = MODELS_DIR / "model_lstm_optimized.pth"
+    torch.save({
+        'model_state_dict': model.state_dict(),
+        'model_config': model.get_config(),
+        'mape': mape,
+        'rmse': rmse,
+        'mae': mae
+    }, save_path)
+    return save_path
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO PARALELA
+# ══════════════════════════════════════════════════════════════════
+
+def available_cores() -> int:
+    """Núcleos disponíveis para este processo (respeita taskset/cgroups)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+# Dados do experimento no processo do pool (definidos por _init_worker)
+_worker_data = None
+
+
+def _init_worker(data, num_threads):
+    """Inicializa um processo do pool: threads do torch e dados compartilhados."""
+    global _worker_data
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Já definido (execução no processo principal)
+    _worker_data = data
+
+
+def _run_trial(name, config, seed):
+    """Treina e avalia um experimento com os dados do processo."""
+    X_train, y_train, X_test, y_test, scaler = _worker_data
+    torch.manual_seed(seed)
+    
+    start_time = time.time()
+    result = train_and_evaluate(X_train, y_train, X_test, y_test, scaler, **config)
+    model = result.pop('model')
+    
+    # Só os pesos voltam ao processo principal (o modelo é refeito lá)
+    return {
+        **result,
+        'name': name,
+        'config': config,
+        'model_state_dict': model.state_dict(),
+        'time_s': time.time() - start_time
     }
 
 
-def run_experiments():
+def make_pool(data, n_workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de processos para os experimentos.
+    
+    - Threads: cada processo usa núcleos // n_workers threads do torch,
+      então o total de threads não passa do número de núcleos.
+    - Dados: os tensores vão para memória compartilhada e são entregues uma
+      vez por processo (initargs); cada tarefa envia só a configuração.
+    - spawn: processos novos, sem herdar o pool de threads do OpenMP do pai.
+    
+    Args:
+        data: (X_train, y_train, X_test, y_test, scaler)
+        n_workers: Número de processos
+    """
+    for tensor in data[:4]:
+        tensor.share_memory_()
+    return ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=mp.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(data, max(1, available_cores() // n_workers))
+    )
+
+
+def run_experiments(n_workers: Optional[int] = None):
     """
     Executa experimentos com diferentes configuracoes.
+    
+    Os experimentos rodam em paralelo em um pool de processos e cada
+    resultado é impresso assim que termina.
+    
+    Args:
+        n_workers: Processos em paralelo (None = um por núcleo; 1 = no
+            processo principal)
     """
     print("=" * 70)
     print("HYPERPARAMETER TUNING - Buscando MAPE < 5%")
@@ -118,40 +242,76 @@ def run_experiments():
     best_config = None
     best_model = None
     
-    print(f"\nExecutando {len(experiments)} experimentos...\n")
-    print("-" * 70)
-    print(f"{'Experimento':<15} | {'MAPE':>8} | {'RMSE':>8} | {'MAE':>8} | {'Status':<10}")
-    print("-" * 70)
+    data = (X_train, y_train, X_test, y_test, scaler)
+    n_workers = min(n_workers or available_cores(), len(experiments))
     
-    for i, config in enumerate(experiments):
-        name = config.pop('name')
-        
-        start_time = time.time()
-        result = train_and_evaluate(X_train, y_train, X_test, y_test, scaler, **config)
-        elapsed = time.time() - start_time
-        
+    print(f"\nExecutando {len(experiments)} experimentos em {n_workers} processo(s) "
+          f"({max(1, available_cores() // n_workers)} thread(s) cada)...\n")
+    print("-" * 80)
+    print(f"{'Experimento':<15} | {'MAPE':>8} | {'RMSE':>8} | {'MAE':>8} | {'Épocas':>7} | {'Status':<10}")
+    print("-" * 80)
+    
+    sweep_start = time.time()
+    trials = [(config.pop('name'), config, SEED + i) for i, config in enumerate(experiments)]
+    
+    if n_workers == 1:
+        _init_worker(data, available_cores())
+        finished = (_run_trial(*trial) for trial in trials)
+        pool = None
+    else:
+        pool = make_pool(data, n_workers)
+        finished = (future.result() for future in as_completed([pool.submit(_run_trial, *t) for t in trials]))
+    
+    for result in finished:
+        name, config, elapsed = result['name'], result['config'], result['time_s']
         mape = result['mape']
         rmse = result['rmse']
         mae = result['mae']
         
         status = "< 5%!" if mape < 5 else ("~5%" if mape < 5.5 else "")
         
-        print(f"{name:<15} | {mape:>7.2f}% | R${rmse:>5.2f} | R${mae:>5.2f} | {status}")
+        epochs_label = f"{result['epochs_run']}/{config['epochs']}"
+        print(f"{name:<15} | {mape:>7.2f}% | R${rmse:>5.2f} | R${mae:>5.2f} | {epochs_label:>7} | {status}")
         
         results.append({
             'name': name,
             'config': config,
             'mape': mape,
             'rmse': rmse,
-            'mae': mae
+            'mae': mae,
+            'epochs_run': result['epochs_run'],
+            'epochs_saved': result['epochs_saved'],
+            'seconds_saved': result['seconds_saved'],
+            'time_s': elapsed
         })
         
         if mape < best_mape:
             best_mape = mape
             best_config = {'name': name, **config}
-            best_model = result['model']
+            best_model = StockLSTM(
+                input_size=1,
+                hidden_size=config['hidden_size'],
+                num_layers=config['num_layers'],
+                dropout=config['dropout']
+            )
+            best_model.load_state_dict(result['model_state_dict'])
     
-    print("-" * 70)
+    if pool is not None:
+        pool.shutdown()
+    sweep_time = time.time() - sweep_start
+    
+    print("-" * 80)
+    
+    # Tempo de parede x soma dos tempos de cada experimento
+    trials_time = sum(r['time_s'] for r in results)
+    print(f"\nTempo total: {sweep_time:.0f}s (soma dos experimentos: {trials_time:.0f}s, "
+          f"speedup {trials_time / sweep_time:.1f}x com {n_workers} processo(s))")
+    
+    # Economia do early stopping
+    epochs_total = sum(r['config']['epochs'] for r in results)
+    epochs_saved = sum(r['epochs_saved'] for r in results)
+    print(f"Early stopping: {epochs_saved}/{epochs_total} épocas economizadas "
+          f"(~{sum(r['seconds_saved'] for r in results):.0f}s de treino evitados)")
     
     # Resumo
     print(f"\n{'='*70}")
@@ -178,14 +338,9 @@ def run_experiments():
         print(f"\nSUCESSO! Encontrada configuracao com MAPE < 5%!")
         
         # Salvar melhor modelo
-        save_path = MODELS_DIR / "model_lstm_optimized.pth"
-        torch.save({
-            'model_state_dict': best_model.state_dict(),
-            'model_config': best_model.get_config(),
-            'mape': best_mape,
-            'rmse': results_sorted[0]['rmse'],
-            'mae': results_sorted[0]['mae']
-        }, save_path)
+        save_path = save_optimized_model(
+            best_model, best_mape, results_sorted[0]['rmse'], results_sorted[0]['mae']
+        )
         print(f"   Modelo salvo em: {save_path}")
     else:
         print(f"\nMAPE minimo alcancado: {best_mape:.2f}%")
@@ -197,5 +352,281 @@ def run_experiments():
     return results, best_config, best_model
 
 
+# ══════════════════════════════════════════════════════════════════
+# BUSCA COM PODA (ASHA)
+# ══════════════════════════════════════════════════════════════════
+
+def sample_configs(space: dict = SEARCH_SPACE, n: int = ASHA_TRIALS, seed: int = SEED) -> List[dict]:
+    """
+    Sorteia n configurações do espaço de busca.
+    
+    Args:
+        space: Valores por hiperparâmetro: lista (escolha uniforme) ou
+            ("log", mínimo, máximo) (log-uniforme, ex: learning rate)
+        n: Número de configurações
+        seed: Semente do sorteio
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for key, values in space.items():
+            if isinstance(values, tuple) and values[0] == "log":
+                _, low, high = values
+                config[key] = float(f"{math.exp(rng.uniform(math.log(low), math.log(high))):.2g}")
+            else:
+                config[key] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def asha_rungs(min_epochs: int = ASHA_MIN_EPOCHS, max_epochs: int = ASHA_MAX_EPOCHS, eta: int = ASHA_ETA) -> List[int]:
+    """Orçamentos (épocas) de cada degrau: max, max/eta, max/eta², ... ≥ min."""
+    rungs = [max_epochs]
+    budget = float(max_epochs)
+    while budget / eta >= min_epochs:
+        budget /= eta
+        rungs.insert(0, round(budget))
+    return rungs
+
+
+class ASHAScheduler:
+    """
+    Successive halving assíncrono (ASHA).
+    
+    Todo trial começa no degrau 0 (menor orçamento). Quando um processo
+    fica livre, o escalonador promove ao degrau seguinte o melhor trial
+    ainda não promovido que esteja entre o 1/eta melhores do seu degrau,
+    olhando primeiro os degraus mais altos; sem promoção possível, começa
+    um trial novo. Os demais param onde estão (poda).
+    
+    Não há barreira entre degraus: os processos nunca esperam um degrau
+    inteiro terminar, ao custo de algumas promoções decididas com poucos
+    resultados.
+    """
+    
+    def __init__(self, n_trials: int, n_rungs: int, eta: int = ASHA_ETA):
+        self.n_trials = n_trials
+        self.eta = max(2, eta)
+        self.next_trial = 0
+        
+        # Por degrau: trial → MAPE, e trials já promovidos
+        self.results: List[Dict[int, float]] = [{} for _ in range(n_rungs)]
+        self.promoted: List[set] = [set() for _ in range(n_rungs)]
+    
+    def next_job(self) -> Optional[Tuple[int, int]]:
+        """Próximo (trial, degrau) a executar, ou None se não houver."""
+        for rung in reversed(range(len(self.results) - 1)):
+            done = self.results[rung]
+            top = sorted(done, key=done.get)[:len(done) // self.eta]
+            for trial in top:
+                if trial not in self.promoted[rung]:
+                    self.promoted[rung].add(trial)
+                    return trial, rung + 1
+        
+        if self.next_trial < self.n_trials:
+            self.next_trial += 1
+            return self.next_trial - 1, 0
+        return None
+    
+    def report(self, trial: int, rung: int, mape: float) -> None:
+        self.results[rung][trial] = mape
+
+
+def _run_rung(trial, config, epochs, checkpoint_dir, seed):
+    """Treina um trial até `epochs`, continuando do seu checkpoint se houver."""
+    X_train, y_train, X_test, y_test, scaler = _worker_data
+    resume = any(Path(checkpoint_dir).glob("checkpoint_epoch_*.pt"))
+    if not resume:
+        torch.manual_seed(seed)
+    
+    start_time = time.time()
+    result = train_and_evaluate(
+        X_train, y_train, X_test, y_test, scaler, **config,
+        epochs=epochs, checkpoint_dir=checkpoint_dir, resume=resume
+    )
+    model = result.pop('model')
+    return {
+        **result,
+        'trial': trial,
+        'model_state_dict': model.state_dict(),
+        'time_s': time.time() - start_time
+    }
+
+
+def run_asha(
+    n_trials: int = ASHA_TRIALS,
+    min_epochs: int = ASHA_MIN_EPOCHS,
+    max_epochs: int = ASHA_MAX_EPOCHS,
+    eta: int = ASHA_ETA,
+    space: dict = SEARCH_SPACE,
+    n_workers: Optional[int] = None,
+    seed: int = SEED
+):
+    """
+    Busca com poda: sorteia `n_trials` configurações e treina cada uma por
+    degraus de épocas, parando as piores em cada degrau (ASHA).
+    
+    Um trial promovido continua do checkpoint do degrau anterior (mesmo
+    resultado de um treino direto). Ao final, compara as épocas treinadas
+    com as da busca exaustiva (todos os trials até `max_epochs`).
+    
+    Args:
+        n_trials: Configurações sorteadas
+        min_epochs: Orçamento mínimo (primeiro degrau)
+        max_epochs: Orçamento máximo (último degrau)
+        eta: Fator de corte: só 1/eta de cada degrau é promovido
+        space: Espaço de busca (ver sample_configs)
+        n_workers: Processos em paralelo (None = um por núcleo)
+        seed: Semente do sorteio e dos trials
+    
+    Returns:
+        Tuple com (trials, melhor configuracao, melhor modelo)
+    """
+    print("=" * 70)
+    print("HYPERPARAMETER TUNING - ASHA (successive halving assíncrono)")
+    print("=" * 70)
+    
+    print("\nCarregando dados...")
+    X_train, X_test, y_train, y_test, scaler = preprocess_data(save_scaler=False)
+    data = (X_train, y_train, X_test, y_test, scaler)
+    
+    configs = sample_configs(space, n_trials, seed)
+    rungs = asha_rungs(min_epochs, max_epochs, eta)
+    scheduler = ASHAScheduler(n_trials, len(rungs), eta)
+    n_workers = n_workers or available_cores()
+    
+    # Estado de cada trial: último resultado, épocas treinadas, parado pelo early stopping
+    trials = [
+        {'trial': i, 'config': config, 'rung': None, 'epochs_trained': 0, 'time_s': 0.0,
+         'stopped': False, 'result': None}
+        for i, config in enumerate(configs)
+    ]
+    
+    print(f"\n{n_trials} trials, degraus de {rungs} épocas, eta={eta}, {n_workers} processo(s)\n")
+    print("-" * 80)
+    print(f"{'Trial':>5} | {'Épocas':>6} | {'MAPE':>8} | Configuração")
+    print("-" * 80)
+    
+    sweep_start = time.time()
+    pool = make_pool(data, n_workers)
+    running = {}
+    
+    with tempfile.TemporaryDirectory(prefix="asha_") as tmp_dir:
+        while True:
+            # Ocupar os processos livres
+            while len(running) < n_workers:
+                job = scheduler.next_job()
+                if job is None:
+                    break
+                trial_id, rung = job
+                trial = trials[trial_id]
+                
+                if trial['stopped']:
+                    # Parado pelo early stopping: mais épocas não mudam o resultado
+                    trial['rung'] = rung
+                    scheduler.report(trial_id, rung, trial['result']['mape'])
+                    continue
+                
+                checkpoint_dir = Path(tmp_dir) / f"trial_{trial_id:03d}"
+                future = pool.submit(
+                    _run_rung, trial_id, trial['config'], rungs[rung], checkpoint_dir, seed + trial_id
+                )
+                running[future] = rung
+            
+            if not running:
+                break
+            
+            # Registrar os trials que terminaram seu degrau
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                rung = running.pop(future)
+                result = future.result()
+                trial = trials[result['trial']]
+                trial['epochs_trained'] = result['epochs_run']
+                trial['time_s'] += result['time_s']
+                trial['stopped'] = result['epochs_run'] < rungs[rung]
+                trial['rung'] = rung
+                trial['result'] = result
+                scheduler.report(result['trial'], rung, result['mape'])
+                
+                config = trial['config']
+                print(f"{result['trial']:>5} | {result['epochs_run']:>6} | {result['mape']:>7.2f}% | "
+                      f"hidden={config['hidden_size']} layers={config['num_layers']} "
+                      f"dropout={config['dropout']} lr={config['learning_rate']}"
+                      + (" (early stop)" if trial['stopped'] else ""))
+    
+    pool.shutdown()
+    sweep_time = time.time() - sweep_start
+    print("-" * 80)
+    
+    # Trials por degrau
+    print("\nTrials por degrau:")
+    for rung, budget in enumerate(rungs):
+        print(f"   {budget:>4} épocas: {len(scheduler.results[rung])}")
+    
+    # Economia em relação à busca exaustiva (todos os trials até max_epochs)
+    # (o tempo da exaustiva é estimado pelo tempo médio por época desta busca)
+    epochs_trained = sum(t['epochs_trained'] for t in trials)
+    epochs_exhaustive = n_trials * max_epochs
+    train_time = sum(t['time_s'] for t in trials)
+    print(f"\nCompute: {epochs_trained} épocas treinadas vs {epochs_exhaustive} da busca exaustiva "
+          f"({1 - epochs_trained / epochs_exhaustive:.0%} economizado)")
+    print(f"   Tempo de treino: {train_time:.0f}s "
+          f"(exaustiva estimada: ~{train_time / max(1, epochs_trained) * epochs_exhaustive:.0f}s); "
+          f"tempo de parede: {sweep_time:.0f}s com {n_workers} processo(s)")
+    
+    # Melhor trial do degrau mais alto alcançado
+    top_rung = max(t['rung'] for t in trials)
+    finalists = [t for t in trials if t['rung'] == top_rung]
+    best = min(finalists, key=lambda t: t['result']['mape'])
+    best_config = {'name': f"Trial {best['trial']}", **best['config'], 'epochs': rungs[top_rung]}
+    best_model = StockLSTM(
+        input_size=1,
+        hidden_size=best['config']['hidden_size'],
+        num_layers=best['config']['num_layers'],
+        dropout=best['config']['dropout']
+    )
+    best_model.load_state_dict(best['result']['model_state_dict'])
+    best_mape = best['result']['mape']
+    
+    print(f"\nMelhor configuracao: {best_config['name']} ({rungs[top_rung]} épocas)")
+    print(f"   MAPE: {best_mape:.2f}%")
+    print(f"   Hidden Size: {best_config['hidden_size']}")
+    print(f"   Num Layers: {best_config['num_layers']}")
+    print(f"   Dropout: {best_config['dropout']}")
+    print(f"   Learning Rate: {best_config['learning_rate']}")
+    
+    if best_mape < 5:
+        save_path = save_optimized_model(best_model, best_mape, best['result']['rmse'], best['result']['mae'])
+        print(f"\nSUCESSO! Modelo salvo em: {save_path}")
+    
+    return trials, best_config, best_model
+
+
 if __name__ == "__main__":
-    results, best_config, best_model = run_experiments()
+    # Uso: python hyperparameter_tuning.py [--workers N]
+    #      python hyperparameter_tuning.py --asha [--trials 27] [--min-epochs 20] [--max-epochs 200] [--eta 3]
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros do LSTM")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos em paralelo (padrão: um por núcleo; 1 = sequencial)")
+    parser.add_argument("--asha", action="store_true",
+                        help="Sorteia configurações do SEARCH_SPACE e poda as piores por degraus de épocas")
+    parser.add_argument("--trials", type=int, default=ASHA_TRIALS)
+    parser.add_argument("--min-epochs", type=int, default=ASHA_MIN_EPOCHS)
+    parser.add_argument("--max-epochs", type=int, default=ASHA_MAX_EPOCHS)
+    parser.add_argument("--eta", type=int, default=ASHA_ETA)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+    
+    if args.asha:
+        trials, best_config, best_model = run_asha(
+            n_trials=args.trials,
+            min_epochs=args.min_epochs,
+            max_epochs=args.max_epochs,
+            eta=args.eta,
+            n_workers=args.workers,
+            seed=args.seed
+        )
+    else:
+        results, best_config, best_model = run_experiments(n_workers=args.workers)
@@ -0,0 +1,407 @@
+# ═══════════════════════════════════════════════════════════════
+# Metricas da API (formato texto do Prometheus)
+# Objetivo: Latencia por etapa, contadores de requisicoes e gauges
+# ═══════════════════════════════════════════════════════════════
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+try:
+    import profiling
+except ImportError:
+    from src import profiling
+
+# Buckets de latência em segundos (50 µs a 2,5 s)
+DEFAULT_BUCKETS_S = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+# ══════════════════════════════════════════════════════════════════
+# TIPOS DE METRICA
+# ══════════════════════════════════════════════════════════════════
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Formata {nome="valor",...} escapando aspas, barras e quebras de linha."""
+    parts = [
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base: nome, descrição, nomes dos labels e uma série por combinação de labels."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo que sobe e desce."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def clear(self) -> None:
+        """Remove todas as séries (ex: modelos descarregados)."""
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Histograma de buckets fixos (cumulativos na exportação).
+
+    Cada observação custa um bisect e um incremento sob lock, o que
+    permite deixá-lo ligado em produção.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS_S
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagem por bucket (+Inf no fim), soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager que observa a duração do bloco."""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+# ══════════════════════════════════════════════════════════════════
+# REGISTRO E EXPORTACAO
+# ══════════════════════════════════════════════════════════════════
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas exportadas pelo /metrics.
+
+    Coletores (`add_collector`) são chamados antes de cada exportação para
+    atualizar gauges que refletem o estado atual (ex: modelos residentes).
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS_S
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Exporta todas as métricas no formato texto do Prometheus (0.0.4)."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Erro ao coletar metricas: {e}")
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "predict_stage_duration_seconds",
+    "Latencia por etapa da previsao (validation, scaling, tensor, transfer, forward, inverse, serialization)",
+    ["stage"]
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "http_requests_total",
+    "Requisicoes HTTP atendidas por rota e status",
+    ["method", "route", "status"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Latencia total das requisicoes HTTP por rota",
+    ["method", "route"]
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "Requisicoes HTTP em andamento"
+)
+
+# ══════════════════════════════════════════════════════════════════
+# TEMPO POR ETAPA
+# ══════════════════════════════════════════════════════════════════
+
+class StageClock:
+    """
+    Cronômetro de etapas consecutivas: cada `lap(stage)` observa o tempo
+    desde a marca anterior no histograma de etapas e, se a requisição
+    pediu perfil, também no perfil dela (ver profiling.py).
+
+    Uso:
+        clock = StageClock()
+        inputs = ...            ; clock.lap("scaling")
+        X = torch.from_numpy()  ; clock.lap("tensor")
+    """
+    __slots__ = ("last", "profile")
+
+    def __init__(self):
+        self.last = time.perf_counter()
+        self.profile = profiling.current_profile()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - self.last, stage)
+        if self.profile is not None:
+            self.profile.add(stage, now - self.last)
+        self.last = now
+
+
+class _RequestTiming:
+    """Marcas de tempo de uma requisição, compartilhadas com o middleware."""
+    __slots__ = ("start", "admitted", "handled")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.admitted = start
+        self.handled: Optional[float] = None
+
+
+_current_request: contextvars.ContextVar[Optional[_RequestTiming]] = contextvars.ContextVar(
+    "current_request_timing", default=None
+)
+
+
+def mark_admitted() -> None:
+    """
+    Marca a admissão da requisição corrente: a etapa `validation` passa a
+    contar daqui, sem o tempo de fila do controle de admissão (que tem o
+    próprio histograma).
+    """
+    timing = _current_request.get()
+    if timing is not None:
+        timing.admitted = time.perf_counter()
+
+
+def instrument(endpoint: Callable) -> Callable:
+    """
+    Decorator de endpoints: observa as etapas `validation` e `serialization`.
+
+    - validation: da admissão da requisição (ou do recebimento, sem controle
+      de admissão) até o endpoint ser chamado (leitura do corpo, parse do
+      JSON e validação pydantic)
+    - serialization: do retorno do endpoint até o início da resposta
+      (validação do response_model e geração do JSON)
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timing = _current_request.get()
+        if timing is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - timing.admitted, "validation")
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.handled = time.perf_counter()
+
+    return wrapper
+
+# ══════════════════════════════════════════════════════════════════
+# MIDDLEWARE ASGI
+# ══════════════════════════════════════════════════════════════════
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro: conta requisições por rota e status, mede a
+    latência total, mantém o gauge de requisições em andamento e fecha a
+    etapa `serialization` dos endpoints instrumentados.
+
+    A rota é o template (ex: /stream/sessions/{session_id}), não o path,
+    para manter a cardinalidade dos labels limitada.
+
+    Com `profiling=True`, requisições com o header X-Profile (ou ?profile=)
+    ganham um perfil por etapa, devolvido no header Server-Timing.
+    """
+
+    def __init__(self, app, profiling: bool = False):
+        self.app = app
+        self.profiling = profiling
+
+    @staticmethod
+    def profile_mode(scope) -> Optional[str]:
+        """Modo de perfil pedido no header X-Profile ou na query `profile`."""
+        for name, value in scope.get("headers", ()):
+            if name == profiling.PROFILE_HEADER.encode():
+                return profiling.parse_mode(value.decode("latin-1"))
+        query = scope.get("query_string", b"")
+        if profiling.PROFILE_QUERY.encode() in query:
+            values = parse_qs(query.decode("latin-1")).get(profiling.PROFILE_QUERY)
+            return profiling.parse_mode(values[-1]) if values else None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = _RequestTiming(time.perf_counter())
+        token = _current_request.set(timing)
+        status_code = 500
+
+        mode = self.profile_mode(scope) if self.profiling else None
+        profile = profiling.RequestProfile(mode) if mode else None
+        profile_token = profiling.activate(profile)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                now = time.perf_counter()
+                if timing.handled is not None:
+                    STAGE_SECONDS.observe(now - timing.handled, "serialization")
+                    if profile is not None:
+                        profile.add("serialization", now - timing.handled)
+                if profile is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", profile.server_timing(now).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _current_request.reset(token)
+            profiling.deactivate(profile_token)
+
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUESTS_TOTAL.inc(method, route_path, str(status_code))
+            REQUEST_SECONDS.observe(time.perf_counter() - timing.start, method, route_path)
@@ -5,6 +5,7 @@
 
 import torch
 import torch.nn as nn
+from typing import Optional, Tuple
 
 # ══════════════════════════════════════════════════════════════════
 # ARQUITETURA LSTM
@@ -116,6 +117,73 @@ class StockLSTM(nn.Module):
         
         return prediction
     
+    def forward_with_state(
+        self,
+        x: torch.Tensor,
+        hidden: Optional[Tuple[torch.Tensor, torch.Tensor]] = None
+    ) -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        Forward pass que também devolve o estado final da LSTM.
+        
+        Permite continuar a sequência depois sem reprocessar a janela:
+        o estado (h_n, c_n) retornado resume todos os passos já vistos.
+        
+        Args:
+            x: Tensor de entrada com shape (batch_size, seq_length, input_size)
+            hidden: Estado inicial (h_0, c_0), cada um com shape
+                (num_layers, batch_size, hidden_size); None = zeros
+                
+        Returns:
+            Tuple com (previsões (batch_size, 1), (h_n, c_n))
+        """
+        lstm_out, hidden = self.lstm(x, hidden)
+        prediction = self.linear(self.dropout(lstm_out[:, -1, :]))
+        return prediction, hidden
+    
+    def step(
+        self,
+        x_t: torch.Tensor,
+        hidden: Tuple[torch.Tensor, torch.Tensor]
+    ) -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        Avança a LSTM um único passo a partir de um estado salvo.
+        
+        Custa O(1) passos recorrentes, contra O(seq_length) do forward completo.
+        
+        Args:
+            x_t: Nova observação com shape (batch_size, input_size)
+            hidden: Estado (h, c) retornado por forward_with_state ou step
+            
+        Returns:
+            Tuple com (previsões (batch_size, 1), novo estado (h, c))
+        """
+        return self.forward_with_state(x_t.unsqueeze(1), hidden)
+    
+    def rollout(self, x: torch.Tensor, horizon: int) -> torch.Tensor:
+        """
+        Previsão autorregressiva de vários passos à frente.
+        
+        Processa a janela uma vez e, a cada passo, alimenta a previsão
+        anterior como nova observação, reaproveitando o estado (h, c) em
+        vez de reprocessar a janela inteira. Requer input_size=1 (a única
+        feature é o próprio preço previsto).
+        
+        Args:
+            x: Tensor de entrada com shape (batch_size, seq_length, 1)
+            horizon: Número de passos à frente
+            
+        Returns:
+            Tensor com previsões de shape (batch_size, horizon)
+        """
+        prediction, hidden = self.forward_with_state(x)
+        predictions = [prediction]
+        
+        for _ in range(horizon - 1):
+            prediction, hidden = self.step(prediction, hidden)
+            predictions.append(prediction)
+        
+        return torch.cat(predictions, dim=1)
+    
     def get_config(self) -> dict:
         """Retorna configuração do modelo para salvamento."""
         return {
@@ -164,6 +232,57 @@ def create_model(
     return model
 
 
+def fuse_scaler(model: StockLSTM, scale, min_) -> StockLSTM:
+    """
+    Cria uma cópia do modelo com a normalização MinMax embutida nos pesos.
+    
+    O MinMaxScaler faz x_norm = x * scale + min e y = (y_norm - min) / scale.
+    Como as duas operações são afins, elas podem ser absorvidas pelas camadas
+    que tocam a entrada e a saída:
+    
+        Entrada (1ª camada LSTM):  W_ih · (x·s + m) + b_ih
+                                 = (W_ih·s) · x + (b_ih + W_ih · m)
+        Saída (Linear):           (W·h + b - m) / s
+                                 = (W/s) · h + (b - m) / s
+    
+    O modelo resultante recebe e devolve preços em R$, sem passar pelo
+    sklearn na inferência (inclusive em step/rollout, já que a entrada e a
+    saída ficam na mesma escala).
+    
+    Args:
+        model: Modelo treinado com dados normalizados
+        scale: scaler.scale_ (um valor por feature; a feature 0 é o preço previsto)
+        min_: scaler.min_ (um valor por feature)
+        
+    Returns:
+        Novo StockLSTM que opera diretamente em preços
+    """
+    fused = StockLSTM(
+        input_size=model.input_size,
+        hidden_size=model.hidden_size,
+        num_layers=model.num_layers,
+        dropout=model.dropout_rate
+    )
+    fused.load_state_dict(model.state_dict())
+    fused.to(next(model.parameters()).device)
+    fused.eval()
+    
+    weight_ih = fused.lstm.weight_ih_l0
+    scale = torch.as_tensor(scale, dtype=weight_ih.dtype, device=weight_ih.device).reshape(-1)
+    min_ = torch.as_tensor(min_, dtype=weight_ih.dtype, device=weight_ih.device).reshape(-1)
+    
+    with torch.no_grad():
+        # Entrada: absorver x·s + m na primeira camada LSTM
+        fused.lstm.bias_ih_l0.add_(weight_ih @ min_)
+        weight_ih.mul_(scale)
+        
+        # Saída: absorver (y - m) / s na camada linear
+        fused.linear.weight.div_(scale[0])
+        fused.linear.bias.sub_(min_[0]).div_(scale[0])
+    
+    return fused
+
+
 def count_parameters(model: nn.Module) -> int:
     """Conta o número de parâmetros treináveis do modelo."""
     return sum(p.numel() for p in model.parameters() if p.requires_grad)
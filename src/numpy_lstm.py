@@ -0,0 +1,244 @@
+# ═══════════════════════════════════════════════════════════════
+# Motor LSTM em NumPy
+# Objetivo: Inferencia do StockLSTM sem torch (imagem e workers menores)
+# ═══════════════════════════════════════════════════════════════
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Pesos exportados de model_lstm.pth (scaler fundido), ao lado dos demais artefatos
+NUMPY_WEIGHTS_FILENAME = "model_lstm.npz"
+
+# ══════════════════════════════════════════════════════════════════
+# MOTOR
+# ══════════════════════════════════════════════════════════════════
+
+def _sigmoid_(x: np.ndarray) -> np.ndarray:
+    """Sigmoide in-place e estável (sem overflow de exp para entradas muito negativas)."""
+    x *= 0.5
+    np.tanh(x, out=x)
+    x *= 0.5
+    x += 0.5
+    return x
+
+
+class NumpyLSTM:
+    """
+    Forward do StockLSTM em NumPy vetorizado, com a mesma interface de
+    inferência do modelo torch (forward, forward_with_state, step, rollout).
+
+    Cada camada processa a sequência inteira de uma vez: a projeção da
+    entrada (x @ W_ih) é um único matmul para todos os passos e o laço no
+    tempo faz só h @ W_hh e as portas. Ordem das portas igual à do
+    nn.LSTM: input, forget, cell (g), output.
+
+    Os pesos da porta g são multiplicados por 2 na carga para que as quatro
+    portas saiam de uma única sigmoide: tanh(x) = 2·sigmoide(2x) − 1.
+
+    Estado (h, c): arrays (num_layers, batch, hidden_size), como no torch.
+    """
+
+    # Os pesos exportados já incluem o MinMaxScaler (entrada e saída em R$)
+    scaler_fused = True
+
+    def __init__(self, weights: Dict[str, np.ndarray], num_layers: int, hidden_size: int):
+        self.num_layers = num_layers
+        self.hidden_size = hidden_size
+        H = hidden_size
+
+        gate_scale = np.ones(4 * H, dtype=np.float32)
+        gate_scale[2 * H:3 * H] = 2.0
+
+        # Por camada: W_ih^T (in, 4H), W_hh^T (H, 4H), b_ih + b_hh (4H,)
+        self.layers = []
+        for layer in range(num_layers):
+            w_ih = weights[f"lstm.weight_ih_l{layer}"].astype(np.float32) * gate_scale[:, None]
+            w_hh = weights[f"lstm.weight_hh_l{layer}"].astype(np.float32) * gate_scale[:, None]
+            bias = (weights[f"lstm.bias_ih_l{layer}"] + weights[f"lstm.bias_hh_l{layer}"]).astype(np.float32)
+            self.layers.append((
+                np.ascontiguousarray(w_ih.T),
+                np.ascontiguousarray(w_hh.T),
+                bias * gate_scale
+            ))
+
+        self.linear_w = np.ascontiguousarray(weights["linear.weight"].astype(np.float32).T)
+        self.linear_b = weights["linear.bias"].astype(np.float32)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["NumpyLSTM", dict]:
+        """
+        Carrega pesos e metadados de um .npz gerado por export_npz.
+
+        Returns:
+            Tuple com (motor, metadados da exportação)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            weights = {key: data[key] for key in data.files if key != "__meta__"}
+        engine = cls(weights, meta["num_layers"], meta["hidden_size"])
+        return engine, meta
+
+    @classmethod
+    def from_state_dict(
+        cls,
+        weights: Dict[str, np.ndarray],
+        model_config: dict,
+        scale: np.ndarray,
+        min_: np.ndarray
+    ) -> "NumpyLSTM":
+        """
+        Cria o motor a partir do state_dict de treino (pesos normalizados),
+        fundindo o MinMaxScaler em NumPy como model.fuse_scaler.
+
+        Usado com model.bundle: o backend numpy não precisa do .npz exportado.
+        """
+        weights = {key: np.asarray(value, dtype=np.float64) for key, value in weights.items()}
+        scale = np.asarray(scale, dtype=np.float64).reshape(-1)
+        min_ = np.asarray(min_, dtype=np.float64).reshape(-1)
+
+        # Entrada: W_ih·(x·s + m) + b_ih = (W_ih·s)·x + (b_ih + W_ih·m)
+        weights["lstm.bias_ih_l0"] = weights["lstm.bias_ih_l0"] + weights["lstm.weight_ih_l0"] @ min_
+        weights["lstm.weight_ih_l0"] = weights["lstm.weight_ih_l0"] * scale
+
+        # Saída: (W·h + b − m) / s
+        weights["linear.weight"] = weights["linear.weight"] / scale[0]
+        weights["linear.bias"] = (weights["linear.bias"] - min_[0]) / scale[0]
+
+        return cls(weights, model_config.get('num_layers', 2), model_config.get('hidden_size', 100))
+
+    @property
+    def nbytes(self) -> int:
+        """Memória dos pesos."""
+        arrays = [a for layer in self.layers for a in layer] + [self.linear_w, self.linear_b]
+        return sum(a.nbytes for a in arrays)
+
+    def _run_layer(
+        self,
+        inputs: np.ndarray,
+        h: np.ndarray,
+        c: np.ndarray,
+        layer: int,
+        keep_outputs: bool
+    ) -> Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]:
+        """Processa a sequência (batch, seq, in) em uma camada a partir de (h, c)."""
+        w_ih, w_hh, bias = self.layers[layer]
+        H = self.hidden_size
+        n_steps = inputs.shape[1]
+
+        gates_x = inputs @ w_ih + bias
+        outputs = np.empty((inputs.shape[0], n_steps, H), dtype=np.float32) if keep_outputs else None
+
+        # Operações in-place nos buffers do passo: menos alocações no laço
+        c = c.copy()
+        gates = np.empty((inputs.shape[0], 4 * H), dtype=np.float32)
+        tanh_c = np.empty_like(c)
+        i, f = gates[:, :H], gates[:, H:2 * H]
+        g, o = gates[:, 2 * H:3 * H], gates[:, 3 * H:]
+
+        for t in range(n_steps):
+            np.matmul(h, w_hh, out=gates)
+            gates += gates_x[:, t]
+            _sigmoid_(gates)
+            g *= 2.0
+            g -= 1.0
+            c *= f
+            g *= i
+            c += g
+            np.tanh(c, out=tanh_c)
+            h = o * tanh_c
+            if keep_outputs:
+                outputs[:, t] = h
+
+        return outputs, h, c
+
+    def forward_with_state(
+        self,
+        x: np.ndarray,
+        hidden: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Forward que também devolve o estado final.
+
+        Args:
+            x: Array (batch, seq_length, 1) com preços em R$
+            hidden: Estado inicial (h_0, c_0); None = zeros
+
+        Returns:
+            Tuple com (previsões (batch, 1), (h_n, c_n))
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if hidden is None:
+            zeros = np.zeros((self.num_layers, x.shape[0], self.hidden_size), dtype=np.float32)
+            hidden = (zeros, zeros)
+        h_0, c_0 = hidden
+
+        out = x
+        h_n, c_n = [], []
+        for layer in range(self.num_layers):
+            # A última camada só precisa do último passo
+            keep = layer < self.num_layers - 1
+            outputs, h, c = self._run_layer(out, h_0[layer], c_0[layer], layer, keep_outputs=keep)
+            h_n.append(h)
+            c_n.append(c)
+            out = outputs
+
+        prediction = h_n[-1] @ self.linear_w + self.linear_b
+        return prediction, (np.stack(h_n), np.stack(c_n))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """Previsões (batch, 1) para janelas (batch, seq_length, 1)."""
+        return self.forward_with_state(x)[0]
+
+    def step(
+        self,
+        x_t: np.ndarray,
+        hidden: Tuple[np.ndarray, np.ndarray]
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Avança um passo: x_t (batch, 1) a partir do estado salvo."""
+        return self.forward_with_state(x_t[:, np.newaxis, :], hidden)
+
+    def rollout(self, x: np.ndarray, horizon: int) -> np.ndarray:
+        """Previsão autorregressiva (batch, horizon), como StockLSTM.rollout."""
+        prediction, hidden = self.forward_with_state(x)
+        predictions = [prediction]
+
+        for _ in range(horizon - 1):
+            prediction, hidden = self.step(prediction, hidden)
+            predictions.append(prediction)
+
+        return np.concatenate(predictions, axis=1)
+
+# ══════════════════════════════════════════════════════════════════
+# EXPORTACAO (requer torch)
+# ══════════════════════════════════════════════════════════════════
+
+def export_npz(model, path: Path, source_model_id: str, seq_length: int) -> Path:
+    """
+    Exporta os pesos de um StockLSTM com o scaler já fundido para .npz.
+
+    O arquivo contém apenas arrays float32 e um JSON de metadados
+    (carregável com allow_pickle=False).
+
+    Args:
+        model: StockLSTM (torch) retornado por fuse_scaler
+        path: Destino do .npz
+        source_model_id: Identidade dos artefatos de origem (model_id do bundle)
+        seq_length: Tamanho da janela do modelo
+    """
+    weights = {
+        key: value.detach().cpu().numpy().astype(np.float32)
+        for key, value in model.state_dict().items()
+    }
+    meta = {
+        "source_model_id": source_model_id,
+        "num_layers": model.num_layers,
+        "hidden_size": model.hidden_size,
+        "seq_length": seq_length,
+        "scaler_fused": True
+    }
+    with open(path, "wb") as f:
+        np.savez(f, __meta__=np.array(json.dumps(meta)), **weights)
+    return path
@@ -0,0 +1,110 @@
+# ═══════════════════════════════════════════════════════════════
+# Cache de previsoes
+# Objetivo: Evitar recalcular o forward para janelas repetidas
+# ═══════════════════════════════════════════════════════════════
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# ══════════════════════════════════════════════════════════════════
+# CACHE LRU/TTL ENDERECADO POR CONTEUDO
+# ══════════════════════════════════════════════════════════════════
+
+class PredictionCache:
+    """
+    Cache LRU com expiração (TTL) para previsões de janelas de preços.
+
+    A chave é o hash do conteúdo da janela (já cortada em seq_length)
+    combinado com a identidade do modelo que a atende. Trocar o modelo ou o
+    scaler muda a identidade, então uma previsão antiga nunca é servida
+    para um modelo novo; as entradas do modelo antigo podem ser removidas
+    com `discard_model`.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 3600.0):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_entries: Número máximo de previsões guardadas (LRU)
+            ttl_s: Tempo de vida de cada entrada em segundos (0 = sem expiração)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+        # Estatísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, model_id: str, window: np.ndarray) -> bytes:
+        """Hash da janela (float64, contígua) + identidade do modelo."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_id.encode())
+        digest.update(np.ascontiguousarray(window, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[float]:
+        """Retorna a previsão guardada ou None (miss ou expirada)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: float, model_id: str) -> None:
+        """Guarda uma previsão, removendo a menos usada se o cache estiver cheio."""
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s > 0 else None
+        self._entries[key] = (value, expires_at, model_id)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard_model(self, model_id: str) -> int:
+        """
+        Remove as entradas de um modelo (descarregado ou substituído).
+
+        Returns:
+            Número de entradas removidas
+        """
+        stale = [key for key, (_, _, owner) in self._entries.items() if owner == model_id]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        """Remove todas as entradas (mantém as estatísticas)."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Retorna tamanho, contadores de hit/miss e taxa de acerto."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
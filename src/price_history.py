@@ -0,0 +1,400 @@
+# ═══════════════════════════════════════════════════════════════
+# Historico de precos no servidor
+# Objetivo: Guardar os ultimos precos de cada ticker para prever so com o ticker
+# ═══════════════════════════════════════════════════════════════
+
+import argparse
+import asyncio
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# ══════════════════════════════════════════════════════════════════
+# CONFIGURACOES
+# ══════════════════════════════════════════════════════════════════
+
+# Preços guardados por ticker (o /predict usa os últimos seq_length)
+DEFAULT_CAPACITY = 1024
+
+SNAPSHOT_FILENAME = "price_history.npz"
+DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_SNAPSHOT = DATA_DIR / SNAPSHOT_FILENAME
+
+
+def csv_path(ticker: str) -> Path:
+    """CSV do ticker gravado por data_collection.py (sem importar o pandas)."""
+    return DATA_DIR / f"data_{ticker.replace('.', '_')}.csv"
+
+# ══════════════════════════════════════════════════════════════════
+# BUFFER CIRCULAR ESPELHADO
+# ══════════════════════════════════════════════════════════════════
+
+class PriceRing:
+    """
+    Últimos `capacity` preços de um ticker em um buffer circular espelhado.
+
+    Cada preço é gravado em duas posições (i e i + capacity) de um array
+    de 2 × capacity. Assim os últimos n preços sempre formam um trecho
+    contíguo, e window(n) devolve uma view somente leitura, sem cópia nem
+    concatenação. A view continua válida até chegarem capacity - n novos
+    preços; lotes grandes (mais de capacity / 2) vão para um buffer novo
+    e não alteram as views já entregues.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._buffer = np.zeros(2 * self.capacity)
+        self._end = 0
+        self.count = 0
+        self.last_date: Optional[str] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return float(self._buffer[self._end + self.capacity - 1]) if self.count else None
+
+    def extend(self, prices: np.ndarray) -> None:
+        """Acrescenta preços (o mais antigo primeiro); os excedentes saem do início."""
+        prices = np.asarray(prices, dtype=np.float64)
+        k = len(prices)
+        if k == 0:
+            return
+
+        if k > self.capacity // 2:
+            values = np.concatenate([self.to_array(), prices])[-self.capacity:]
+            n = len(values)
+            buffer = np.zeros(2 * self.capacity)
+            buffer[:n] = values
+            buffer[self.capacity:self.capacity + n] = values
+            self._buffer = buffer
+            self._end = n % self.capacity
+            self.count = n
+            return
+
+        positions = (self._end + np.arange(k)) % self.capacity
+        self._buffer[positions] = prices
+        self._buffer[positions + self.capacity] = prices
+        self._end = (self._end + k) % self.capacity
+        self.count = min(self.count + k, self.capacity)
+
+    def window(self, n: int) -> np.ndarray:
+        """
+        View dos últimos n preços (mais antigo primeiro).
+
+        Raises:
+            ValueError: Se houver menos de n preços guardados
+        """
+        if n > self.count:
+            raise ValueError(f"Histórico tem {self.count} preços; necessário {n}")
+        stop = self._end + self.capacity
+        view = self._buffer[stop - n:stop]
+        view.flags.writeable = False
+        return view
+
+    def to_array(self) -> np.ndarray:
+        """Cópia de todos os preços guardados."""
+        return self.window(self.count).copy()
+
+# ══════════════════════════════════════════════════════════════════
+# ARMAZENAMENTO POR TICKER
+# ══════════════════════════════════════════════════════════════════
+
+class PriceHistoryStore:
+    """
+    Histórico de fechamentos por ticker, em memória.
+
+    Semeado pelos CSVs de data/ (os mesmos do `load_stock_data`) ou por
+    um snapshot .npz, atualizado pelo endpoint de fechamentos e salvo em
+    disco periodicamente e no encerramento, para reinícios rápidos.
+    Fechamentos com data igual ou anterior à do último guardado são
+    ignorados, o que torna o reenvio de um fechamento inofensivo. Por isso
+    um histórico com datas só aceita novos fechamentos com `dates`.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            capacity: Preços guardados por ticker
+        """
+        self.capacity = max(1, capacity)
+        self._rings: Dict[str, PriceRing] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+
+        # Estatísticas
+        self.appended = 0
+        self.ignored = 0
+        self.snapshots = 0
+        self.source: Optional[str] = None
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._rings
+
+    def tickers(self) -> List[str]:
+        return sorted(self._rings)
+
+    def get(self, ticker: str) -> PriceRing:
+        """
+        Histórico de um ticker.
+
+        Raises:
+            KeyError: Se o ticker não tiver histórico
+        """
+        return self._rings[ticker]
+
+    def window(self, ticker: str, n: int) -> Tuple[np.ndarray, Optional[str]]:
+        """
+        View dos últimos n preços do ticker e a data do último.
+
+        Raises:
+            KeyError: Ticker sem histórico
+            ValueError: Histórico com menos de n preços
+        """
+        ring = self._rings[ticker]
+        return ring.window(n), ring.last_date
+
+    def append(
+        self,
+        ticker: str,
+        prices: np.ndarray,
+        dates: Optional[Sequence[Union[date, str]]] = None
+    ) -> Tuple[int, int]:
+        """
+        Acrescenta fechamentos ao histórico do ticker (criado se não existir).
+
+        Args:
+            ticker: Ticker da ação
+            prices: Fechamentos, do mais antigo para o mais recente
+            dates: Data de cada fechamento (opcional, em ordem crescente)
+
+        Returns:
+            (acrescentados, ignorados por data já presente)
+
+        Raises:
+            ValueError: Datas fora de ordem, em quantidade diferente dos
+                preços ou ausentes em um histórico com datas
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if dates is not None:
+            dates = [d.isoformat() if isinstance(d, date) else str(d) for d in dates]
+            if len(dates) != len(prices):
+                raise ValueError("`dates` deve ter o mesmo tamanho de `prices`")
+            if any(a >= b for a, b in zip(dates, dates[1:])):
+                raise ValueError("`dates` deve estar em ordem estritamente crescente")
+
+        ring = self._rings.get(ticker)
+        if dates is None and ring is not None and ring.last_date is not None:
+            # Sem datas, last_date (as_of) ficaria velho e o reenvio datado duplicaria
+            raise ValueError(
+                f"Histórico de {ticker} tem datas (último: {ring.last_date}); envie `dates`"
+            )
+        if ring is None:
+            ring = self._rings[ticker] = PriceRing(self.capacity)
+
+        n_ignored = 0
+        if dates is not None:
+            if ring.last_date is not None:
+                new = np.array([d > ring.last_date for d in dates], dtype=bool)
+                n_ignored = int((~new).sum())
+                prices = prices[new]
+                dates = [d for d, keep in zip(dates, new) if keep]
+
+        ring.extend(prices)
+        if dates:
+            ring.last_date = dates[-1]
+
+        self.appended += len(prices)
+        self.ignored += n_ignored
+        self._dirty = self._dirty or len(prices) > 0
+        return len(prices), n_ignored
+
+    @staticmethod
+    def _read_csv(ticker: str):
+        """Close do CSV do ticker (Series indexada por data). O pandas só é importado aqui."""
+        try:
+            from data_collection import load_stock_data
+        except ImportError:
+            from src.data_collection import load_stock_data
+        return load_stock_data(ticker)['Close'].dropna()
+
+    def seed_from_csv(self, tickers: Iterable[str]) -> List[str]:
+        """
+        Semeia o histórico com o Close dos CSVs baixados por data_collection.py.
+
+        Tickers sem CSV são ignorados.
+
+        Returns:
+            Tickers semeados
+        """
+        seeded = []
+        for ticker in tickers:
+            try:
+                close = self._read_csv(ticker).iloc[-self.capacity:]
+            except FileNotFoundError:
+                print(f"   Sem CSV para {ticker}; histórico vazio")
+                continue
+            ring = self._rings[ticker] = PriceRing(self.capacity)
+            ring.extend(close.to_numpy(dtype=np.float64))
+            ring.last_date = close.index[-1].date().isoformat() if len(close) else None
+            seeded.append(ticker)
+
+        self.source = "csv"
+        self._dirty = bool(seeded)
+        return seeded
+
+    def update_from_csv(self, tickers: Iterable[str], newer_than: float = 0.0) -> List[str]:
+        """
+        Acrescenta ao histórico (ex: vindo do snapshot) os fechamentos dos CSVs
+        posteriores ao último guardado de cada ticker.
+
+        Só lê CSVs modificados depois de `newer_than` (mtime do snapshot):
+        sem CSV atualizado, o pandas nem é importado. Tickers ausentes são
+        semeados inteiros; históricos sem datas não podem ser alinhados ao
+        CSV e ficam como estão.
+
+        Returns:
+            Tickers atualizados
+        """
+        updated = []
+        for ticker in tickers:
+            path = csv_path(ticker)
+            if not path.exists() or path.stat().st_mtime <= newer_than:
+                continue
+            ring = self._rings.get(ticker)
+            if ring is not None and ring.last_date is None:
+                continue
+
+            close = self._read_csv(ticker)
+            dates = [d.date().isoformat() for d in close.index]
+            new = np.array([ring is None or d > ring.last_date for d in dates], dtype=bool)
+            if not new.any():
+                continue
+            if ring is None:
+                ring = self._rings[ticker] = PriceRing(self.capacity)
+            ring.extend(close.to_numpy(dtype=np.float64)[new][-self.capacity:])
+            ring.last_date = dates[-1]
+            updated.append(ticker)
+
+        self._dirty = self._dirty or bool(updated)
+        return updated
+
+    # ── Snapshot ──────────────────────────────────────────────────
+
+    def save(self, path: Path) -> None:
+        """Grava todos os históricos em um .npz (escrita atômica, sem pickle)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tickers = self.tickers()
+        rings = [self._rings[t] for t in tickers]
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                tickers=np.array(tickers, dtype=str),
+                counts=np.array([r.count for r in rings], dtype=np.int64),
+                last_dates=np.array([r.last_date or "" for r in rings], dtype=str),
+                prices=np.concatenate([r.to_array() for r in rings]) if rings else np.zeros(0)
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        self.snapshots += 1
+        self._dirty = False
+
+    def load(self, path: Path) -> List[str]:
+        """
+        Restaura os históricos de um snapshot gravado por save().
+
+        Returns:
+            Tickers restaurados
+        """
+        with np.load(path, allow_pickle=False) as data:
+            tickers = data["tickers"].tolist()
+            offsets = np.concatenate([[0], np.cumsum(data["counts"])])
+            prices, last_dates = data["prices"], data["last_dates"].tolist()
+
+        self._rings.clear()
+        for i, ticker in enumerate(tickers):
+            ring = self._rings[ticker] = PriceRing(self.capacity)
+            ring.extend(prices[offsets[i]:offsets[i + 1]])
+            ring.last_date = last_dates[i] or None
+
+        self.source = "snapshot"
+        self._dirty = False
+        return tickers
+
+    async def start(self, path: Path, interval_s: float) -> None:
+        """Inicia a gravação periódica do snapshot (só quando houve mudança)."""
+        async def autosave():
+            while True:
+                await asyncio.sleep(interval_s)
+                if self._dirty:
+                    self.save(path)
+
+        self._task = asyncio.create_task(autosave())
+
+    async def stop(self, path: Optional[Path] = None) -> None:
+        """Encerra a gravação periódica e grava o snapshot final."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if path is not None and self._dirty:
+            self.save(path)
+
+    def stats(self) -> dict:
+        """Tickers, memória ocupada e contadores."""
+        return {
+            "tickers": {
+                ticker: {"count": ring.count, "last_date": ring.last_date}
+                for ticker, ring in sorted(self._rings.items())
+            },
+            "capacity": self.capacity,
+            "memory_kb": round(sum(r.nbytes for r in self._rings.values()) / 1024, 1),
+            "source": self.source,
+            "appended": self.appended,
+            "ignored": self.ignored,
+            "snapshots": self.snapshots
+        }
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    # Uso: python price_history.py [--tickers PETR4.SA,VALE3.SA] [--output ../data/price_history.npz]
+    # Gera o snapshot a partir dos CSVs (ex: para imagens sem pandas)
+    try:
+        from registry import ModelRegistry
+    except ImportError:
+        from src.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Snapshot do histórico de preços a partir dos CSVs")
+    parser.add_argument("--tickers", default=None,
+                        help="Tickers separados por vírgula (padrão: tickers com modelo em models/)")
+    parser.add_argument("--models-dir", type=Path, default=Path(__file__).parent.parent / "models")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument("--output", type=Path, default=DEFAULT_SNAPSHOT)
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(",") if args.tickers else ModelRegistry(args.models_dir).available()
+    store = PriceHistoryStore(args.capacity)
+    seeded = store.seed_from_csv(tickers)
+    store.save(args.output)
+
+    print("\n" + "=" * 60)
+    print(f"CHECKPOINT: Snapshot com {len(seeded)} ticker(s) salvo em {args.output}")
+    print("=" * 60)
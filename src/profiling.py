@@ -0,0 +1,211 @@
+# ═══════════════════════════════════════════════════════════════
+# Perfil por requisicao (opt-in)
+# Objetivo: Tempo de cada etapa de uma unica requisicao e resumo do torch profiler
+# ═══════════════════════════════════════════════════════════════
+
+import contextvars
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Header e parâmetro de query que ativam o perfil
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+
+# Valores aceitos: etapas apenas, ou etapas + torch profiler
+STAGE_MODES = ("1", "true", "stages")
+TORCH_MODE = "torch"
+
+# ══════════════════════════════════════════════════════════════════
+# PERFIL DE UMA REQUISICAO
+# ══════════════════════════════════════════════════════════════════
+
+def parse_mode(value: Optional[str]) -> Optional[str]:
+    """Valor do header/query → "stages", "torch" ou None (perfil desligado)."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value == TORCH_MODE:
+        return TORCH_MODE
+    return "stages" if value in STAGE_MODES else None
+
+
+class RequestProfile:
+    """
+    Tempo de cada etapa de uma requisição.
+
+    As etapas são preenchidas por quem executa cada trecho (StageClock,
+    parse do corpo, middleware) enquanto o perfil está ativo no contexto
+    da requisição. O que não pertence a nenhuma etapa (fila, roteamento,
+    espera pelo pool) aparece como `other`.
+    """
+    __slots__ = ("mode", "start", "stages", "torch")
+
+    def __init__(self, mode: str = "stages"):
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.torch: Optional[dict] = None
+
+    @property
+    def wants_torch(self) -> bool:
+        return self.mode == TORCH_MODE
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def breakdown_ms(self, until: Optional[float] = None) -> Dict[str, float]:
+        """Etapas em ms, mais `other` e `total` até `until` (padrão: agora)."""
+        total = (until or time.perf_counter()) - self.start
+        stages = {stage: round(s * 1000, 3) for stage, s in self.stages.items()}
+        stages["other"] = round(max(0.0, total - sum(self.stages.values())) * 1000, 3)
+        stages["total"] = round(total * 1000, 3)
+        return stages
+
+    def report(self) -> dict:
+        """Perfil no corpo da resposta (a serialização ainda não aconteceu)."""
+        return {"stages_ms": self.breakdown_ms(), "torch": self.torch}
+
+    def server_timing(self, until: Optional[float] = None) -> str:
+        """Header Server-Timing com todas as etapas, inclusive a serialização."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.breakdown_ms(until).items())
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_request_profile", default=None
+)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Perfil da requisição em andamento (None se não pedido)."""
+    return _current_profile.get()
+
+
+def activate(profile: Optional[RequestProfile]) -> contextvars.Token:
+    return _current_profile.set(profile)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current_profile.reset(token)
+
+
+class ProfileClock:
+    """
+    Cronômetro que só registra no perfil da requisição (sem histogramas).
+
+    Sem perfil ativo, lap() não faz nada: o custo no caminho normal é uma
+    leitura de ContextVar.
+    """
+    __slots__ = ("profile", "last")
+
+    def __init__(self):
+        self.profile = current_profile()
+        self.last = time.perf_counter() if self.profile is not None else 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.profile is not None
+
+    def lap(self, stage: str) -> None:
+        if self.profile is None:
+            return
+        now = time.perf_counter()
+        self.profile.add(stage, now - self.last)
+        self.last = now
+
+# ══════════════════════════════════════════════════════════════════
+# TORCH PROFILER (AMOSTRADO E COM LIMITE DE TAXA)
+# ══════════════════════════════════════════════════════════════════
+
+class TorchProfileSampler:
+    """
+    Decide se uma requisição que pediu o torch profiler será de fato perfilada.
+
+    - amostragem: cada pedido é aceito com probabilidade `sample_rate`
+    - limite de taxa: balde de `max_per_minute` fichas, reposto continuamente
+    - exclusão: um perfil por vez (o profiler do torch é global ao processo)
+
+    Assim o opt-in pode ficar ligado em produção sem que clientes
+    consigam transformar o servidor em um profiler contínuo.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_minute: float = 6.0):
+        """
+        Inicializa o amostrador.
+
+        Args:
+            sample_rate: Fração dos pedidos aceitos (0 a 1)
+            max_per_minute: Perfis por minuto (0 = torch profiler desligado)
+        """
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.max_per_minute = max(0.0, max_per_minute)
+        self._tokens = self.max_per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._busy = False
+
+        # Decisões por motivo
+        self.counts: Dict[str, int] = {}
+
+    def _count(self, status: str) -> str:
+        self.counts[status] = self.counts.get(status, 0) + 1
+        return status
+
+    def acquire(self) -> Tuple[bool, str]:
+        """
+        Returns:
+            (aceito, motivo): "ok", "disabled", "not_sampled", "rate_limited" ou "busy"
+        """
+        with self._lock:
+            if self.max_per_minute <= 0:
+                return False, self._count("disabled")
+            if random.random() >= self.sample_rate:
+                return False, self._count("not_sampled")
+
+            now = time.monotonic()
+            self._tokens = min(
+                self.max_per_minute, self._tokens + (now - self._updated) * self.max_per_minute / 60.0
+            )
+            self._updated = now
+            if self._tokens < 1.0:
+                return False, self._count("rate_limited")
+            if self._busy:
+                return False, self._count("busy")
+
+            self._tokens -= 1.0
+            self._busy = True
+            return True, self._count("ok")
+
+    def release(self) -> None:
+        with self._lock:
+            self._busy = False
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "max_per_minute": self.max_per_minute,
+            "tokens": round(self._tokens, 2),
+            "decisions": dict(self.counts)
+        }
+
+
+def run_with_torch_profiler(
+    fn: Callable,
+    args: Sequence[Any],
+    row_limit: int = 15,
+    use_cuda: bool = False
+) -> Tuple[Any, str]:
+    """
+    Executa fn(*args) sob o torch profiler.
+
+    Returns:
+        (resultado, tabela dos operadores ordenada pelo tempo próprio de CPU)
+    """
+    from torch.profiler import ProfilerActivity, profile
+
+    activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if use_cuda else [])
+    with profile(activities=activities) as prof:
+        result = fn(*args)
+    sort_by = "self_cuda_time_total" if use_cuda else "self_cpu_time_total"
+    return result, prof.key_averages().table(sort_by=sort_by, row_limit=row_limit)
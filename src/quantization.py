@@ -0,0 +1,189 @@
+# ═══════════════════════════════════════════════════════════════
+# Quantizacao dinamica int8
+# Objetivo: Modelo menor e mais rapido na CPU, com relatorio de acuracia
+# ═══════════════════════════════════════════════════════════════
+
+import copy
+import io
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    from model import StockLSTM
+except ImportError:
+    from src.model import StockLSTM
+
+# Artefato gerado ao lado de model_lstm.pth
+QUANTIZED_MODEL_FILENAME = "model_lstm_int8.pth"
+QUANTIZATION_REPORT_FILENAME = "quantization_report.json"
+
+MODELS_DIR = Path(__file__).parent.parent / "models"
+
+# ══════════════════════════════════════════════════════════════════
+# QUANTIZACAO
+# ══════════════════════════════════════════════════════════════════
+
+def quantize_model(model: nn.Module) -> nn.Module:
+    """
+    Quantização dinâmica int8 das camadas nn.LSTM e nn.Linear.
+
+    Os pesos ficam em int8 (escala por tensor) e as ativações são
+    quantizadas em tempo de execução; não precisa de calibração. O
+    modelo original não é alterado.
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def model_nbytes(model: nn.Module) -> int:
+    """
+    Tamanho serializado do state_dict.
+
+    Diferente da soma dos parâmetros, inclui os pesos empacotados das
+    camadas quantizadas (que não aparecem em model.parameters()).
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def save_quantized(model_q: nn.Module, path: Path, model_config: dict, source_model_id: str) -> Path:
+    """
+    Salva o modelo quantizado com a configuração e a identidade do modelo
+    fp32 de origem (model_id do bundle, já com o scaler fundido).
+    """
+    torch.save({
+        'model_config': model_config,
+        'quantized_state_dict': model_q.state_dict(),
+        'source_model_id': source_model_id,
+        'scaler_fused': True,
+        'dtype': 'qint8'
+    }, path)
+    return path
+
+
+def load_quantized(path: Path, source_model_id: str) -> nn.Module:
+    """
+    Carrega o modelo int8 salvo por save_quantized.
+
+    Raises:
+        FileNotFoundError: Artefato ausente
+        RuntimeError: Artefato gerado a partir de outro modelo
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Modelo quantizado não encontrado: {path}")
+
+    checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    if checkpoint.get('source_model_id') != source_model_id:
+        raise RuntimeError(
+            f"Modelo quantizado desatualizado (origem {checkpoint.get('source_model_id')}, "
+            f"esperado {source_model_id}); execute quantization.py"
+        )
+
+    # Recriar a estrutura quantizada e carregar os pesos int8
+    model_q = quantize_model(StockLSTM(**checkpoint['model_config']))
+    model_q.load_state_dict(checkpoint['quantized_state_dict'])
+    return model_q.eval()
+
+# ══════════════════════════════════════════════════════════════════
+# RELATORIO DE ACURACIA
+# ══════════════════════════════════════════════════════════════════
+
+def accuracy_report(bundle, model_q: nn.Module, model_dir: Path) -> dict:
+    """
+    Compara o modelo fp32 servido com o int8 no conjunto de teste.
+
+    Reaproveita calculate_metrics (evaluate.py) e acrescenta a latência
+    por tamanho de lote e a memória dos pesos.
+    """
+    # Imports pesados (dados, gráficos) apenas no relatório, não na API
+    from evaluate import calculate_metrics
+    from export_model import benchmark_backends
+    from backends import EagerBackend
+    from preprocessing import preprocess_data
+
+    _, X_test, _, y_test, scaler = preprocess_data(save_scaler=False)
+
+    # Os dois modelos têm o scaler fundido: entrada e saída em R$
+    X_reais = scaler.inverse_transform(X_test.numpy().reshape(-1, 1)).reshape(X_test.shape[:2])
+    actual_reais = scaler.inverse_transform(y_test.numpy())
+
+    backends = {
+        "fp32": EagerBackend(bundle.model),
+        "int8": EagerBackend(model_q)
+    }
+    windows = X_reais.astype(np.float32)
+    metrics = {
+        name: calculate_metrics(actual_reais, backend.run(backend.prepare(windows)).reshape(-1, 1))
+        for name, backend in backends.items()
+    }
+
+    print(f"\n   {'':<6}{'MAPE':>10}{'RMSE':>12}{'MAE':>12}")
+    for name, m in metrics.items():
+        print(f"   {name:<6}{m['mape']:>9.3f}%{m['rmse']:>12.4f}{m['mae']:>12.4f}")
+    delta_mape = metrics["int8"]["mape"] - metrics["fp32"]["mape"]
+    delta_rmse = metrics["int8"]["rmse"] - metrics["fp32"]["rmse"]
+    print(f"   {'delta':<6}{delta_mape:>+9.3f}%{delta_rmse:>+12.4f}")
+
+    print(f"\n   Latencia mediana do forward:")
+    latencies = benchmark_backends(backends, bundle.seq_length)
+
+    memory = {"fp32": model_nbytes(bundle.model), "int8": model_nbytes(model_q)}
+    print(f"\n   Memoria dos pesos: fp32 {memory['fp32'] / 1024:.1f} KB -> "
+          f"int8 {memory['int8'] / 1024:.1f} KB ({memory['int8'] / memory['fp32']:.0%})")
+
+    report = {
+        "source_model_id": bundle.model_id,
+        "test_samples": len(actual_reais),
+        "metrics": {name: {k: float(v) for k, v in m.items()} for name, m in metrics.items()},
+        "delta": {"mape": float(delta_mape), "rmse": float(delta_rmse)},
+        "latency_ms": {name: {str(b): t for b, t in by_size.items()} for name, by_size in latencies.items()},
+        "speedup": {
+            str(b): latencies["fp32"][b] / latencies["int8"][b] for b in latencies["fp32"]
+        },
+        "weights_bytes": memory
+    }
+    report_path = model_dir / QUANTIZATION_REPORT_FILENAME
+    report_path.write_text(json.dumps(report, indent=2))
+    print(f"\n   Relatorio salvo em: {report_path}")
+    return report
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+def main(model_dir: Path = MODELS_DIR, run_report: bool = True) -> dict:
+    """Gera o modelo int8 e o relatório de acurácia, latência e memória."""
+    from registry import load_bundle
+
+    print("=" * 60)
+    print("Quantizacao dinamica int8 (nn.LSTM + nn.Linear)")
+    print("=" * 60)
+
+    bundle = load_bundle(model_dir, device="cpu", fuse=True)
+    print(f"\nModelo: {bundle.ticker} (id={bundle.model_id})")
+
+    model_q = quantize_model(bundle.model)
+    path = save_quantized(model_q, model_dir / QUANTIZED_MODEL_FILENAME, bundle.model.get_config(), bundle.model_id)
+    print(f"Modelo quantizado salvo em: {path} ({path.stat().st_size / 1024:.1f} KB)")
+
+    report = {}
+    if run_report:
+        print("\nRelatorio de acuracia (conjunto de teste):")
+        report = accuracy_report(bundle, model_q, model_dir)
+
+    print("\n" + "=" * 60)
+    print("CHECKPOINT: Modelo int8 pronto! Use MODEL_PRECISION=int8 na API.")
+    print("=" * 60)
+    return report
+
+
+if __name__ == "__main__":
+    # Uso: python quantization.py [diretorio_do_modelo] [--skip-report]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(Path(args[0]) if args else MODELS_DIR, run_report="--skip-report" not in sys.argv)
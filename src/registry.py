@@ -0,0 +1,816 @@
+# ═══════════════════════════════════════════════════════════════
+# Registro de modelos por ticker
+# Objetivo: Servir varios tickers em um unico processo
+# ═══════════════════════════════════════════════════════════════
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# torch, joblib/sklearn, model.py e quantization.py são importados sob
+# demanda: com model.bundle e o backend numpy, nenhum deles é carregado
+try:
+    from metrics import StageClock
+    from backends import EagerBackend, load_backend, require_torch
+    from bundle_format import BUNDLE_FILENAME, ScalerParams, read_bundle, read_bundle_header
+    from numpy_lstm import NUMPY_WEIGHTS_FILENAME, NumpyLSTM
+except ImportError:
+    from src.metrics import StageClock
+    from src.backends import EagerBackend, load_backend, require_torch
+    from src.bundle_format import BUNDLE_FILENAME, ScalerParams, read_bundle, read_bundle_header
+    from src.numpy_lstm import NUMPY_WEIGHTS_FILENAME, NumpyLSTM
+
+# Nomes dos artefatos dentro de cada diretório de modelo
+MODEL_FILENAME = "model_lstm.pth"
+SCALER_FILENAME = "scaler.pkl"
+CONFIG_FILENAME = "config.pkl"
+
+# Tickers aceitos: vêm do corpo/URL da requisição e viram nome de diretório
+TICKER_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,32}$")
+
+
+def ticker_slug(ticker: str) -> str:
+    """
+    Nome do diretório de um ticker (mesma convenção dos CSVs: PETR4.SA → PETR4_SA).
+
+    Raises:
+        ValueError: Se o ticker tiver caracteres fora de TICKER_PATTERN
+    """
+    if not isinstance(ticker, str) or not TICKER_PATTERN.match(ticker):
+        raise ValueError(f"Ticker inválido: {ticker!r}")
+    return ticker.replace('.', '_')
+
+
+def fingerprint_files(*paths: Path) -> str:
+    """
+    Identidade de um conjunto de artefatos (hash do conteúdo dos arquivos).
+
+    Usada para invalidar o cache de previsões quando outro modelo
+    ou scaler é carregado.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def files_signature(*paths: Path) -> Tuple:
+    """Assinatura barata (mtime + tamanho) usada para detectar artefatos alterados."""
+    return tuple(
+        (path.stat().st_mtime_ns, path.stat().st_size) if path.exists() else None
+        for path in paths
+    )
+
+
+
+def bundle_artifact_paths(model_dir: Path, numpy_weights: bool = False) -> List[Path]:
+    """Artefatos de um diretório de modelo (os pesos .npz apenas no backend numpy)."""
+    names = [MODEL_FILENAME, SCALER_FILENAME, CONFIG_FILENAME]
+    if numpy_weights:
+        names.append(NUMPY_WEIGHTS_FILENAME)
+    return [model_dir / name for name in names]
+
+
+def read_config(model_dir: Path) -> Optional[dict]:
+    """
+    Configuração de um diretório de modelo (header do model.bundle ou
+    config.pkl); None se não houver modelo.
+    """
+    bundle_path = model_dir / BUNDLE_FILENAME
+    if bundle_path.exists():
+        return read_bundle_header(bundle_path)["metadata"]["config"]
+    config_path = model_dir / CONFIG_FILENAME
+    if config_path.exists():
+        import joblib
+        return joblib.load(config_path)
+    return None
+
+
+def has_model(model_dir: Path) -> bool:
+    """Se o diretório tem um modelo servível (model.bundle ou model_lstm.pth)."""
+    return (model_dir / BUNDLE_FILENAME).exists() or (model_dir / MODEL_FILENAME).exists()
+
+
+def _torch_modules():
+    """model.py e quantization.py (dependem do torch), importados no primeiro uso."""
+    require_torch()
+    try:
+        import model as torch_model
+        import quantization
+    except ImportError:
+        from src import model as torch_model
+        from src import quantization
+    return torch_model, quantization
+
+
+# Estado (h, c) da LSTM: tensores do torch ou arrays NumPy, conforme o backend
+Hidden = Tuple[Any, Any]
+
+# ══════════════════════════════════════════════════════════════════
+# BUNDLE (MODELO + SCALER + CONFIG)
+# ══════════════════════════════════════════════════════════════════
+
+class ModelBundle:
+    """
+    Modelo, scaler e configuração de um ticker, prontos para inferência.
+
+    Por padrão o MinMaxScaler é fundido nos pesos do modelo (ver
+    model.fuse_scaler): o modelo servido recebe e devolve preços em R$ e o
+    sklearn fica fora do caminho das requisições.
+
+    O forward do `predict` é executado pelo backend escolhido (eager,
+    TorchScript ou ONNX Runtime, ver backends.py); rollout e streaming usam
+    sempre o modelo eager, que precisa do estado (h, c).
+
+    Com precision="int8", o modelo servido é o quantizado gerado por
+    quantization.py (model_lstm_int8.pth), sempre com o backend eager.
+
+    Com backend="numpy", o modelo é um NumpyLSTM (pesos .npz com o scaler
+    já fundido) e nenhuma operação do bundle depende do torch.
+
+    `source_format` indica a origem: "bundle" (model.bundle, ver
+    bundle_format.py) ou "legacy" (model_lstm.pth + scaler.pkl + config.pkl).
+    """
+
+    def __init__(
+        self,
+        model: "StockLSTM",
+        scaler,
+        config: dict,
+        model_id: str,
+        device: str = "cpu",
+        source_dir: Optional[Path] = None,
+        load_time_s: float = 0.0,
+        signature: Optional[Tuple] = None,
+        fuse: bool = True,
+        backend: str = "eager",
+        precision: str = "fp32",
+        artifacts: Optional[List[Path]] = None,
+        source_format: str = "legacy"
+    ):
+        if isinstance(model, NumpyLSTM):
+            # Pesos exportados já com o scaler fundido
+            self.fused = True
+            self.model = model
+        else:
+            self.fused = fuse
+            self.model = _torch_modules()[0].fuse_scaler(model, scaler.scale_, scaler.min_) if fuse else model
+        self.scaler = scaler
+        self.config = config
+        self.model_id = model_id
+        self.device = device
+        self.source_dir = source_dir
+        self.load_time_s = load_time_s
+        self.loaded_at = time.time()
+        self.warmup_time_s = 0.0
+        self.signature = signature
+        self.artifacts = artifacts
+        self.source_format = source_format
+
+        # Modelo int8: artefato ausente ou desatualizado mantém o fp32
+        self.precision = "fp32"
+        if precision == "int8":
+            try:
+                if isinstance(model, NumpyLSTM):
+                    raise RuntimeError("requer o modelo torch (backend numpy ativo)")
+                if not fuse or source_dir is None or device != "cpu":
+                    raise RuntimeError("requer scaler fundido, artefatos em disco e CPU")
+                quantization = _torch_modules()[1]
+                quantized_path = source_dir / quantization.QUANTIZED_MODEL_FILENAME
+                self.model = quantization.load_quantized(quantized_path, model_id)
+                self.precision = "int8"
+            except (FileNotFoundError, RuntimeError) as e:
+                print(f"Modelo int8 indisponivel para {self.ticker}, usando fp32: {e}")
+        if self.precision == "int8" and backend != "eager":
+            print(f"Backend {backend} nao suporta o modelo int8, usando eager")
+            backend = "eager"
+
+        # Artefato ausente ou desatualizado: servir com o modelo eager
+        try:
+            self.backend = load_backend(backend, self.model, source_dir, model_id, fuse, device)
+        except RuntimeError as e:
+            print(f"Backend {backend} indisponivel para {self.ticker}, usando eager: {e}")
+            self.backend = EagerBackend(self.model, device)
+
+        # Rollout e streaming precisam do estado (h, c): TorchScript/ONNX usam o eager
+        self._stateful = self.backend if self.backend.stateful else EagerBackend(self.model, device)
+
+    @property
+    def ticker(self) -> str:
+        return self.config.get('ticker', 'PETR4.SA')
+
+    @property
+    def seq_length(self) -> int:
+        return self.config.get('seq_length', 60)
+
+    @property
+    def version(self) -> str:
+        """Versão ativa do modelo (hash do conteúdo dos artefatos)."""
+        return self.model_id
+
+    @property
+    def artifact_paths(self) -> List[Path]:
+        """
+        Arquivos de origem do bundle, observados pelo hot reload (model.bundle
+        e também modelo, scaler e config, que o deixam desatualizado; ou
+        modelo, scaler e config + .npz no backend numpy).
+        """
+        if self.artifacts is not None:
+            return self.artifacts
+        if self.source_dir is None:
+            return []
+        return bundle_artifact_paths(self.source_dir, numpy_weights=isinstance(self.model, NumpyLSTM))
+
+    def warmup(self) -> float:
+        """
+        Executa um forward descartável para aquecer o modelo antes de servir.
+
+        Returns:
+            Duração do aquecimento em segundos
+        """
+        start_time = time.time()
+        self.predict(np.ones((1, self.seq_length)))
+        self.warmup_time_s = time.time() - start_time
+        return self.warmup_time_s
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos pesos do modelo (parâmetros + buffers)."""
+        if self.precision == "int8":
+            # Pesos empacotados não aparecem em parameters()
+            return _torch_modules()[1].model_nbytes(self.model)
+        if isinstance(self.model, NumpyLSTM):
+            return self.model.nbytes
+        tensors = list(self.model.parameters()) + list(self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def _to_model_input(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Preços em R$ → entrada do modelo (float32, mesmo shape).
+
+        Com o scaler fundido no modelo é só a conversão de tipo; sem ele,
+        normaliza com o MinMaxScaler (o scaler espera uma coluna).
+        """
+        if self.fused:
+            return np.array(prices, dtype=np.float32)
+        return self.scaler.transform(prices.reshape(-1, 1)).reshape(prices.shape).astype(np.float32)
+
+    def _from_model_output(self, outputs: np.ndarray) -> np.ndarray:
+        """Saída do modelo → preços em R$ (mesmo shape)."""
+        if self.fused:
+            return outputs.astype(np.float64)
+        return self.scaler.inverse_transform(outputs.reshape(-1, 1)).reshape(outputs.shape)
+
+    def predict(self, windows: np.ndarray) -> np.ndarray:
+        """
+        Executa a previsão vetorizada de várias janelas de uma só vez.
+
+        Todas as janelas são empilhadas em um tensor (n, seq_length, 1) e
+        processadas em um único forward da LSTM. Com o scaler fundido, a
+        normalização acontece dentro do modelo; sem ele, há uma única
+        chamada ao scaler na entrada e outra na saída.
+
+        Args:
+            windows: Array (n, seq_length) com preços em R$
+
+        Returns:
+            Array (n,) com os preços previstos em R$
+        """
+        clock = StageClock()
+        inputs = self._to_model_input(windows)
+        clock.lap("scaling")
+        X = self.backend.to_tensor(inputs)
+        clock.lap("tensor")
+        X = self.backend.transfer(X)
+        clock.lap("transfer")
+
+        outputs = self.backend.run(X)
+        clock.lap("forward")
+
+        predictions = self._from_model_output(outputs)
+        clock.lap("inverse")
+        return predictions
+
+    def predict_path(self, windows: np.ndarray, horizon: int) -> np.ndarray:
+        """
+        Previsão dos próximos `horizon` dias para várias janelas.
+
+        Um único forward sobre as janelas empilhadas, seguido de
+        `horizon - 1` passos recorrentes em lote (ver StockLSTM.rollout).
+
+        Args:
+            windows: Array (n, seq_length) com preços em R$
+            horizon: Número de dias à frente
+
+        Returns:
+            Array (n, horizon) com os preços previstos em R$
+        """
+        clock = StageClock()
+        inputs = self._to_model_input(windows)
+        clock.lap("scaling")
+        X = self._stateful.to_tensor(inputs)
+        clock.lap("tensor")
+        X = self._stateful.transfer(X)
+        clock.lap("transfer")
+
+        paths = self._stateful.rollout(X, horizon)
+        clock.lap("forward")
+
+        paths = self._from_model_output(paths)
+        clock.lap("inverse")
+        return paths
+
+    def start_stream(self, window: np.ndarray) -> Tuple[float, Hidden]:
+        """
+        Processa uma janela completa e devolve a previsão e o estado da LSTM.
+
+        Args:
+            window: Array (seq_length,) com preços em R$
+
+        Returns:
+            Tuple com (preço previsto em R$, estado (h_n, c_n))
+        """
+        X = self._stateful.prepare(self._to_model_input(window).reshape(1, -1))
+        output, hidden = self._stateful.forward_with_state(X)
+
+        return float(self._from_model_output(output)[0, 0]), hidden
+
+    def step_stream(
+        self,
+        price: float,
+        hidden: Hidden
+    ) -> Tuple[float, Hidden]:
+        """
+        Avança o estado da LSTM com um único novo preço.
+
+        Args:
+            price: Novo preço de fechamento em R$
+            hidden: Estado retornado por start_stream ou step_stream
+
+        Returns:
+            Tuple com (preço previsto em R$, novo estado)
+        """
+        x_t = self._to_model_input(np.array([[price]]))
+        output, hidden = self._stateful.step(x_t, hidden)
+
+        return float(self._from_model_output(output)[0, 0]), hidden
+
+    def info(self) -> dict:
+        """Informações do modelo (incluídas nas respostas)."""
+        return {
+            "type": "LSTM",
+            "hidden_size": self.model.hidden_size,
+            "num_layers": self.model.num_layers,
+            "device": self.device,
+            "scaler_fused": self.fused,
+            "backend": self.backend.name,
+            "precision": self.precision,
+            "format": self.source_format,
+            "model_id": self.model_id,
+            "version": self.version
+        }
+
+
+def load_numpy_engine(path: Path, model_id: str) -> NumpyLSTM:
+    """
+    Carrega o motor NumPy e confere se os pesos vêm do model_lstm.pth atual.
+
+    Raises:
+        FileNotFoundError: Pesos .npz ausentes
+        RuntimeError: Pesos exportados de outro modelo
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Pesos NumPy não encontrados: {path}")
+
+    engine, meta = NumpyLSTM.load(path)
+    if meta.get("source_model_id") != model_id:
+        raise RuntimeError(
+            f"Pesos NumPy desatualizados (origem {meta.get('source_model_id')}, "
+            f"esperado {model_id}); execute export_model.py"
+        )
+    return engine
+
+
+def _build_torch_model(model_config: dict, state_dict: dict, device: str):
+    """StockLSTM com a configuração salva e os pesos do state_dict."""
+    torch_model = _torch_modules()[0]
+    model = torch_model.StockLSTM(
+        input_size=model_config.get('input_size', 1),
+        hidden_size=model_config.get('hidden_size', 100),
+        num_layers=model_config.get('num_layers', 2),
+        dropout=model_config.get('dropout', 0.2)
+    )
+    model.load_state_dict(state_dict)
+    model.to(device)
+    model.eval()
+    return model
+
+
+def bundle_is_current(model_dir: Path) -> bool:
+    """
+    Se o model.bundle do diretório pode ser usado: existe e, se os
+    artefatos antigos também estiverem lá, foi gerado a partir deles
+    (mesmo model_id). Um model_lstm.pth retreinado sem reconverter o
+    bundle faz o carregamento voltar aos artefatos antigos.
+    """
+    bundle_path = model_dir / BUNDLE_FILENAME
+    if not bundle_path.exists():
+        return False
+    legacy = bundle_artifact_paths(model_dir)
+    if not all(path.exists() for path in legacy):
+        return True
+    return read_bundle_header(bundle_path)["metadata"]["model_id"] == fingerprint_files(*legacy)
+
+
+def _load_from_bundle_file(
+    bundle_path: Path,
+    device: str,
+    use_numpy: bool
+) -> Tuple[Any, ScalerParams, dict, str]:
+    """
+    Lê model.bundle (mmap, sem pickle).
+
+    Returns:
+        Tuple com (modelo, scaler, config, model_id)
+    """
+    metadata, tensors = read_bundle(bundle_path)
+    scaler = ScalerParams(metadata["scaler"])
+    model_config = metadata["model_config"]
+
+    if use_numpy:
+        model = NumpyLSTM.from_state_dict(tensors, model_config, scaler.scale_, scaler.min_)
+    else:
+        torch = require_torch()
+        # Cópia: os arrays são views somente leitura do arquivo mapeado
+        state_dict = {name: torch.tensor(array) for name, array in tensors.items()}
+        model = _build_torch_model(model_config, state_dict, device)
+
+    return model, scaler, metadata["config"], metadata["model_id"]
+
+
+def load_bundle(
+    model_dir: Path,
+    device: str = "cpu",
+    fuse: bool = True,
+    backend: str = "eager",
+    precision: str = "fp32",
+    prefer_bundle: bool = True
+) -> ModelBundle:
+    """
+    Carrega modelo, scaler e configuração de um diretório.
+
+    Se houver um model.bundle atualizado (ver bundle_format.py), tudo vem
+    desse único arquivo, sem pickle: o sklearn nunca é importado e, com
+    backend="numpy", nem o torch.
+
+    Sem o bundle, usa os artefatos model_lstm.pth, scaler.pkl e config.pkl.
+    Nesse caso, com backend="numpy", os pesos vêm de model_lstm.npz
+    (scaler fundido) e model_lstm.pth e scaler.pkl só entram na identidade
+    do modelo; sem o .npz, usa o eager se o torch estiver instalado.
+
+    Args:
+        model_dir: Diretório com model.bundle ou model_lstm.pth, scaler.pkl e config.pkl
+        device: Dispositivo onde o modelo será carregado
+        fuse: Se True, funde o scaler nos pesos do modelo
+        backend: Backend do forward ("eager", "torchscript", "onnx" ou "numpy")
+        precision: "fp32" ou "int8" (modelo quantizado)
+        prefer_bundle: Se False, ignora o model.bundle (comparação de cold start)
+
+    Returns:
+        ModelBundle pronto para inferência
+    """
+    start_time = time.time()
+    use_numpy = backend == "numpy"
+
+    bundle_path = model_dir / BUNDLE_FILENAME
+    if prefer_bundle and bundle_is_current(model_dir):
+        # Os artefatos antigos também são vigiados: um model_lstm.pth novo
+        # deixa o bundle desatualizado e precisa disparar o reload.
+        # Assinatura tirada antes da leitura: uma escrita concorrente é detectada depois
+        artifacts = [bundle_path, *bundle_artifact_paths(model_dir)]
+        signature = files_signature(*artifacts)
+        model, scaler, config, model_id = _load_from_bundle_file(bundle_path, device, use_numpy)
+        return ModelBundle(
+            model=model,
+            scaler=scaler,
+            config=config,
+            model_id=model_id,
+            device=device,
+            source_dir=model_dir,
+            load_time_s=time.time() - start_time,
+            signature=signature,
+            fuse=fuse,
+            backend=backend,
+            precision=precision,
+            artifacts=artifacts,
+            source_format="bundle"
+        )
+    if prefer_bundle and bundle_path.exists():
+        print(f"{bundle_path} desatualizado em relacao a {MODEL_FILENAME}, usando os artefatos antigos")
+
+    import joblib
+
+    model_path = model_dir / MODEL_FILENAME
+    scaler_path = model_dir / SCALER_FILENAME
+    config_path = model_dir / CONFIG_FILENAME
+
+    # Verificar se arquivos existem
+    for path, name in [(model_path, "Modelo"), (scaler_path, "Scaler"), (config_path, "Config")]:
+        if not path.exists():
+            raise FileNotFoundError(f"{name} não encontrado: {path}")
+
+    paths = bundle_artifact_paths(model_dir, numpy_weights=use_numpy)
+
+    # Assinatura tirada antes da leitura: uma escrita concorrente é detectada depois
+    signature = files_signature(*paths)
+
+    config = joblib.load(config_path)
+    model_id = fingerprint_files(model_path, scaler_path, config_path)
+
+    model = scaler = None
+    if use_numpy:
+        try:
+            model = load_numpy_engine(model_dir / NUMPY_WEIGHTS_FILENAME, model_id)
+        except (FileNotFoundError, RuntimeError) as e:
+            try:
+                require_torch()
+            except RuntimeError:
+                raise e
+            print(f"Motor NumPy indisponivel para {model_dir}, usando eager: {e}")
+            backend = "eager"
+            signature = signature[:3]
+            paths = paths[:3]
+
+    if model is None:
+        torch = require_torch()
+        scaler = joblib.load(scaler_path)
+        checkpoint = torch.load(model_path, map_location=device, weights_only=False)
+        model = _build_torch_model(checkpoint.get('model_config', {}), checkpoint['model_state_dict'], device)
+
+    return ModelBundle(
+        model=model,
+        scaler=scaler,
+        config=config,
+        model_id=model_id,
+        device=device,
+        source_dir=model_dir,
+        load_time_s=time.time() - start_time,
+        signature=signature,
+        fuse=fuse,
+        backend=backend,
+        precision=precision,
+        artifacts=paths
+    )
+
+# ══════════════════════════════════════════════════════════════════
+# REGISTRO COM CARREGAMENTO SOB DEMANDA E EVICCAO LRU
+# ══════════════════════════════════════════════════════════════════
+
+class ModelRegistry:
+    """
+    Registro de modelos por ticker com carregamento sob demanda.
+
+    Layout esperado em `models_dir`:
+        models/                    → modelo padrão (ticker do config.pkl)
+        models/<TICKER_SLUG>/      → um diretório por ticker adicional
+            model.bundle ou model_lstm.pth, scaler.pkl, config.pkl
+
+    Cada bundle é carregado no primeiro uso. Quando o número de modelos
+    residentes ou a memória dos pesos passa do limite, o modelo usado há
+    mais tempo é descarregado (exceto os fixados, como o padrão).
+    """
+
+    def __init__(
+        self,
+        models_dir: Path,
+        device: str = "cpu",
+        max_models: int = 8,
+        max_memory_mb: Optional[float] = None,
+        on_unload: Optional[Callable[[ModelBundle], None]] = None,
+        fuse_scaler: bool = True,
+        backend: str = "eager",
+        precision: str = "fp32"
+    ):
+        """
+        Inicializa o registro.
+
+        Args:
+            models_dir: Diretório raiz dos modelos
+            device: Dispositivo onde os modelos são carregados
+            max_models: Máximo de modelos residentes
+            max_memory_mb: Máximo de memória (MB) dos pesos residentes (None = sem limite)
+            on_unload: Chamado com o bundle descarregado (ex: limpar cache)
+            fuse_scaler: Se True, funde o scaler nos pesos de cada modelo carregado
+            backend: Backend do forward de cada modelo carregado
+            precision: Precisão dos modelos carregados ("fp32" ou "int8")
+        """
+        self.models_dir = Path(models_dir)
+        self.device = device
+        self.max_models = max(1, max_models)
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.on_unload = on_unload
+        self.fuse_scaler = fuse_scaler
+        self.backend = backend
+        self.precision = precision
+
+        self._bundles: "OrderedDict[str, ModelBundle]" = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+        # Ticker do modelo na raiz de models_dir (modelo padrão)
+        root_config = read_config(self.models_dir)
+        self.default_ticker: Optional[str] = (
+            root_config.get('ticker', 'PETR4.SA') if root_config is not None else None
+        )
+
+        # Estatísticas
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def resolve_dir(self, ticker: str) -> Path:
+        """
+        Diretório dos artefatos de um ticker.
+
+        Tickers fora de TICKER_PATTERN, ou cujo diretório resolvido saia de
+        `models_dir`, são recusados antes de qualquer acesso a arquivos.
+
+        Raises:
+            KeyError: Se o ticker for inválido ou não houver modelo para ele
+        """
+        try:
+            slug = ticker_slug(ticker)
+        except ValueError:
+            raise KeyError(ticker) from None
+        root = self.models_dir.resolve()
+        model_dir = (root / slug).resolve()
+        if model_dir.parent != root:
+            raise KeyError(ticker)
+        if has_model(model_dir):
+            return model_dir
+        if ticker == self.default_ticker:
+            return root
+        raise KeyError(ticker)
+
+    def available(self) -> List[str]:
+        """Tickers com modelo disponível em disco."""
+        tickers = {self.default_ticker} if self.default_ticker else set()
+        for model_dir in self.models_dir.iterdir():
+            if model_dir.is_dir() and has_model(model_dir):
+                config = read_config(model_dir)
+                if config is not None:
+                    tickers.add(config.get('ticker', model_dir.name))
+        return sorted(tickers)
+
+    def peek(self, ticker: str) -> Optional[ModelBundle]:
+        """Retorna o bundle se já estiver residente (sem carregar), marcando uso."""
+        with self._lock:
+            bundle = self._bundles.get(ticker)
+            if bundle is not None:
+                self._bundles.move_to_end(ticker)
+            return bundle
+
+    def _load(self, model_dir: Path) -> ModelBundle:
+        """Carrega o bundle de um diretório com as opções do registro."""
+        return load_bundle(
+            model_dir,
+            self.device,
+            fuse=self.fuse_scaler,
+            backend=self.backend,
+            precision=self.precision
+        )
+
+    def get(self, ticker: str) -> ModelBundle:
+        """
+        Retorna o bundle do ticker, carregando do disco no primeiro uso.
+
+        Requisições concorrentes para o mesmo ticker compartilham um único
+        carregamento. Bloqueia durante o carregamento: no servidor, chamar
+        fora do event loop.
+
+        Raises:
+            KeyError: Se não houver modelo para o ticker
+        """
+        bundle = self.peek(ticker)
+        if bundle is not None:
+            return bundle
+
+        # Valida antes de criar o lock: tickers desconhecidos não deixam entradas
+        model_dir = self.resolve_dir(ticker)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(ticker, threading.Lock())
+
+        with load_lock:
+            bundle = self.peek(ticker)
+            if bundle is not None:
+                return bundle
+
+            bundle = self._load(model_dir)
+
+            with self._lock:
+                self._bundles[ticker] = bundle
+                self.loads += 1
+                evicted = self._evict(keep=ticker)
+
+        for old in evicted:
+            if self.on_unload is not None:
+                self.on_unload(old)
+
+        return bundle
+
+    def reload(self, ticker: str) -> Tuple[Optional[ModelBundle], ModelBundle]:
+        """
+        Recarrega o bundle do ticker do disco e troca atomicamente o residente.
+
+        O novo bundle é carregado e aquecido sem bloquear as requisições;
+        só então substitui o anterior no registro. Requisições em andamento
+        mantêm a referência ao bundle antigo e terminam nele.
+
+        Returns:
+            Tuple com (bundle anterior ou None, bundle ativo)
+
+        Raises:
+            KeyError: Se não houver modelo para o ticker
+        """
+        model_dir = self.resolve_dir(ticker)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(ticker, threading.Lock())
+
+        with load_lock:
+            new = self._load(model_dir)
+            new.warmup()
+
+            with self._lock:
+                old = self._bundles.get(ticker)
+                self._bundles[ticker] = new
+                self._bundles.move_to_end(ticker)
+                self.loads += 1
+                self.reloads += 1
+                evicted = self._evict(keep=ticker)
+
+        if old is not None and old.model_id != new.model_id:
+            evicted.append(old)
+        for bundle in evicted:
+            if self.on_unload is not None:
+                self.on_unload(bundle)
+
+        return old, new
+
+    def resident(self) -> Dict[str, ModelBundle]:
+        """Cópia do mapa ticker → bundle residente."""
+        with self._lock:
+            return dict(self._bundles)
+
+    def pin(self, ticker: str) -> None:
+        """Impede que o modelo do ticker seja descarregado pela política LRU."""
+        self._pinned.add(ticker)
+
+    def _evict(self, keep: str) -> List[ModelBundle]:
+        """Descarrega modelos LRU até respeitar os limites (chamar com o lock)."""
+        evicted = []
+        candidates = [t for t in self._bundles if t != keep and t not in self._pinned]
+        while candidates and self._over_budget():
+            ticker = candidates.pop(0)
+            evicted.append(self._bundles.pop(ticker))
+            self._load_locks.pop(ticker, None)
+            self.evictions += 1
+        return evicted
+
+    def _over_budget(self) -> bool:
+        if len(self._bundles) > self.max_models:
+            return True
+        if self.max_memory_bytes is not None:
+            return sum(b.nbytes for b in self._bundles.values()) > self.max_memory_bytes
+        return False
+
+    def stats(self) -> dict:
+        """Modelos residentes, uso de memória e contadores de carga/evicção."""
+        with self._lock:
+            resident = {
+                ticker: {
+                    "model_id": bundle.model_id,
+                    "version": bundle.version,
+                    "loaded_at": bundle.loaded_at,
+                    "memory_mb": round(bundle.nbytes / 1024 / 1024, 3),
+                    "load_time_ms": round(bundle.load_time_s * 1000, 1),
+                    "warmup_time_ms": round(bundle.warmup_time_s * 1000, 1)
+                }
+                for ticker, bundle in self._bundles.items()
+            }
+        return {
+            "default_ticker": self.default_ticker,
+            "resident": resident,
+            "max_models": self.max_models,
+            "max_memory_mb": self.max_memory_bytes / 1024 / 1024 if self.max_memory_bytes else None,
+            "memory_mb": round(sum(r["memory_mb"] for r in resident.values()), 3),
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,327 @@
+# ═══════════════════════════════════════════════════════════════
+# Servidor multi-processo (prefork)
+# Objetivo: Varios workers uvicorn compartilhando os pesos do modelo
+# ═══════════════════════════════════════════════════════════════
+
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# ══════════════════════════════════════════════════════════════════
+# CONFIGURACOES
+# ══════════════════════════════════════════════════════════════════
+
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+
+# Processos worker (cada um com seu event loop e pool de inferência)
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+
+# Carregar o modelo no processo pai antes do fork (pesos compartilhados via copy-on-write)
+SERVER_PRELOAD = os.environ.get("SERVER_PRELOAD", "1") == "1"
+
+# Espera antes de recriar um worker que morreu (evita laço de reinícios)
+WORKER_RESTART_DELAY_S = 1.0
+
+# Estado mantido em memória por worker: com mais de um worker, cada
+# requisição vê só o estado do worker que aceitou a conexão
+PER_WORKER_STATE = (
+    "sessões de streaming (/stream/sessions)",
+    "histórico de preços (/history)",
+    "cache de previsões e /admin/reload",
+)
+
+# ══════════════════════════════════════════════════════════════════
+# THREADS POR WORKER
+# ══════════════════════════════════════════════════════════════════
+
+def threads_per_worker(n_workers: int, inference_workers: int = 1) -> int:
+    """
+    Threads intra-op de cada forward quando há vários processos.
+
+    Divide os núcleos disponíveis entre processos × workers do pool de
+    inferência de cada processo, para não sobrecarregar a CPU.
+    """
+    n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, (n_cores or 1) // max(1, n_workers * inference_workers))
+
+# ══════════════════════════════════════════════════════════════════
+# PRE-CARREGAMENTO E FORK
+# ══════════════════════════════════════════════════════════════════
+
+def preload(app_module) -> None:
+    """
+    Carrega o modelo padrão no processo pai, antes do fork.
+
+    Os workers herdam o registro já carregado: os buffers dos pesos (e as
+    páginas do torch/NumPy já importados) ficam compartilhados até alguém
+    escrever neles, o que não acontece na inferência. O aquecimento fica
+    para cada worker, com suas próprias threads.
+
+    gc.freeze() move os objetos existentes para a geração permanente: o
+    coletor dos workers não percorre esses objetos e não suja suas páginas.
+    """
+    state = app_module.state
+    state.device = app_module.detect_device()
+    state.registry = app_module.create_registry()
+    if state.registry.default_ticker is None:
+        raise FileNotFoundError(f"Modelo não encontrado em {app_module.MODELS_DIR}")
+
+    bundle = state.registry.get(state.registry.default_ticker)
+    state.registry.pin(bundle.ticker)
+    print(f"Modelo pre-carregado no processo pai: {bundle.ticker} (id={bundle.model_id}, "
+          f"backend={bundle.backend.name}, {bundle.nbytes / 1024:.0f} KB de pesos)")
+
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Socket de escuta criado no pai e herdado por todos os workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, log_level: str) -> None:
+    """Executa o uvicorn no worker sobre o socket herdado até o encerramento."""
+    import uvicorn
+
+    config = uvicorn.Config(app_module.app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Processo pai: cria os workers com fork, recria os que morrem e repassa
+    SIGTERM/SIGINT para um encerramento gracioso.
+    """
+
+    def __init__(self, app_module, sock: socket.socket, n_workers: int, log_level: str = "info"):
+        self.app_module = app_module
+        self.sock = sock
+        self.n_workers = max(1, n_workers)
+        self.log_level = log_level
+        self.workers: Dict[int, int] = {}
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: nunca volta ao código do supervisor
+            exit_code = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.app_module.state.worker_index = index
+                self.app_module.state.server_workers = self.n_workers
+                run_worker(self.app_module, self.sock, self.log_level)
+                exit_code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+        self.workers[pid] = index
+        print(f"Worker {index} iniciado (pid={pid})")
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for index in range(self.n_workers):
+            self.spawn(index)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.workers.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            print(f"Worker {index} (pid={pid}) encerrou com status {status}; reiniciando")
+            time.sleep(WORKER_RESTART_DELAY_S)
+            if not self.stopping:
+                self.spawn(index)
+
+        self.sock.close()
+        print("Servidor encerrado")
+
+# ══════════════════════════════════════════════════════════════════
+# RELATORIO DE MEMORIA (RSS x WORKERS)
+# ══════════════════════════════════════════════════════════════════
+
+def process_memory_kb(pid: int) -> Dict[str, int]:
+    """RSS e PSS (kB) de um processo, via /proc/<pid>/smaps_rollup (Linux)."""
+    memory = {"rss": 0, "pss": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0])
+    return memory
+
+
+def child_pids(pid: int) -> List[int]:
+    """Processos filhos diretos (os workers do supervisor)."""
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(p) for p in path.read_text().split()] if path.exists() else []
+
+
+def wait_healthy(port: int, timeout_s: float = 120.0) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                if json.load(r).get("model_loaded"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Servidor na porta {port} não ficou saudável em {timeout_s}s")
+
+
+def exercise(port: int, seq_length: int, n_requests: int) -> None:
+    """Requisições de previsão para que cada worker aqueça e toque os pesos."""
+    body = json.dumps({"prices": [30.0 + 0.01 * i for i in range(seq_length)]}).encode()
+    for _ in range(n_requests):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/predict", data=body, headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(request, timeout=10).read()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_report(worker_counts: List[int], n_requests: int = 200) -> List[dict]:
+    """
+    Sobe o servidor com cada número de workers, com e sem pré-carregamento,
+    e soma a memória do pai e dos workers.
+
+    O PSS divide cada página compartilhada entre os processos que a usam:
+    é a medida de memória real do conjunto. O RSS conta as páginas
+    compartilhadas em cada processo.
+    """
+    rows = []
+    for preload_model in (True, False):
+        for n_workers in worker_counts:
+            port = free_port()
+            env = {**os.environ, "SERVER_PRELOAD": "1" if preload_model else "0", "PYTHONWARNINGS": "ignore"}
+            proc = subprocess.Popen(
+                [sys.executable, __file__, "--workers", str(n_workers), "--port", str(port),
+                 "--host", "127.0.0.1", "--log-level", "warning"],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_healthy(port)
+                # Dar tempo aos demais workers de terminarem o startup
+                time.sleep(2.0)
+                exercise(port, 60, n_requests)
+                pids = [proc.pid] + child_pids(proc.pid)
+                usage = [process_memory_kb(pid) for pid in pids]
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=30)
+
+            row = {
+                "workers": n_workers,
+                "preload": preload_model,
+                "rss_mb": sum(u["rss"] for u in usage) / 1024,
+                "pss_mb": sum(u["pss"] for u in usage) / 1024,
+                "worker_pss_mb": [round(u["pss"] / 1024, 1) for u in usage[1:]]
+            }
+            rows.append(row)
+            print(f"   {'pre-fork' if preload_model else 'por worker':<12}{n_workers:>8}"
+                  f"{row['rss_mb']:>12.1f}{row['pss_mb']:>12.1f}")
+    return rows
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUCAO
+# ══════════════════════════════════════════════════════════════════
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Servidor multi-processo da API")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads intra-op por forward em cada worker (padrão: núcleos / workers)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--memory-report", metavar="N,N,...", default=None,
+                        help="Mede RSS/PSS totais para cada número de workers e sai")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+
+    if args.memory_report:
+        counts = [int(n) for n in args.memory_report.split(",")]
+        print("=" * 60)
+        print("Memoria total (pai + workers) apos aquecer cada worker")
+        print("=" * 60)
+        print(f"   {'modelo':<12}{'workers':>8}{'RSS (MB)':>12}{'PSS (MB)':>12}")
+        memory_report(counts)
+        return
+
+    # As threads precisam estar no ambiente antes de importar app.py
+    inference_workers = int(os.environ.get("INFERENCE_WORKERS", "1"))
+    threads = args.threads or int(os.environ.get("INFERENCE_THREADS", "0")) \
+        or threads_per_worker(args.workers, inference_workers)
+    os.environ["INFERENCE_THREADS"] = str(threads)
+
+    try:
+        import app as app_module
+    except ImportError:
+        from src import app as app_module
+
+    print("=" * 60)
+    print(f"Servidor: {args.workers} worker(s) em http://{args.host}:{args.port}, "
+          f"threads/forward={threads}, pre-carregamento={'sim' if SERVER_PRELOAD else 'nao'}")
+    print("=" * 60)
+    if args.workers > 1:
+        print(f"Aviso: com {args.workers} workers, cada um tem seu próprio estado em memória: "
+              f"{', '.join(PER_WORKER_STATE)}. Uma sessão de streaming criada em um worker "
+              f"responde 404 nos demais; use SERVER_WORKERS=1 para essas rotas.")
+
+    if SERVER_PRELOAD:
+        preload(app_module)
+
+    sock = bind_socket(args.host, args.port)
+    Supervisor(app_module, sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    # Uso: python serve.py --workers 4 [--threads 1] [--port 8000]
+    #      python serve.py --memory-report 1,2,4
+    main()
@@ -0,0 +1,172 @@
+# ═══════════════════════════════════════════════════════════════
+# Inferencia em streaming
+# Objetivo: Avancar a LSTM um preco por vez, sem reprocessar a janela
+# ═══════════════════════════════════════════════════════════════
+
+import asyncio
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+# ══════════════════════════════════════════════════════════════════
+# SESSAO
+# ══════════════════════════════════════════════════════════════════
+
+class StreamingSession:
+    """
+    Estado de um cliente em streaming: modelo, (h_n, c_n) e últimos preços.
+
+    A cada novo preço, a LSTM avança um único passo a partir do estado
+    salvo. Diferente do /predict, o estado resume todo o histórico desde
+    o início da sessão (não apenas os últimos seq_length dias); por isso
+    a sessão guarda os últimos seq_length preços e pode ser ressincronizada
+    com um forward completo sobre eles a cada `resync_steps` passos.
+    """
+
+    def __init__(self, session_id: str, bundle: Any, window: np.ndarray):
+        self.session_id = session_id
+        self.bundle = bundle
+        self.hidden: Optional[Tuple] = None
+        self.prices = deque(window.tolist(), maxlen=len(window))
+        self.predicted_price: Optional[float] = None
+        self.steps = 0
+        self.steps_since_sync = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+        # Serializa passos concorrentes da mesma sessão
+        self.lock = asyncio.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memória do estado da LSTM e dos preços guardados."""
+        hidden_bytes = sum(t.nbytes for t in self.hidden) if self.hidden else 0
+        return hidden_bytes + 8 * len(self.prices)
+
+    def window(self) -> np.ndarray:
+        """Últimos seq_length preços recebidos."""
+        return np.array(self.prices)
+
+# ══════════════════════════════════════════════════════════════════
+# ARMAZENAMENTO DE SESSOES
+# ══════════════════════════════════════════════════════════════════
+
+class SessionStore:
+    """
+    Sessões de streaming em memória, com expiração por inatividade e limite.
+
+    Sessões sem uso há mais de `ttl_s` segundos expiram. Ao atingir
+    `max_sessions`, a sessão usada há mais tempo é descartada (LRU), o que
+    limita a memória a aproximadamente max_sessions × bytes por sessão.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_s: float = 900.0):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            max_sessions: Máximo de sessões simultâneas
+            ttl_s: Tempo máximo de inatividade de uma sessão em segundos
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_s = ttl_s
+
+        self._sessions: "OrderedDict[str, StreamingSession]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+        # Estatísticas
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, bundle: Any, window: np.ndarray) -> StreamingSession:
+        """Cria uma sessão (o estado inicial é preenchido pelo chamador)."""
+        self.purge_expired()
+
+        session = StreamingSession(secrets.token_urlsafe(16), bundle, window)
+        self._sessions[session.session_id] = session
+        self.created += 1
+
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+        return session
+
+    def get(self, session_id: str) -> StreamingSession:
+        """
+        Retorna a sessão e marca seu uso.
+
+        Raises:
+            KeyError: Se a sessão não existir ou tiver expirado
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+
+        now = time.monotonic()
+        if self.ttl_s > 0 and now - session.last_used > self.ttl_s:
+            del self._sessions[session_id]
+            self.expired += 1
+            raise KeyError(session_id)
+
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a sessão; retorna False se ela não existir."""
+        return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self) -> int:
+        """Remove sessões inativas há mais de ttl_s; retorna quantas."""
+        if self.ttl_s <= 0:
+            return 0
+
+        cutoff = time.monotonic() - self.ttl_s
+        n_purged = 0
+        # Ordem LRU: as mais antigas ficam no início
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            n_purged += 1
+
+        self.expired += n_purged
+        return n_purged
+
+    async def start(self, interval_s: float = 60.0) -> None:
+        """Inicia a limpeza periódica das sessões expiradas."""
+        async def sweep():
+            while True:
+                await asyncio.sleep(interval_s)
+                self.purge_expired()
+
+        self._task = asyncio.create_task(sweep())
+
+    async def stop(self) -> None:
+        """Encerra a limpeza periódica e descarta as sessões."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        """Sessões ativas, memória ocupada e contadores."""
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl_s,
+            "memory_kb": round(sum(s.nbytes for s in self._sessions.values()) / 1024, 1),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -3,19 +3,29 @@
 # Objetivo: Treinar o modelo ajustando os pesos
 # ═══════════════════════════════════════════════════════════════
 
+import argparse
+import hashlib
+import os
+import random
+import sys
 import torch
 import torch.nn as nn
 import torch.optim as optim
+from torch.utils.data import BatchSampler, DataLoader, RandomSampler, SequentialSampler, TensorDataset
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend for headless environments
 import matplotlib.pyplot as plt
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Sequence, Union
 import time
 
 # Importar módulos do projeto
 from model import StockLSTM, create_model
 from preprocessing import preprocess_data
+from bundle_format import convert_artifacts
 
 # ══════════════════════════════════════════════════════════════════
 # CONFIGURACOES DE TREINAMENTO
@@ -24,12 +34,230 @@ from preprocessing import preprocess_data
 # Hiperparâmetros
 EPOCHS = 100
 LEARNING_RATE = 0.001
-BATCH_SIZE = None  # None = usar todos os dados (batch gradient descent)
+BATCH_SIZE = 64  # None = usar todos os dados (batch gradient descent)
+
+# Carregamento dos mini-batches
+SHUFFLE = True           # Embaralha a ordem das janelas a cada época
+NUM_WORKERS = 0          # Processos de carga (0 = no processo principal)
+PREFETCH_FACTOR = 2      # Batches preparados antecipadamente por worker
+ACCUMULATION_STEPS = 1   # Mini-batches acumulados por passo do otimizador
+SEED = 42                # Semente do embaralhamento
+
+# Early stopping
+PATIENCE = 15            # Épocas sem melhora antes de parar (None = treina todas)
+MIN_DELTA = 1e-6         # Melhora mínima da Val Loss para contar como melhora
+RESTORE_BEST = True      # Devolve os pesos da melhor época, não os da última
+
+# Checkpoints periódicos (retomada com --resume)
+CHECKPOINT_EVERY = 10        # A cada N épocas (0 = desligado)
+CHECKPOINT_EVERY_S = 0       # Ou a cada T segundos (0 = desligado)
+CHECKPOINT_KEEP = 3          # Checkpoints mantidos (os mais recentes)
+
+# Tamanhos comparados por --benchmark (0 = full batch)
+BENCHMARK_BATCH_SIZES = (16, 64, 256, 0)
 
 # Diretórios
 MODELS_DIR = Path(__file__).parent.parent / "models"
+CHECKPOINT_DIR = MODELS_DIR / "checkpoints"
+
+# ══════════════════════════════════════════════════════════════════
+# CARREGAMENTO EM MINI-BATCHES
+# ══════════════════════════════════════════════════════════════════
+
+def make_loader(
+    X: torch.Tensor,
+    y: torch.Tensor,
+    batch_size: Optional[int] = BATCH_SIZE,
+    shuffle: bool = False,
+    num_workers: int = 0,
+    pin_memory: bool = False,
+    prefetch_factor: int = PREFETCH_FACTOR,
+    generator: Optional[torch.Generator] = None
+) -> DataLoader:
+    """
+    DataLoader das janelas (X, y) em mini-batches.
+    
+    O BatchSampler entrega a lista de índices de cada batch e o
+    TensorDataset indexa os tensores de uma vez: cada item do loader já é
+    um batch inteiro, sem montar o batch amostra por amostra (collate).
+    
+    Args:
+        X, y: Janelas e alvos
+        batch_size: Tamanho do mini-batch (None = todas as janelas)
+        shuffle: Se True, embaralha a ordem a cada época
+        num_workers: Processos de carga (0 = no processo principal)
+        pin_memory: Usa memória fixada (cópia assíncrona para a GPU)
+        prefetch_factor: Batches preparados antecipadamente por worker
+        generator: Gerador do embaralhamento (ordem reprodutível)
+        
+    Returns:
+        DataLoader que entrega tuplas (X_batch, y_batch)
+    """
+    dataset = TensorDataset(X, y)
+    batch_size = len(dataset) if not batch_size else min(batch_size, len(dataset))
+    
+    base = RandomSampler(dataset, generator=generator) if shuffle else SequentialSampler(dataset)
+    sampler = BatchSampler(base, batch_size=batch_size, drop_last=False)
+    
+    # prefetch_factor e persistent_workers só existem com workers
+    worker_options = {}
+    if num_workers > 0:
+        worker_options = {'prefetch_factor': prefetch_factor, 'persistent_workers': True}
+    
+    # Gerador próprio para a semente dos workers: sem ele, o DataLoader
+    # sorteia essa semente no RNG global (o do dropout) a cada iterador, e
+    # um treino retomado seguiria outra sequência de dropout.
+    seed = generator.initial_seed() if generator is not None else 0
+    
+    return DataLoader(
+        dataset,
+        sampler=sampler,
+        batch_size=None,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        generator=torch.Generator().manual_seed(seed),
+        **worker_options
+    )
+
+
+def evaluate_loss(
+    model: nn.Module,
+    loader: DataLoader,
+    criterion: nn.Module,
+    device: str
+) -> float:
+    """Loss média por amostra sobre todos os batches do loader (sem gradientes)."""
+    model.eval()  # Desativa dropout
+    total = torch.zeros((), device=device)
+    n_samples = 0
+    with torch.no_grad():  # Não calcula gradientes (economia de memória)
+        for X_batch, y_batch in loader:
+            X_batch = X_batch.to(device, non_blocking=True)
+            y_batch = y_batch.to(device, non_blocking=True)
+            total += criterion(model(X_batch), y_batch) * len(X_batch)
+            n_samples += len(X_batch)
+    return total.item() / n_samples
+
+
+def peak_memory_mb(device: str) -> float:
+    """
+    Pico de memória do treino.
+    
+    GPU: maior alocação do PyTorch desde o início do treino.
+    CPU: pico de RSS do processo (inclui dados e bibliotecas carregadas).
+    """
+    if device.startswith('cuda'):
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+# ══════════════════════════════════════════════════════════════════
+# CHECKPOINTS
+# ══════════════════════════════════════════════════════════════════
+
+def data_fingerprint(*tensors: torch.Tensor) -> str:
+    """Hash (shape + bytes) dos dados de treino: identifica ticker, período e janelas."""
+    digest = hashlib.sha256()
+    for tensor in tensors:
+        tensor = tensor.detach().cpu().contiguous()
+        digest.update(str(tuple(tensor.shape)).encode())
+        digest.update(tensor.numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def capture_rng_state(generator: torch.Generator) -> dict:
+    """Estado de todos os RNGs que influenciam o treino."""
+    state = {
+        'torch': torch.get_rng_state(),
+        'shuffle': generator.get_state(),
+        'numpy': np.random.get_state(),
+        'python': random.getstate()
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state: dict, generator: torch.Generator) -> None:
+    """Restaura os RNGs capturados por capture_rng_state()."""
+    torch.set_rng_state(state['torch'])
+    generator.set_state(state['shuffle'])
+    np.random.set_state(state['numpy'])
+    random.setstate(state['python'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+def save_checkpoint(
+    state: dict,
+    checkpoint_dir: Path,
+    keep: int = CHECKPOINT_KEEP,
+    written: Optional[List[Path]] = None
+) -> Path:
+    """
+    Grava um checkpoint de forma atômica e apaga os mais antigos.
+    
+    O arquivo é escrito em um temporário e renomeado: um processo morto
+    no meio da escrita nunca deixa um checkpoint truncado. A rotação só
+    considera os checkpoints em `written` (os do próprio treino), nunca
+    outros arquivos do diretório.
+    
+    Args:
+        state: Conteúdo do checkpoint (precisa ter 'epoch')
+        checkpoint_dir: Diretório dos checkpoints
+        keep: Quantos checkpoints manter (os mais recentes)
+        written: Checkpoints já gravados por este treino; recebe o novo
+            e perde os apagados (None = sem rotação)
+        
+    Returns:
+        Caminho do checkpoint gravado
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    path = checkpoint_dir / f"checkpoint_epoch_{state['epoch']:04d}.pt"
+    
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    
+    if written is not None:
+        if path not in written:
+            written.append(path)
+        written.sort()
+        for old in written[:-max(1, keep)]:
+            old.unlink(missing_ok=True)
+            written.remove(old)
+    
+    return path
 
 
+def latest_checkpoint(path: Union[str, Path]) -> Path:
+    """
+    Checkpoint mais recente de um diretório (ou o próprio arquivo).
+    
+    Raises:
+        FileNotFoundError: Se não houver checkpoint
+    """
+    path = Path(path)
+    if path.is_file():
+        return path
+    checkpoints = sorted(path.glob("checkpoint_epoch_*.pt"))
+    if not checkpoints:
+        raise FileNotFoundError(f"Nenhum checkpoint em {path}")
+    return checkpoints[-1]
+
+# ══════════════════════════════════════════════════════════════════
+# LOOP DE TREINAMENTO
+# ══════════════════════════════════════════════════════════════════
+
 def train_model(
     model: nn.Module,
     X_train: torch.Tensor,
@@ -39,10 +267,39 @@ def train_model(
     epochs: int = EPOCHS,
     learning_rate: float = LEARNING_RATE,
     device: str = None,
-    verbose: bool = True
+    verbose: bool = True,
+    batch_size: Optional[int] = BATCH_SIZE,
+    shuffle: bool = SHUFFLE,
+    num_workers: int = NUM_WORKERS,
+    accumulation_steps: int = ACCUMULATION_STEPS,
+    seed: int = SEED,
+    patience: Optional[int] = PATIENCE,
+    min_delta: float = MIN_DELTA,
+    restore_best: bool = RESTORE_BEST,
+    checkpoint_dir: Optional[Path] = None,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    checkpoint_every_s: float = CHECKPOINT_EVERY_S,
+    checkpoint_keep: int = CHECKPOINT_KEEP,
+    resume_from: Optional[Path] = None,
+    overwrite_checkpoints: bool = False,
+    report: Optional[dict] = None
 ) -> Tuple[nn.Module, List[float], List[float]]:
     """
-    Treina o modelo LSTM.
+    Treina o modelo LSTM em mini-batches, com early stopping.
+    
+    O treino para quando a Val Loss passa `patience` épocas sem cair mais
+    que `min_delta`. Os pesos da melhor época ficam em uma cópia em
+    memória e são restaurados ao final, então o modelo devolvido é o de
+    menor Val Loss, não o da última época.
+    
+    Com `checkpoint_dir`, grava checkpoints periódicos com pesos, estado
+    do Adam, perdas, estado do early stopping e dos RNGs. `resume_from`
+    continua a partir de um deles com a mesma sequência de batches e de
+    dropout, como se o treino não tivesse sido interrompido. A retomada
+    recusa checkpoints de outro modelo ou de outros dados de treino.
+    
+    Um treino novo não grava em um `checkpoint_dir` que já tem checkpoints
+    (de outro treino): falha, a menos que `overwrite_checkpoints` os apague.
     
     Args:
         model: Modelo a ser treinado
@@ -52,6 +309,24 @@ def train_model(
         learning_rate: Taxa de aprendizado
         device: Dispositivo ('cuda' ou 'cpu')
         verbose: Se True, imprime progresso
+        batch_size: Janelas por mini-batch (None = full batch)
+        shuffle: Se True, embaralha as janelas de treino a cada época
+        num_workers: Processos de carga dos batches
+        accumulation_steps: Mini-batches somados antes de cada passo do
+            otimizador (batch efetivo = batch_size × accumulation_steps)
+        seed: Semente do embaralhamento
+        patience: Épocas sem melhora antes de parar (None = sem early stopping)
+        min_delta: Queda mínima da Val Loss para contar como melhora
+        restore_best: Se True, restaura os pesos da melhor época
+        checkpoint_dir: Diretório dos checkpoints (None = sem checkpoints)
+        checkpoint_every: Checkpoint a cada N épocas (0 = só na última)
+        checkpoint_every_s: Checkpoint a cada T segundos (0 = desligado)
+        checkpoint_keep: Checkpoints mantidos
+        resume_from: Checkpoint (ou diretório) de onde continuar
+        overwrite_checkpoints: Se True, apaga os checkpoints existentes em
+            `checkpoint_dir` em vez de falhar (treino novo)
+        report: Dicionário preenchido com throughput, pico de memória e
+            épocas economizadas (opcional)
         
     Returns:
         Tuple com (modelo treinado, lista de train_losses, lista de val_losses)
@@ -61,12 +336,22 @@ def train_model(
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
     model = model.to(device)
+    accumulation_steps = max(1, accumulation_steps)
     
-    # Mover dados para o dispositivo
-    X_train = X_train.to(device)
-    y_train = y_train.to(device)
-    X_test = X_test.to(device)
-    y_test = y_test.to(device)
+    # Os dados ficam na CPU; cada batch vai para o dispositivo ao ser usado.
+    # Com GPU, a memória fixada permite a cópia assíncrona (non_blocking).
+    pin_memory = device.startswith('cuda')
+    if pin_memory:
+        torch.cuda.reset_peak_memory_stats(device)
+    
+    generator = torch.Generator().manual_seed(seed)
+    train_loader = make_loader(
+        X_train, y_train, batch_size, shuffle=shuffle,
+        num_workers=num_workers, pin_memory=pin_memory, generator=generator
+    )
+    val_loader = make_loader(X_test, y_test, batch_size, pin_memory=pin_memory)
+    n_batches = len(train_loader)
+    n_samples = len(X_train)
     
     # Definir funcao de perda e otimizador
     # MSELoss: Mean Squared Error - ideal para regressao
@@ -80,6 +365,10 @@ def train_model(
         print(f"   Dispositivo: {device}")
         print(f"   Epocas: {epochs}")
         print(f"   Learning Rate: {learning_rate}")
+        print(f"   Batch Size: {batch_size or 'full batch'} "
+              f"({n_batches} batches/época, acumulação {accumulation_steps})")
+        print(f"   Shuffle: {shuffle} | Workers: {num_workers} | Pin memory: {pin_memory}")
+        print("   Early stopping: " + (f"paciência {patience}, min_delta {min_delta}" if patience else "desligado"))
         print(f"   Loss Function: MSELoss")
         print(f"   Otimizador: Adam")
         print(f"\n{'='*60}")
@@ -90,69 +379,281 @@ def train_model(
     train_losses = []
     val_losses = []
     
-    # Melhor loss para early stopping (opcional)
+    # Melhor loss para early stopping
     best_val_loss = float('inf')
     best_epoch = 0
+    best_state = None
+    epochs_without_improvement = 0
     
-    # Tempo inicial
+    # Tempo inicial (train_time: só a fase de treino, para o throughput)
     start_time = time.time()
+    train_time = 0.0
+    start_epoch = 0
+    
+    # Opções que precisam ser iguais para a retomada seguir o mesmo caminho
+    options = {
+        'batch_size': batch_size, 'shuffle': shuffle, 'accumulation_steps': accumulation_steps,
+        'seed': seed, 'learning_rate': learning_rate
+    }
+    model_config = getattr(model, 'get_config', dict)()
+    fingerprint = data_fingerprint(X_train, y_train)
+    
+    # Retomar de um checkpoint (conferindo modelo e dados antes de carregar)
+    checkpoint_path = None
+    if resume_from is not None:
+        checkpoint_path = latest_checkpoint(resume_from)
+        checkpoint = torch.load(checkpoint_path, map_location='cpu', weights_only=False)
+        if checkpoint['model_config'] != model_config:
+            raise ValueError(
+                f"Checkpoint de outro modelo: {checkpoint['model_config']} (atual: {model_config})"
+            )
+        if checkpoint.get('data_fingerprint') != fingerprint:
+            raise ValueError(
+                f"Checkpoint treinado com outros dados ({checkpoint.get('data_fingerprint')}, "
+                f"atual: {fingerprint}): ticker, período ou janelas diferentes"
+            )
+        if checkpoint['options'] != options and verbose:
+            print(f"Aviso: opções diferentes do checkpoint ({checkpoint['options']}); "
+                  f"a retomada não será idêntica ao treino original")
+        
+        model.load_state_dict(checkpoint['model_state_dict'])
+        optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        restore_rng_state(checkpoint['rng_state'], generator)
+        start_epoch = checkpoint['epoch']
+        train_losses = list(checkpoint['train_losses'])
+        val_losses = list(checkpoint['val_losses'])
+        best_val_loss = checkpoint['best_val_loss']
+        best_epoch = checkpoint['best_epoch']
+        best_state = checkpoint['best_state']
+        epochs_without_improvement = checkpoint['epochs_without_improvement']
+        start_time -= checkpoint['elapsed_s']
+        train_time = checkpoint['train_time_s']
+        
+        if verbose:
+            print(f"Retomando de {checkpoint_path} (época {start_epoch}/{epochs})\n")
+    
+    # Checkpoints deste treino: os do diretório só contam se a retomada
+    # vem dele; checkpoints de outro treino não são apagados nem misturados
+    written: List[Path] = []
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        existing = sorted(checkpoint_dir.glob("checkpoint_epoch_*.pt"))
+        own = checkpoint_path is not None and checkpoint_path.parent.resolve() == checkpoint_dir.resolve()
+        if existing and not own:
+            if not overwrite_checkpoints:
+                raise FileExistsError(
+                    f"{checkpoint_dir} já tem checkpoints de outro treino; "
+                    f"use --resume para continuar, --overwrite-checkpoints para apagá-los "
+                    f"ou outro --checkpoint-dir"
+                )
+            for old in existing:
+                old.unlink()
+            existing = []
+        written = existing
+    
+    last_checkpoint = time.time()
     
     # Loop de treinamento
-    for epoch in range(epochs):
+    for epoch in range(start_epoch, epochs):
         # ══════════════════════════════════════════════════════════
         # FASE DE TREINO
         # ══════════════════════════════════════════════════════════
         model.train()  # Ativa dropout e batch normalization
+        epoch_start = time.perf_counter()
         
-        # Forward pass: calcula previsões
-        outputs = model(X_train)
-        loss = criterion(outputs, y_train)
-        
-        # Backward pass: calcula gradientes
+        # Soma das perdas no dispositivo: .item() a cada batch forçaria sincronização
+        running_loss = torch.zeros((), device=device)
         optimizer.zero_grad()  # Limpa gradientes anteriores
-        loss.backward()        # Calcula gradientes (Backpropagation Through Time)
-        optimizer.step()       # Atualiza pesos
+        
+        for i, (X_batch, y_batch) in enumerate(train_loader):
+            X_batch = X_batch.to(device, non_blocking=True)
+            y_batch = y_batch.to(device, non_blocking=True)
+            
+            # Forward pass: calcula previsões
+            outputs = model(X_batch)
+            loss = criterion(outputs, y_batch)
+            running_loss += loss.detach() * len(X_batch)
+            
+            # Backward pass: acumula gradientes (Backpropagation Through Time).
+            # A loss é dividida pelo número de batches do grupo para que o
+            # gradiente acumulado seja a média, como em um batch único maior.
+            group_start = i - i % accumulation_steps
+            group_size = min(accumulation_steps, n_batches - group_start)
+            (loss / group_size).backward()
+            
+            if (i + 1) % accumulation_steps == 0 or i + 1 == n_batches:
+                optimizer.step()       # Atualiza pesos
+                optimizer.zero_grad()
+        
+        train_loss = running_loss.item() / n_samples
+        train_time += time.perf_counter() - epoch_start
         
         # ══════════════════════════════════════════════════════════
         # FASE DE VALIDAÇÃO
         # ══════════════════════════════════════════════════════════
-        model.eval()  # Desativa dropout
-        with torch.no_grad():  # Não calcula gradientes (economia de memória)
-            val_outputs = model(X_test)
-            val_loss = criterion(val_outputs, y_test)
+        val_loss = evaluate_loss(model, val_loader, criterion, device)
         
         # Armazenar perdas
-        train_losses.append(loss.item())
-        val_losses.append(val_loss.item())
+        train_losses.append(train_loss)
+        val_losses.append(val_loss)
         
-        # Verificar se é o melhor modelo
-        if val_loss.item() < best_val_loss:
-            best_val_loss = val_loss.item()
+        # Verificar se é o melhor modelo (cópia dos pesos fora do grafo)
+        if val_loss < best_val_loss - min_delta:
+            best_val_loss = val_loss
             best_epoch = epoch + 1
+            epochs_without_improvement = 0
+            if restore_best:
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        else:
+            epochs_without_improvement += 1
         
         # Imprimir progresso a cada 10 épocas
         if verbose and (epoch + 1) % 10 == 0:
             elapsed = time.time() - start_time
             print(f'Epoch [{epoch+1:3d}/{epochs}] | '
-                  f'Train Loss: {loss.item():.6f} | '
-                  f'Val Loss: {val_loss.item():.6f} | '
+                  f'Train Loss: {train_loss:.6f} | '
+                  f'Val Loss: {val_loss:.6f} | '
                   f'Time: {elapsed:.1f}s')
+        
+        # Early stopping
+        if patience and epochs_without_improvement >= patience:
+            if verbose:
+                print(f'\nEarly stopping na época {epoch+1}: '
+                      f'{patience} épocas sem melhora (melhor: época {best_epoch})')
+            break
+        
+        # Checkpoint periódico (depois do early stopping: um checkpoint
+        # nunca é de uma época em que o treino teria parado). A última
+        # época sempre gera um, para continuar depois com mais épocas.
+        due_epochs = checkpoint_every and (epoch + 1) % checkpoint_every == 0
+        due_time = checkpoint_every_s and time.time() - last_checkpoint >= checkpoint_every_s
+        if checkpoint_dir is not None and (due_epochs or due_time or epoch + 1 == epochs):
+            path = save_checkpoint({
+                'epoch': epoch + 1,
+                'model_state_dict': model.state_dict(),
+                'optimizer_state_dict': optimizer.state_dict(),
+                'model_config': model_config,
+                'data_fingerprint': fingerprint,
+                'options': options,
+                'train_losses': train_losses,
+                'val_losses': val_losses,
+                'best_val_loss': best_val_loss,
+                'best_epoch': best_epoch,
+                'best_state': best_state,
+                'epochs_without_improvement': epochs_without_improvement,
+                'rng_state': capture_rng_state(generator),
+                'elapsed_s': time.time() - start_time,
+                'train_time_s': train_time
+            }, checkpoint_dir, keep=checkpoint_keep, written=written)
+            last_checkpoint = time.time()
+            if verbose:
+                print(f'   Checkpoint: {path.name}')
+    
+    # Restaurar os pesos da melhor época
+    restored = best_state is not None and best_epoch < len(val_losses)
+    if restored:
+        model.load_state_dict(best_state)
     
-    # Tempo total
+    # Tempo total e economia do early stopping (estimada pelo tempo médio por época)
     total_time = time.time() - start_time
+    epochs_run = len(train_losses)
+    epochs_saved = epochs - epochs_run
+    seconds_saved = epochs_saved * total_time / epochs_run
+    samples_per_s = n_samples * epochs_run / train_time if train_time > 0 else 0.0
+    peak_mb = peak_memory_mb(device)
     
     if verbose:
         print(f"\n{'='*60}")
         print(f"Treinamento concluido!")
         print(f"{'='*60}")
         print(f"\nResumo:")
-        print(f"   Tempo total: {total_time:.1f}s ({total_time/epochs:.2f}s/época)")
+        print(f"   Tempo total: {total_time:.1f}s ({total_time/epochs_run:.2f}s/época)")
+        print(f"   Épocas: {epochs_run}/{epochs}", end="")
+        print(f" ({epochs_saved} economizadas, ~{seconds_saved:.1f}s)" if epochs_saved else "")
+        print(f"   Throughput: {samples_per_s:,.0f} amostras/s")
+        print(f"   Pico de memória: {peak_mb:.1f} MB")
         print(f"   Train Loss final: {train_losses[-1]:.6f}")
         print(f"   Val Loss final: {val_losses[-1]:.6f}")
-        print(f"   Melhor Val Loss: {best_val_loss:.6f} (época {best_epoch})")
+        print(f"   Melhor Val Loss: {best_val_loss:.6f} (época {best_epoch})"
+              + (" - pesos restaurados" if restored else ""))
+    
+    if report is not None:
+        report.update({
+            'batch_size': batch_size,
+            'batches_per_epoch': n_batches,
+            'accumulation_steps': accumulation_steps,
+            'epochs': epochs,
+            'epochs_run': epochs_run,
+            'epochs_saved': epochs_saved,
+            'seconds_saved': seconds_saved,
+            'restored_best': restored,
+            'total_time_s': total_time,
+            'samples_per_s': samples_per_s,
+            'peak_memory_mb': peak_mb,
+            'final_train_loss': train_losses[-1],
+            'final_val_loss': val_losses[-1],
+            'best_val_loss': best_val_loss,
+            'best_epoch': best_epoch
+        })
     
     return model, train_losses, val_losses
 
+# ══════════════════════════════════════════════════════════════════
+# BENCHMARK DE BATCH SIZE
+# ══════════════════════════════════════════════════════════════════
+
+def _benchmark_run(batch_size, data, epochs, options) -> dict:
+    """Treina um modelo novo com um batch size (executado em processo próprio)."""
+    X_train, y_train, X_test, y_test = data
+    report = {}
+    train_model(
+        create_model(), X_train, y_train, X_test, y_test,
+        epochs=epochs, verbose=False, batch_size=batch_size or None,
+        report=report, **options
+    )
+    return report
+
+
+def benchmark_batch_sizes(
+    X_train: torch.Tensor,
+    y_train: torch.Tensor,
+    X_test: torch.Tensor,
+    y_test: torch.Tensor,
+    batch_sizes: Sequence[int] = BENCHMARK_BATCH_SIZES,
+    epochs: int = 3,
+    **options
+) -> List[dict]:
+    """
+    Compara amostras/s e pico de memória entre batch sizes.
+    
+    Cada batch size treina em um processo novo: o pico de RSS de um
+    processo nunca diminui, então medir todos no mesmo processo faria os
+    seguintes herdarem o pico do maior.
+    
+    Args:
+        X_train, y_train, X_test, y_test: Dados de treino e validação
+        batch_sizes: Tamanhos a comparar (0 = full batch)
+        epochs: Épocas por medição
+        **options: Demais argumentos do train_model (shuffle, num_workers, ...)
+        
+    Returns:
+        Lista com o relatório do train_model de cada batch size
+    """
+    data = (X_train, y_train, X_test, y_test)
+    results = []
+    
+    print(f"\n{'Batch':>7} | {'Batches':>7} | {'Amostras/s':>10} | {'Pico MB':>8} | {'Val Loss':>9}")
+    print("-" * 55)
+    for batch_size in batch_sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            report = pool.submit(_benchmark_run, batch_size, data, epochs, options).result()
+        results.append(report)
+        print(f"{batch_size or 'full':>7} | {report['batches_per_epoch']:>7} | "
+              f"{report['samples_per_s']:>10,.0f} | {report['peak_memory_mb']:>8.1f} | "
+              f"{report['final_val_loss']:>9.6f}")
+    
+    return results
+
 
 def plot_training_history(
     train_losses: List[float], 
@@ -227,7 +728,9 @@ def save_trained_model(
         'train_losses': train_losses,
         'val_losses': val_losses,
         'final_train_loss': train_losses[-1],
-        'final_val_loss': val_losses[-1]
+        'final_val_loss': val_losses[-1],
+        'best_val_loss': min(val_losses),
+        'best_epoch': val_losses.index(min(val_losses)) + 1
     }, model_path)
     
     print(f"Modelo salvo em: {model_path}")
@@ -240,6 +743,47 @@ def save_trained_model(
 # ══════════════════════════════════════════════════════════════════
 
 if __name__ == "__main__":
+    # Uso: python train.py [--batch-size 64] [--accumulation-steps 1] [--num-workers 0]
+    #      python train.py --benchmark 16,64,256,0   (compara batch sizes e sai)
+    parser = argparse.ArgumentParser(description="Treinamento do modelo LSTM")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE or 0,
+                        help="Janelas por mini-batch (0 = full batch)")
+    parser.add_argument("--accumulation-steps", type=int, default=ACCUMULATION_STEPS)
+    parser.add_argument("--num-workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--no-shuffle", action="store_true", help="Mantém a ordem cronológica das janelas")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--patience", type=int, default=PATIENCE or 0,
+                        help="Épocas sem melhora antes de parar (0 = sem early stopping)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA)
+    parser.add_argument("--checkpoint-dir", type=Path, default=CHECKPOINT_DIR)
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="Checkpoint a cada N épocas (0 = só na última)")
+    parser.add_argument("--checkpoint-every-s", type=float, default=CHECKPOINT_EVERY_S,
+                        help="Checkpoint a cada T segundos (0 = desligado)")
+    parser.add_argument("--keep", type=int, default=CHECKPOINT_KEEP, help="Checkpoints mantidos")
+    parser.add_argument("--resume", type=Path, nargs="?", const="", default=None,
+                        help="Continua do checkpoint mais recente de --checkpoint-dir "
+                             "(ou do arquivo/diretório informado)")
+    parser.add_argument("--overwrite-checkpoints", action="store_true",
+                        help="Apaga os checkpoints de --checkpoint-dir antes de um treino novo")
+    parser.add_argument("--benchmark", default=None,
+                        help="Batch sizes separados por vírgula: mede amostras/s e pico de memória e sai")
+    parser.add_argument("--benchmark-epochs", type=int, default=3)
+    args = parser.parse_args()
+    if args.resume == "":
+        args.resume = args.checkpoint_dir
+    
+    options = {
+        'shuffle': not args.no_shuffle,
+        'num_workers': args.num_workers,
+        'accumulation_steps': args.accumulation_steps,
+        'seed': args.seed,
+        'patience': args.patience or None,
+        'min_delta': args.min_delta
+    }
+    
     print("="*60)
     print("ETAPA 5: Treinamento do Modelo LSTM")
     print("="*60)
@@ -248,6 +792,15 @@ if __name__ == "__main__":
     print("\nCarregando dados pre-processados...")
     X_train, X_test, y_train, y_test, scaler = preprocess_data(save_scaler=False)
     
+    if args.benchmark:
+        batch_sizes = [int(b) for b in args.benchmark.split(",")]
+        print(f"\nBenchmark de batch size ({args.benchmark_epochs} épocas cada)...")
+        benchmark_batch_sizes(
+            X_train, y_train, X_test, y_test, batch_sizes,
+            epochs=args.benchmark_epochs, learning_rate=args.lr, **options
+        )
+        sys.exit(0)
+    
     # Criar modelo
     print("\nCriando modelo...")
     model = create_model()
@@ -259,14 +812,27 @@ if __name__ == "__main__":
         y_train=y_train,
         X_test=X_test,
         y_test=y_test,
-        epochs=EPOCHS,
-        learning_rate=LEARNING_RATE
+        epochs=args.epochs,
+        learning_rate=args.lr,
+        batch_size=args.batch_size or None,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_every=args.checkpoint_every,
+        checkpoint_every_s=args.checkpoint_every_s,
+        checkpoint_keep=args.keep,
+        resume_from=args.resume,
+        overwrite_checkpoints=args.overwrite_checkpoints,
+        **options
     )
     
     # Salvar modelo treinado
     print("\nSalvando modelo...")
     save_trained_model(model, train_losses, val_losses)
     
+    # Bundle em arquivo único para a API (pesos + scaler + config, sem pickle)
+    if (MODELS_DIR / "scaler.pkl").exists() and (MODELS_DIR / "config.pkl").exists():
+        bundle_path = convert_artifacts(MODELS_DIR)
+        print(f"Bundle salvo em: {bundle_path}")
+    
     # Plotar historico de treinamento
     print("\nGerando graficos...")
     plot_path = MODELS_DIR / "training_history.png"
@@ -0,0 +1,204 @@
+# ═══════════════════════════════════════════════════════════════
+# Formatos de corpo da API de previsao
+# Objetivo: Aceitar float32 cru e msgpack alem do JSON, com validacao vetorizada
+# ═══════════════════════════════════════════════════════════════
+
+from itertools import chain
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    # Sem msgpack: apenas JSON e float32 cru
+    msgpack = None
+
+# ══════════════════════════════════════════════════════════════════
+# TIPOS DE CONTEUDO
+# ══════════════════════════════════════════════════════════════════
+
+JSON_CONTENT_TYPE = "application/json"
+BINARY_CONTENT_TYPE = "application/octet-stream"
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+
+# Content-Type / Accept → formato
+MEDIA_TYPES = {
+    JSON_CONTENT_TYPE: "json",
+    BINARY_CONTENT_TYPE: "binary",
+    MSGPACK_CONTENT_TYPE: "msgpack",
+    "application/msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+
+CONTENT_TYPES = {
+    "json": JSON_CONTENT_TYPE,
+    "binary": BINARY_CONTENT_TYPE,
+    "msgpack": MSGPACK_CONTENT_TYPE,
+}
+
+# Preços no formato binário: float32 little-endian, linha a linha
+FLOAT32_LE = np.dtype("<f4")
+
+
+class UnsupportedMediaType(ValueError):
+    """Content-Type sem decodificador disponível (resposta 415)."""
+
+
+def _media_type(header: str) -> str:
+    return header.split(";", 1)[0].strip().lower()
+
+
+def available_formats() -> Sequence[str]:
+    """Formatos suportados neste ambiente (msgpack só com o pacote instalado)."""
+    return ("json", "binary", "msgpack") if msgpack is not None else ("json", "binary")
+
+
+def request_format(content_type: Optional[str]) -> str:
+    """
+    Formato do corpo a partir do Content-Type (ausente = JSON).
+
+    Raises:
+        UnsupportedMediaType: Tipo desconhecido ou msgpack não instalado
+    """
+    if not content_type:
+        return "json"
+    fmt = MEDIA_TYPES.get(_media_type(content_type))
+    if fmt is None or fmt not in available_formats():
+        raise UnsupportedMediaType(
+            f"Content-Type não suportado: {content_type}. "
+            f"Use um de: {[CONTENT_TYPES[f] for f in available_formats()]}"
+        )
+    return fmt
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Formato da resposta a partir do Accept.
+
+    Escolhe o tipo suportado com maior q; em empate, o primeiro listado.
+    Sem Accept, com curingas ou sem nenhum tipo suportado, responde JSON.
+    """
+    if not accept:
+        return "json"
+
+    best, best_q = "json", 0.0
+    for item in accept.split(","):
+        media_type, *params = item.split(";")
+        fmt = MEDIA_TYPES.get(_media_type(media_type))
+        if fmt is None or fmt not in available_formats():
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+# ══════════════════════════════════════════════════════════════════
+# VALIDACAO VETORIZADA
+# ══════════════════════════════════════════════════════════════════
+
+def check_prices(prices: np.ndarray) -> np.ndarray:
+    """
+    Valida uma janela de preços com operações NumPy (sem laço por elemento).
+
+    Raises:
+        ValueError: Janela vazia, valor não finito ou preço não positivo
+    """
+    if prices.size == 0:
+        raise ValueError("Lista de preços não pode estar vazia")
+    if not np.isfinite(prices).all():
+        raise ValueError("Todos os preços devem ser números finitos")
+    if not (prices > 0).all():
+        raise ValueError("Todos os preços devem ser positivos")
+    return prices
+
+
+def check_windows(windows: Union[np.ndarray, Sequence[Sequence[float]]]) -> None:
+    """
+    Valida várias janelas (array (n, L) ou listas de tamanhos diferentes)
+    com uma única verificação vetorizada sobre todos os preços.
+
+    Raises:
+        ValueError: Janela vazia ou com preço inválido (indica a primeira)
+    """
+    if isinstance(windows, np.ndarray):
+        if windows.shape[1] == 0:
+            raise ValueError("Janela 0 está vazia")
+        invalid = np.flatnonzero(~(np.isfinite(windows) & (windows > 0)).all(axis=1))
+        if invalid.size:
+            raise ValueError(f"Janela {invalid[0]}: todos os preços devem ser positivos")
+        return
+
+    lengths = np.fromiter((len(w) for w in windows), dtype=np.int64, count=len(windows))
+    empty = np.flatnonzero(lengths == 0)
+    if empty.size:
+        raise ValueError(f"Janela {empty[0]} está vazia")
+
+    flat = np.fromiter(chain.from_iterable(windows), dtype=np.float64, count=int(lengths.sum()))
+    invalid = np.flatnonzero(~(np.isfinite(flat) & (flat > 0)))
+    if invalid.size:
+        window = int(np.searchsorted(np.cumsum(lengths), invalid[0], side="right"))
+        raise ValueError(f"Janela {window}: todos os preços devem ser positivos")
+
+# ══════════════════════════════════════════════════════════════════
+# CODIFICACAO
+# ══════════════════════════════════════════════════════════════════
+
+def decode_float32(body: bytes, row_length: Optional[int] = None) -> np.ndarray:
+    """
+    Preços em float32 little-endian → array float64.
+
+    Args:
+        body: Corpo da requisição
+        row_length: Preços por janela (None = uma única janela)
+
+    Returns:
+        Array (n,) ou, com row_length, (n_janelas, row_length)
+
+    Raises:
+        ValueError: Tamanho do corpo incompatível
+    """
+    if len(body) % FLOAT32_LE.itemsize:
+        raise ValueError(f"Corpo binário deve ter múltiplo de 4 bytes (float32); recebido {len(body)}")
+    prices = np.frombuffer(body, dtype=FLOAT32_LE).astype(np.float64)
+    if row_length is None:
+        return prices
+    if row_length <= 0 or prices.size % row_length:
+        raise ValueError(f"{prices.size} preços não formam janelas de {row_length}")
+    return prices.reshape(-1, row_length)
+
+
+def encode_float32(values: np.ndarray) -> bytes:
+    """Array → float32 little-endian (ordem de linhas)."""
+    return np.ascontiguousarray(values, dtype=FLOAT32_LE).tobytes()
+
+
+def decode_msgpack(body: bytes) -> dict:
+    """
+    Corpo msgpack → dict com os mesmos campos do JSON.
+
+    Os preços podem vir como listas (validadas como no JSON) ou como bytes
+    float32 little-endian (ver decode_float32), que evitam um objeto por preço.
+
+    Raises:
+        ValueError: Corpo inválido ou que não é um mapa
+    """
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"Corpo msgpack inválido: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("Corpo msgpack deve ser um mapa com os campos da requisição")
+    return payload
+
+
+def encode_msgpack(payload: dict) -> bytes:
+    """Resposta (dict do JSON) → msgpack."""
+    return msgpack.packb(payload, use_bin_type=True)